@@ -37,6 +37,10 @@ except Exception:
             return decorator
         def delete(self, *args, **kwargs):
             pass
+        def get(self, *args, **kwargs):
+            return None
+        def set(self, *args, **kwargs):
+            pass
     Cache = _NoOpCache
     redis = None
     CACHING_AVAILABLE = False
@@ -142,6 +146,72 @@ def create_app():
     else:
         app.redis_client = None
 
+    # Start the background pipeline that runs hook handlers off the request
+    try:
+        from .fanout import init_fanout
+        app.fanout = init_fanout(app)
+    except Exception:
+        app.logger.exception("Failed to start hook fan-out pipeline; hooks will run inline")
+        app.fanout = None
+
+    # Initialize outbound webhook dispatcher
+    try:
+        from .webhooks import init_webhook_dispatcher
+        app.webhook_dispatcher = init_webhook_dispatcher(app)
+    except Exception:
+        app.logger.exception("Failed to start webhook dispatcher; webhooks will be sent inline")
+        app.webhook_dispatcher = None
+
+    # Start the batched writer for incoming metric samples
+    try:
+        from .monitoring.timeseries import init_sample_writer
+        app.sample_writer = init_sample_writer(app)
+    except Exception:
+        app.logger.exception("Failed to start metrics writer; samples will be written inline")
+        app.sample_writer = None
+
+    # Start the periodic rollup/retention job for stored metrics
+    try:
+        from .monitoring.rollup import init_rollup_job
+        app.rollup_job = init_rollup_job(app)
+    except Exception:
+        app.logger.exception("Failed to start metrics rollup job")
+        app.rollup_job = None
+
+    # Periodically correct drift in the materialized dashboard counters
+    try:
+        from .ticket_stats import init_stats_reconcile_job
+        app.stats_reconcile_job = init_stats_reconcile_job(app)
+    except Exception:
+        app.logger.exception("Failed to start ticket stats reconcile job")
+        app.stats_reconcile_job = None
+
+    # Agent API key lookups and coalesced last_check_at writes for metrics ingest
+    from .monitoring.api_keys import init_api_key_cache
+    app.api_key_cache = init_api_key_cache(app)
+    try:
+        from .monitoring.last_check import init_last_check_recorder
+        app.last_check_recorder = init_last_check_recorder(app)
+    except Exception:
+        app.logger.exception("Failed to start last check recorder; check times will be written inline")
+        app.last_check_recorder = None
+
+    # Background sampler serving the local /api/monitoring/system snapshot
+    try:
+        from .monitoring.system import init_system_sampler
+        app.system_sampler = init_system_sampler(app)
+    except Exception:
+        app.logger.exception("Failed to start system metrics sampler")
+        app.system_sampler = None
+
+    # Pooled, cached fetches of remote servers' system snapshots
+    from .monitoring.remote import init_remote_fetcher
+    app.remote_fetcher = init_remote_fetcher(app)
+
+    # Threshold alert state for monitors (kept in memory, per process)
+    from .monitoring.alerts import init_alert_evaluator
+    app.alert_evaluator = init_alert_evaluator(app)
+
     # Initialize monitoring worker
     try:
         from .monitoring import init_monitoring_worker
@@ -165,9 +235,10 @@ def create_app():
              "X-Requested-With",
              "X-Metrics-Key",
              "X-API-Key",
+             "X-Response-Mode",
          ],
          methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
-         expose_headers=["Access-Control-Allow-Origin"],
+         expose_headers=["Access-Control-Allow-Origin", "ETag", "X-Resource-Version"],
          automatic_options=True)
 
     # Liveness probe: returns 200 if the app is up
@@ -217,6 +288,8 @@ def create_app():
         from .routes.settings import settings_bp
         from .routes.monitoring import monitoring_bp
         from .routes.modules import modules_bp
+        from .routes.webhooks import webhooks_bp
+        from .routes.exports import exports_bp
         app.register_blueprint(auth_bp, url_prefix='/api/auth')
         app.register_blueprint(tickets_bp, url_prefix='/api/tickets')
         app.register_blueprint(kb_bp, url_prefix='/api/kb')
@@ -232,6 +305,8 @@ def create_app():
         app.register_blueprint(settings_bp, url_prefix='/api/settings')
         app.register_blueprint(monitoring_bp, url_prefix='/api/monitoring')
         app.register_blueprint(modules_bp, url_prefix='/api/modules')
+        app.register_blueprint(webhooks_bp, url_prefix='/api/webhooks')
+        app.register_blueprint(exports_bp, url_prefix='/api/exports')
     except Exception:
         # Surface import / registration errors so they are visible in development
         logging.exception("Failed to import blueprints for app; blueprints won't be registered")
@@ -239,6 +314,10 @@ def create_app():
         if app.config.get('ENV') == 'development' or app.debug:
             raise
 
+    # Maintenance CLI commands (flask <command>)
+    from .cli import register_cli
+    register_cli(app)
+
     # Socket.IO event handlers - only register if socketio is available and properly initialized
     if hasattr(socketio, 'on') and hasattr(socketio, 'emit'):
         @socketio.on('connect')
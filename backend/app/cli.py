@@ -0,0 +1,75 @@
+"""Maintenance commands registered on the app's `flask` CLI."""
+
+import click
+
+
+def register_cli(app):
+    @app.cli.command('backfill-read-cursors')
+    @click.option('--batch-size', default=500, show_default=True, help='Participants per transaction')
+    def backfill_read_cursors(batch_size):
+        """Derive conversation read cursors from legacy message_read_status rows."""
+        from app.models.conversation_participant import ConversationParticipant
+
+        updated = ConversationParticipant.backfill_read_cursors(batch_size=batch_size)
+        click.echo(f'Backfilled read cursors for {updated} participant(s)')
+
+    @app.cli.command('purge-metrics')
+    @click.option('--days', type=int, default=None,
+                  help='Raw sample retention in days (defaults to METRICS_RAW_RETENTION_DAYS)')
+    def purge_metrics(days):
+        """Delete raw metric samples and rollups older than their retention."""
+        from app.monitoring.rollup import purge_all
+        from app.monitoring.timeseries import RAW_RESOLUTION, retention_by_resolution
+
+        retention = retention_by_resolution(app.config)
+        if days is not None:
+            retention[RAW_RESOLUTION] = days
+        for resolution, deleted in purge_all(retention).items():
+            click.echo(f'Resolution {resolution}s: deleted {deleted} row(s) older than '
+                       f'{retention[resolution]} day(s)')
+
+    @app.cli.command('rollup-metrics')
+    def rollup_metrics():
+        """Roll raw metric samples up into the 5-minute, hourly and daily tiers."""
+        from app.locks import ROLLUP_LOCK_KEY, advisory_lock
+        from app.monitoring.rollup import run_rollups
+
+        with advisory_lock(ROLLUP_LOCK_KEY):
+            results = run_rollups()
+        for resolution, written in results.items():
+            click.echo(f'Resolution {resolution}s: wrote {written} bucket(s)')
+
+    @app.cli.command('reconcile-ticket-stats')
+    def reconcile_ticket_stats_command():
+        """Rebuild the dashboard's ticket counters from the tickets table."""
+        from app.ticket_stats import reconcile_ticket_stats
+
+        drift = reconcile_ticket_stats()
+        for name, (stored, actual) in sorted(drift.items()):
+            click.echo(f'{name}: {stored} -> {actual}')
+        click.echo(f'Corrected {len(drift)} counter(s)')
+
+    @app.cli.command('rebuild-ticket-facts')
+    def rebuild_ticket_facts_command():
+        """Recreate the daily ticket facts behind the reports from the tickets table."""
+        from app.ticket_facts import rebuild_ticket_facts
+
+        rows = rebuild_ticket_facts()
+        click.echo(f'Rebuilt {rows} ticket fact row(s)')
+
+    @app.cli.command('reindex-kb')
+    def reindex_kb_command():
+        """Rebuild the knowledge base full-text search index."""
+        from app.kb_search import reindex_articles
+
+        count = reindex_articles()
+        click.echo(f'Indexed {count} article(s)')
+
+    @app.cli.command('backfill-first-response')
+    @click.option('--batch-size', default=500, show_default=True, help='Tickets per transaction')
+    def backfill_first_response(batch_size):
+        """Set first_response_at on existing tickets from their comments and messages."""
+        from app.models.ticket import Ticket
+
+        updated = Ticket.backfill_first_response(batch_size=batch_size)
+        click.echo(f'Recorded first responses for {updated} ticket(s)')
@@ -71,5 +71,114 @@ class Config:
     # should not be gated on direct DB access.
     READINESS_REQUIRE_DB = os.getenv('READINESS_REQUIRE_DB', 'False').lower() in ('true', '1')
 
+    # Hook handler execution (see app/fanout.py): 'thread' runs handlers on a
+    # background worker pool, 'redis' uses a durable Redis-backed queue and
+    # 'inline' runs them synchronously inside the request. Unset: 'redis'
+    # when a Redis client is configured, else 'thread' (whose queued jobs are
+    # lost when the process restarts).
+    HOOKS_BACKEND = os.getenv('HOOKS_BACKEND') or None
+    HOOKS_WORKERS = int(os.getenv('HOOKS_WORKERS', 4))
+    HOOKS_MAX_ATTEMPTS = int(os.getenv('HOOKS_MAX_ATTEMPTS', 5))
+    HOOKS_RETRY_BASE_DELAY = float(os.getenv('HOOKS_RETRY_BASE_DELAY', 2.0))
+
+    # Outbound webhook delivery: worker threads, pooled connections per host,
+    # per-request timeout/attempts and per-URL circuit breaker settings.
+    WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', 8))
+    WEBHOOK_POOL_SIZE = int(os.getenv('WEBHOOK_POOL_SIZE', 10))
+    WEBHOOK_TIMEOUT = float(os.getenv('WEBHOOK_TIMEOUT', 5.0))
+    WEBHOOK_MAX_ATTEMPTS = int(os.getenv('WEBHOOK_MAX_ATTEMPTS', 3))
+    WEBHOOK_RETRY_BASE_DELAY = float(os.getenv('WEBHOOK_RETRY_BASE_DELAY', 0.5))
+    WEBHOOK_BREAKER_THRESHOLD = int(os.getenv('WEBHOOK_BREAKER_THRESHOLD', 5))
+    WEBHOOK_BREAKER_RESET = float(os.getenv('WEBHOOK_BREAKER_RESET', 60.0))
+
+    # Metric samples received at /api/monitoring/data (see
+    # app/monitoring/timeseries.py): 'batch' buffers them and writes in
+    # batches from a background thread, 'inline' writes inside the request.
+    METRICS_WRITE_BACKEND = os.getenv('METRICS_WRITE_BACKEND', 'batch')
+    METRICS_WRITE_BATCH_SIZE = int(os.getenv('METRICS_WRITE_BATCH_SIZE', 500))
+    METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 2.0))
+
+    # Rollup of raw samples into 5-minute, hourly and daily tiers (see
+    # app/monitoring/rollup.py), run every METRICS_ROLLUP_INTERVAL seconds
+    # (0 disables the background job). Each tier is kept for its own number
+    # of days.
+    METRICS_ROLLUP_INTERVAL = int(os.getenv('METRICS_ROLLUP_INTERVAL', 300))
+    METRICS_RAW_RETENTION_DAYS = int(os.getenv('METRICS_RAW_RETENTION_DAYS', 14))
+    METRICS_RETENTION_5M_DAYS = int(os.getenv('METRICS_RETENTION_5M_DAYS', 90))
+    METRICS_RETENTION_1H_DAYS = int(os.getenv('METRICS_RETENTION_1H_DAYS', 365))
+    METRICS_RETENTION_1D_DAYS = int(os.getenv('METRICS_RETENTION_1D_DAYS', 1825))
+
+    # Seconds between rebuilds of the dashboard counters in ticket_stats from
+    # the tickets table (see app/ticket_stats.py) to correct any drift; 0
+    # disables the background job.
+    TICKET_STATS_RECONCILE_INTERVAL = int(os.getenv('TICKET_STATS_RECONCILE_INTERVAL', 3600))
+
+    # Seconds a /api/dashboard/reports response is cached (per path and query
+    # string); reports may lag ticket changes by up to this long.
+    REPORT_CACHE_TTL = int(os.getenv('REPORT_CACHE_TTL', 60))
+
+    # Rows fetched per round trip by the streaming exports under /api/exports
+    # (server-side cursor batch size; see app/routes/exports.py).
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+    # Monitoring worker: size of the pool that runs scheduled checks, how
+    # long (seconds) each monitor's configuration is cached between reloads
+    # and how long one host metrics snapshot is shared between monitors.
+    MONITORING_WORKERS = int(os.getenv('MONITORING_WORKERS', 8))
+    MONITORING_CONFIG_TTL = int(os.getenv('MONITORING_CONFIG_TTL', 60))
+    MONITORING_SAMPLE_TTL = float(os.getenv('MONITORING_SAMPLE_TTL', 5.0))
+
+    # How the monitoring worker posts snapshots (see app/monitoring/codec.py):
+    # snapshots per request, body format ('json' or 'msgpack', which needs the
+    # msgpack package) and compression ('gzip' or empty). The defaults send
+    # one plain JSON snapshot per request, which every ingest endpoint accepts.
+    MONITORING_SEND_BATCH_SIZE = int(os.getenv('MONITORING_SEND_BATCH_SIZE', 1))
+    MONITORING_SEND_FORMAT = os.getenv('MONITORING_SEND_FORMAT', 'json')
+    MONITORING_SEND_COMPRESSION = os.getenv('MONITORING_SEND_COMPRESSION', '')
+
+    # Directory for the on-disk spool of snapshots that could not be sent
+    # (one subdirectory per monitor; empty disables spooling) and its size
+    # bound per monitor in MB, beyond which the oldest snapshots are dropped.
+    MONITORING_SPOOL_DIR = os.getenv('MONITORING_SPOOL_DIR', '')
+    MONITORING_SPOOL_MAX_MB = int(os.getenv('MONITORING_SPOOL_MAX_MB', 50))
+
+    # Agent API key cache for /api/monitoring/data (see app/monitoring/api_keys.py):
+    # number of keys kept in memory, seconds a lookup is reused (also how long
+    # another process may keep using a changed monitor's cached entry) and
+    # seconds an unknown key is remembered.
+    MONITORING_API_KEY_CACHE_SIZE = int(os.getenv('MONITORING_API_KEY_CACHE_SIZE', 10000))
+    MONITORING_API_KEY_CACHE_TTL = int(os.getenv('MONITORING_API_KEY_CACHE_TTL', 60))
+    MONITORING_API_KEY_NEGATIVE_TTL = int(os.getenv('MONITORING_API_KEY_NEGATIVE_TTL', 10))
+    # Seconds between batched last_check_at writes (0 writes on every check)
+    MONITORING_LAST_CHECK_FLUSH_INTERVAL = float(os.getenv('MONITORING_LAST_CHECK_FLUSH_INTERVAL', 5))
+
+    # Threshold alerts on incoming monitor samples (see app/monitoring/alerts.py):
+    # how long a limit must be exceeded before firing, how far below the limit
+    # (as a fraction) the value must drop to resolve, the minimum gap between
+    # notifications for the same resource and whether firing alerts open a
+    # ticket. Each can be overridden per resource in alert_thresholds.
+    MONITOR_ALERT_SUSTAIN_SECONDS = int(os.getenv('MONITOR_ALERT_SUSTAIN_SECONDS', 120))
+    MONITOR_ALERT_HYSTERESIS = float(os.getenv('MONITOR_ALERT_HYSTERESIS', 0.1))
+    MONITOR_ALERT_COOLDOWN_SECONDS = int(os.getenv('MONITOR_ALERT_COOLDOWN_SECONDS', 900))
+    MONITOR_ALERT_AUTO_TICKET = os.getenv('MONITOR_ALERT_AUTO_TICKET', 'False').lower() in ('true', '1')
+
+    # Default body returned by create/update endpoints: 'collection' (the
+    # legacy full list) or 'entity' (only the mutated resource). Clients can
+    # override per request with ?response= or the X-Response-Mode header.
+    WRITE_RESPONSE_MODE = os.getenv('WRITE_RESPONSE_MODE', 'collection')
+
+    # Seconds between refreshes of the local /api/monitoring/system snapshot
+    # (0 samples on each request instead of in a background thread)
+    MONITORING_SYSTEM_SAMPLE_INTERVAL = float(os.getenv('MONITORING_SYSTEM_SAMPLE_INTERVAL', 2))
+
+    # Fetching remote servers' snapshots (/api/monitoring/<id>/system and
+    # /api/monitoring/system?ids=...): concurrent fetches, keep-alive
+    # connections kept per server, per-server timeout in seconds and how
+    # long a successful response is reused.
+    MONITORING_PROXY_WORKERS = int(os.getenv('MONITORING_PROXY_WORKERS', 32))
+    MONITORING_PROXY_POOL_SIZE = int(os.getenv('MONITORING_PROXY_POOL_SIZE', 4))
+    MONITORING_PROXY_TIMEOUT = float(os.getenv('MONITORING_PROXY_TIMEOUT', 5))
+    MONITORING_PROXY_CACHE_TTL = float(os.getenv('MONITORING_PROXY_CACHE_TTL', 5))
+
     # Monitoring metrics API key (used to authenticate /api/monitoring/system)
     METRICS_API_KEY = os.getenv('METRICS_API_KEY')
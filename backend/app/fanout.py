@@ -0,0 +1,352 @@
+"""Background fan-out pipeline for hook handlers.
+
+`app.hooks.send()` used to run every handler inline, so a request that
+triggered a broadcast (e.g. a KB article notifying every user) waited for all
+notification writes and webhook calls before responding. Handlers are now
+queued as jobs and executed by a small worker pool inside an application
+context:
+
+- ``thread`` backend: an in-process queue. Fast, but pending jobs are lost if
+  the process dies; remaining jobs are drained on interpreter shutdown.
+- ``redis`` backend: jobs live in a Redis list and are moved to a
+  per-process processing list while running (BRPOPLPUSH). Each process keeps
+  a lease on its list alive while it polls; lists whose lease expired
+  (crashed or killed processes) are re-queued by any live process, without
+  touching jobs other live processes are running.
+- ``inline`` backend: run handlers synchronously (tests, scripts).
+
+Each job is one (event, handler) pair so a failing handler is retried on its
+own, with exponential backoff, without re-running the handlers that already
+succeeded. A retry runs the whole handler again, so handlers wrap steps that
+must not repeat (e.g. creating a row and notifying about it) in
+`side_effect()`: the job records which steps completed and later attempts
+skip them. Model instances are passed by reference (class path + id) and
+reloaded in the worker's session.
+
+Without HOOKS_BACKEND the redis backend is used when a Redis client is
+configured, else the thread one, which does not guarantee delivery across
+restarts.
+"""
+
+import atexit
+import heapq
+import importlib
+import itertools
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+
+from flask import g
+
+from app.models.base import db
+
+logger = logging.getLogger(__name__)
+
+
+def handler_name(fn):
+    return f'{fn.__module__}:{fn.__qualname__}'
+
+
+def _ref(value):
+    """Turn model instances into JSON-safe references."""
+    table = getattr(value, '__table__', None)
+    if table is not None and getattr(value, 'id', None) is not None:
+        cls = type(value)
+        return {'__model__': f'{cls.__module__}:{cls.__name__}', 'id': str(value.id)}
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _deref(value):
+    if isinstance(value, dict) and '__model__' in value:
+        module_name, cls_name = value['__model__'].split(':')
+        cls = getattr(importlib.import_module(module_name), cls_name)
+        return db.session.get(cls, uuid.UUID(value['id']))
+    return value
+
+
+def side_effect(key, fn, *args, **kwargs):
+    """Run `fn` unless the current job already completed step `key`.
+
+    Keys are per job, so they only need to be unique within one handler
+    call. Outside the pipeline (inline hooks) `fn` always runs.
+    """
+    done = g.get('hook_done')
+    if done is None:
+        return fn(*args, **kwargs)
+    if key in done:
+        return None
+    result = fn(*args, **kwargs)
+    done.add(key)
+    return result
+
+
+class InProcessBackend:
+    """Thread-safe in-memory queue with support for delayed (retry) jobs."""
+
+    def __init__(self):
+        self._ready = queue.Queue()
+        self._delayed = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def push(self, job, delay=0):
+        if delay > 0:
+            with self._lock:
+                heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._seq), job))
+        else:
+            self._ready.put(job)
+
+    def pop(self, timeout):
+        self._promote_due()
+        try:
+            return self._ready.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def ack(self, job):
+        pass
+
+    def pending(self):
+        with self._lock:
+            return self._ready.qsize() + len(self._delayed)
+
+    def recover(self):
+        pass
+
+    def _promote_due(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._delayed and self._delayed[0][0] <= now:
+                _, _, job = heapq.heappop(self._delayed)
+                self._ready.put(job)
+
+
+class RedisBackend:
+    """Durable queue on Redis lists; retries wait in a sorted set.
+
+    Running jobs are kept in a processing list owned by this backend
+    instance, guarded by a lease key that expires `lease_ttl` seconds after
+    the last poll.
+    """
+
+    def __init__(self, client, prefix='hooks', lease_ttl=60):
+        self.client = client
+        self.lease_ttl = lease_ttl
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.ready_key = f'{prefix}:jobs'
+        self.delayed_key = f'{prefix}:delayed'
+        self.workers_key = f'{prefix}:workers'
+        self._processing_prefix = f'{prefix}:processing:'
+        self._lease_prefix = f'{prefix}:lease:'
+        self.processing_key = self._processing_prefix + self.worker_id
+        self._next_recover = 0.0
+
+    def push(self, job, delay=0):
+        raw = json.dumps(job)
+        if delay > 0:
+            self.client.zadd(self.delayed_key, {raw: time.time() + delay})
+        else:
+            self.client.lpush(self.ready_key, raw)
+
+    def pop(self, timeout):
+        self._renew_lease()
+        if time.monotonic() >= self._next_recover:
+            self.recover()
+        self._promote_due()
+        raw = self.client.brpoplpush(self.ready_key, self.processing_key, timeout=max(1, int(timeout)))
+        if raw is None:
+            return None
+        job = json.loads(raw)
+        job['_raw'] = raw
+        return job
+
+    def ack(self, job):
+        raw = job.pop('_raw', None)
+        if raw is not None:
+            self.client.lrem(self.processing_key, 1, raw)
+
+    def pending(self):
+        return self.client.llen(self.ready_key) + self.client.zcard(self.delayed_key)
+
+    def recover(self):
+        """Re-queue jobs left in the processing lists of workers whose lease expired."""
+        self._renew_lease()
+        self._next_recover = time.monotonic() + self.lease_ttl
+        for worker_id in self.client.smembers(self.workers_key):
+            if isinstance(worker_id, bytes):
+                worker_id = worker_id.decode()
+            if worker_id == self.worker_id or self.client.exists(self._lease_prefix + worker_id):
+                continue
+            processing_key = self._processing_prefix + worker_id
+            while self.client.rpoplpush(processing_key, self.ready_key) is not None:
+                pass
+            self.client.srem(self.workers_key, worker_id)
+
+    def _renew_lease(self):
+        self.client.set(self._lease_prefix + self.worker_id, 1, ex=self.lease_ttl)
+        self.client.sadd(self.workers_key, self.worker_id)
+
+    def _promote_due(self):
+        due = self.client.zrangebyscore(self.delayed_key, 0, time.time(), start=0, num=100)
+        for raw in due:
+            # zrem returns 0 if another worker already promoted this job
+            if self.client.zrem(self.delayed_key, raw):
+                self.client.lpush(self.ready_key, raw)
+
+
+class FanoutPipeline:
+    """Worker pool that executes queued hook handlers."""
+
+    def __init__(self, app, backend, workers=4, max_attempts=5, retry_base_delay=2.0):
+        self.app = app
+        self.backend = backend
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self._threads = []
+        self._stop_event = threading.Event()
+        self._inflight = 0
+        self._inflight_lock = threading.Lock()
+
+    def start(self):
+        self.backend.recover()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'hooks-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, drain_timeout=10.0):
+        """Stop the workers, giving queued jobs up to `drain_timeout` seconds."""
+        deadline = time.monotonic() + drain_timeout
+        while (self.backend.pending() or self._inflight) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+
+    def submit(self, event, handler, args, kwargs, actor_id=None):
+        self.backend.push({
+            'event': event,
+            'handler': handler,
+            'args': [_ref(a) for a in args],
+            'kwargs': {k: _ref(v) for k, v in kwargs.items()},
+            'actor_id': actor_id,
+            'attempt': 0,
+        })
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                job = self.backend.pop(timeout=0.5)
+            except Exception:
+                logger.exception('hook queue unavailable, retrying')
+                self._stop_event.wait(1)
+                continue
+            if job is None:
+                continue
+            with self._inflight_lock:
+                self._inflight += 1
+            try:
+                self._execute(job)
+            except Exception:
+                self._retry(job)
+            finally:
+                self.backend.ack(job)
+                with self._inflight_lock:
+                    self._inflight -= 1
+
+    def _execute(self, job):
+        from app.hooks import find_handler
+
+        fn = find_handler(job['event'], job['handler'])
+        if fn is None:
+            logger.warning('Dropping job for unregistered handler %s', job['handler'])
+            return
+        with self.app.app_context():
+            g.hook_actor_id = job.get('actor_id')
+            g.hook_done = set(job.get('done', ()))
+            args = [_deref(a) for a in job['args']]
+            if any(a is None for a in args):
+                logger.warning('Dropping %s job: referenced row no longer exists', job['event'])
+                return
+            kwargs = {k: _deref(v) for k, v in job['kwargs'].items()}
+            try:
+                fn(*args, **kwargs)
+            finally:
+                # Carried over to the retry so completed steps aren't repeated
+                job['done'] = sorted(g.hook_done)
+
+    def _retry(self, job):
+        attempt = job.get('attempt', 0) + 1
+        if attempt >= self.max_attempts:
+            logger.exception('Hook handler %s for %s failed %d times, giving up',
+                             job['handler'], job['event'], attempt)
+            return
+        delay = self.retry_base_delay * (2 ** (attempt - 1))
+        logger.warning('Hook handler %s for %s failed (attempt %d), retrying in %.1fs',
+                       job['handler'], job['event'], attempt, delay, exc_info=True)
+        retry = {k: v for k, v in job.items() if k != '_raw'}
+        retry['attempt'] = attempt
+        self.backend.push(retry, delay=delay)
+
+
+# Global pipeline instance
+fanout_pipeline = None
+
+
+def init_fanout(app):
+    """Create and start the global pipeline according to HOOKS_BACKEND."""
+    global fanout_pipeline
+    if fanout_pipeline is not None:
+        fanout_pipeline.stop(drain_timeout=0)
+        fanout_pipeline = None
+
+    backend_name = app.config.get('HOOKS_BACKEND')
+    if not backend_name:
+        backend_name = 'redis' if getattr(app, 'redis_client', None) is not None else 'thread'
+    if backend_name == 'inline':
+        return None
+    if backend_name == 'thread':
+        app.logger.warning('Hook jobs use an in-process queue; pending jobs are lost if the process exits')
+
+    backend = None
+    if backend_name == 'redis':
+        try:
+            import redis
+            backend = RedisBackend(redis.from_url(app.config['REDIS_URL']))
+            backend.client.ping()
+        except Exception:
+            app.logger.exception('Redis hook backend unavailable, falling back to in-process queue '
+                                 '(pending jobs are lost if the process exits)')
+            backend = None
+    if backend is None:
+        backend = InProcessBackend()
+
+    fanout_pipeline = FanoutPipeline(
+        app,
+        backend,
+        workers=app.config.get('HOOKS_WORKERS', 4),
+        max_attempts=app.config.get('HOOKS_MAX_ATTEMPTS', 5),
+        retry_base_delay=app.config.get('HOOKS_RETRY_BASE_DELAY', 2.0),
+    )
+    fanout_pipeline.start()
+    return fanout_pipeline
+
+
+def get_fanout():
+    """Get the global pipeline, or None when hooks run inline."""
+    return fanout_pipeline
+
+
+@atexit.register
+def _drain_on_exit():
+    if fanout_pipeline is not None:
+        fanout_pipeline.stop()
@@ -3,6 +3,8 @@ from typing import Callable
 
 # Import BaseModel's db
 from app.models.base import db
+from app.fanout import get_fanout, handler_name, side_effect
+from app.webhooks import get_webhook_dispatcher
 
 # Simple hook/signal registry. Other modules can register handlers for events
 # like 'comment.created', 'comment.updated', 'comment.deleted'. Handlers
@@ -16,13 +18,32 @@ def register(event: str, func: Callable) -> None:
     _registry[event].append(func)
 
 
+def find_handler(event: str, name: str):
+    """Look up a registered handler for `event` by its qualified name."""
+    for fn in _registry.get(event, []):
+        if handler_name(fn) == name:
+            return fn
+    return None
+
+
 def send(event: str, *args, **kwargs) -> None:
     """Send/emit an event to all registered handlers.
 
-    Handlers are called synchronously in registration order. Keep handlers
-    fast and side-effect free when possible.
+    When the background fan-out pipeline is running (see `app.fanout`) each
+    handler is queued as its own job and this returns immediately; otherwise
+    handlers are called synchronously in registration order.
     """
+    pipeline = get_fanout()
+    actor_id = _current_user_id() if pipeline is not None else None
     for fn in list(_registry.get(event, [])):
+        if pipeline is not None:
+            try:
+                pipeline.submit(event, handler_name(fn), args, kwargs, actor_id=actor_id)
+                continue
+            except Exception:
+                import logging
+
+                logging.exception("Could not queue hook handler for %s, running inline", event)
         try:
             fn(*args, **kwargs)
         except Exception:
@@ -34,6 +55,25 @@ def send(event: str, *args, **kwargs) -> None:
             logging.exception("Error in hook handler for %s", event)
 
 
+def _current_user_id():
+    """Return the id (as str) of the user who triggered the current event.
+
+    Pipeline workers have no request to read a JWT from, so the identity
+    captured when the event was queued is exposed on `g.hook_actor_id`.
+    """
+    from flask import g, has_app_context
+
+    if has_app_context() and g.get('hook_actor_id'):
+        return g.hook_actor_id
+    try:
+        from flask_jwt_extended import get_jwt_identity
+
+        identity = get_jwt_identity()
+    except Exception:
+        return None
+    return str(identity) if identity else None
+
+
 # Convenience senders
 def send_comment_created(comment):
     send('comment.created', comment)
@@ -221,7 +261,6 @@ def _default_comment_deleted_handler(comment):
 # Webhook functionality
 import requests
 from flask import current_app
-from app import cache
 
 
 def send_webhook_notification(notification, data=None):
@@ -317,24 +356,10 @@ def send_webhook_notification(notification, data=None):
         elif is_internal:
             # For same-host URLs, still use HTTP but log it
             current_app.logger.info(f"Sending webhook to same host: {user.webhook_url}")
-            response = requests.post(
-                user.webhook_url,
-                json=payload,
-                headers={'Content-Type': 'application/json'},
-                timeout=5
-            )
-            response.raise_for_status()
-            current_app.logger.info(f"Webhook sent to {user.webhook_url} for notification {notification.id}")
+            _post_webhook(user.webhook_url, payload, notification)
         else:
             # External webhook
-            response = requests.post(
-                user.webhook_url,
-                json=payload,
-                headers={'Content-Type': 'application/json'},
-                timeout=5
-            )
-            response.raise_for_status()
-            current_app.logger.info(f"External webhook sent to {user.webhook_url} for notification {notification.id}")
+            _post_webhook(user.webhook_url, payload, notification)
             
     except requests.RequestException as e:
         current_app.logger.warning(f"Failed to send webhook to {user.webhook_url}: {e}")
@@ -342,6 +367,27 @@ def send_webhook_notification(notification, data=None):
         current_app.logger.exception(f"Error sending webhook for notification {notification.id}: {e}")
 
 
+def _post_webhook(url, payload, notification):
+    """Hand an HTTP(S) webhook to the pooled dispatcher.
+
+    Falls back to a blocking request when the dispatcher is not running
+    (e.g. scripts that import the hooks without creating the app).
+    """
+    dispatcher = get_webhook_dispatcher()
+    if dispatcher is not None:
+        dispatcher.dispatch(url, payload, notification_id=notification.id)
+        current_app.logger.info(f"Webhook to {url} queued for notification {notification.id}")
+        return
+    response = requests.post(
+        url,
+        json=payload,
+        headers={'Content-Type': 'application/json'},
+        timeout=5
+    )
+    response.raise_for_status()
+    current_app.logger.info(f"Webhook sent to {url} for notification {notification.id}")
+
+
 def emit_realtime_event(event_type, data):
     """Emit a real-time event to all connected clients for immediate UI updates."""
     print(f"[REALTIME] Attempting to emit {event_type}.update event with data ID: {data.get('id', 'unknown')}")
@@ -405,11 +451,74 @@ def _send_webhook_for_notification(notification, data=None):
         current_app.logger.exception(f"Error sending webhook for notification {notification.id}: {e}")
 
 
-# Update default handlers to also send webhooks
-def _default_comment_created_handler(comment):
-    # local import to avoid circular imports at module import time
+def _notify(notifications, data=None):
+    """Create notifications (dicts of `Notification` fields) in one transaction.
+
+    Recipients of identical notifications share one bulk insert and the
+    whole batch is committed once, so a failure leaves no partial set
+    behind for a retried hook to duplicate. Webhooks are then delivered
+    only to the recipients that configured one. Returns the new ids.
+    """
     from app.models.notification import Notification
+    from app.models.user import User
+
+    groups = {}
+    for notification in notifications:
+        fields = dict(notification)
+        user_id = fields.pop('user_id')
+        groups.setdefault(tuple(sorted(fields.items())), []).append(user_id)
+    if not groups:
+        return []
+    created = []
+    for fields, user_ids in groups.items():
+        user_ids = list(dict.fromkeys(user_ids))
+        created += zip(user_ids, Notification.bulk_create(user_ids, commit=False, **dict(fields)))
+    db.session.commit()
+
+    subscribers = {
+        row.id for row in db.session.query(User.id)
+        .filter(User.webhook_url.isnot(None), User.webhook_url != '')
+    }
+    webhook_ids = [nid for uid, nid in created if uid in subscribers]
+    if webhook_ids:
+        for notification in Notification.query.filter(Notification.id.in_(webhook_ids)):
+            _send_webhook_for_notification(notification, data)
+    return [nid for _, nid in created]
+
+
+def _notify_users(user_ids, type, message, related_id=None, related_type=None, data=None):
+    """Create the same notification for every recipient (see `_notify`).
+
+    A broadcast to every user costs one INSERT plus a lookup of the (few)
+    webhook subscribers rather than a commit and a webhook check per user.
+    """
+    return _notify([
+        {'user_id': user_id, 'type': type, 'message': message,
+         'related_id': related_id, 'related_type': related_type}
+        for user_id in user_ids
+    ], data)
+
+
+def _ticket_parties(ticket, exclude_id=None):
+    """(requester_id, assignee_id) of `ticket`, None for unset ones and for `exclude_id`."""
+    return tuple(
+        user_id if user_id and (not exclude_id or str(user_id) != str(exclude_id)) else None
+        for user_id in (ticket.requester_id, ticket.assignee_id)
+    )
+
+
+def _broadcast_recipients(query, exclude_id=None):
+    """Return the ids selected by a User query, minus the acting user."""
+    from app.models.user import User
 
+    return [
+        row.id for row in query.with_entities(User.id)
+        if not exclude_id or str(row.id) != str(exclude_id)
+    ]
+
+
+# Update default handlers to also send webhooks
+def _default_comment_created_handler(comment):
     ticket = getattr(comment, 'ticket', None)
     author = getattr(comment, 'author', None)
     author_label = (author.name or author.email) if author is not None else 'Someone'
@@ -417,137 +526,83 @@ def _default_comment_created_handler(comment):
     if ticket is None:
         return
 
-    comment_data = comment.to_dict()  # Include full comment data for UI updates
-
-    # Notify ticket requester if not the author
-    if ticket.requester_id and str(ticket.requester_id) != str(comment.author_id):
-        notification = Notification(
-            user_id=ticket.requester_id,
-            type='comment_on_ticket',
-            message=f'New comment on your ticket "{ticket.subject}" by {author_label}',
-            related_id=comment.id,
-            related_type='comment'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification, comment_data)
+    # The first comment by someone other than the requester is the first response
+    ticket.record_first_response(comment.author_id, comment.created_at)
 
-    # Notify ticket assignee if not the author
-    if ticket.assignee_id and str(ticket.assignee_id) != str(comment.author_id):
-        notification = Notification(
-            user_id=ticket.assignee_id,
-            type='comment_on_ticket',
-            message=f'New comment on assigned ticket "{ticket.subject}" by {author_label}',
-            related_id=comment.id,
-            related_type='comment'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification, comment_data)
+    comment_data = comment.to_dict()  # Include full comment data for UI updates
+    related = {'related_id': comment.id, 'related_type': 'comment'}
+    notifications = []
+
+    # Notify ticket requester and assignee if not the author
+    requester_id, assignee_id = _ticket_parties(ticket, exclude_id=comment.author_id)
+    if requester_id:
+        notifications.append({'user_id': requester_id, 'type': 'comment_on_ticket', **related,
+                              'message': f'New comment on your ticket "{ticket.subject}" by {author_label}'})
+    if assignee_id:
+        notifications.append({'user_id': assignee_id, 'type': 'comment_on_ticket', **related,
+                              'message': f'New comment on assigned ticket "{ticket.subject}" by {author_label}'})
 
     # If replying to a comment, notify the parent comment author if not the same
     parent = getattr(comment, 'parent_comment', None)
     if parent is not None and str(parent.author_id) != str(comment.author_id):
-        notification = Notification(
-            user_id=parent.author_id,
-            type='reply_to_comment',
-            message=f'{author_label} replied to your comment on ticket "{ticket.subject}"',
-            related_id=comment.id,
-            related_type='comment'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification, comment_data)
+        notifications.append({'user_id': parent.author_id, 'type': 'reply_to_comment', **related,
+                              'message': f'{author_label} replied to your comment on ticket "{ticket.subject}"'})
 
-    # Invalidate notifications cache since new notifications were created
-    cache.delete('notifications_list')
+    side_effect('notify', _notify, notifications, comment_data)
 
 
 def _default_comment_updated_handler(comment):
-    from app.models.notification import Notification
-
     ticket = getattr(comment, 'ticket', None)
     if ticket is None:
         return
-    
-    # Get the current user who made the update
-    from flask_jwt_extended import get_jwt_identity
-    try:
-        current_user_id = str(get_jwt_identity())
-    except:
-        current_user_id = None
-    
-    comment_data = comment.to_dict()  # Include full comment data for UI updates
-    
-    if ticket.requester_id and (not current_user_id or str(ticket.requester_id) != current_user_id):
-        notification = Notification(
-            user_id=ticket.requester_id,
-            type='comment_updated',
-            message=f'A comment on your ticket "{ticket.subject}" was updated',
-            related_id=comment.id,
-            related_type='comment'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification, comment_data)
-    
-    if ticket.assignee_id and (not current_user_id or str(ticket.assignee_id) != current_user_id):
-        notification = Notification(
-            user_id=ticket.assignee_id,
-            type='comment_updated',
-            message=f'A comment on assigned ticket "{ticket.subject}" was updated',
-            related_id=comment.id,
-            related_type='comment'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification, comment_data)
 
-    # Invalidate notifications cache since new notifications were created
-    cache.delete('notifications_list')
+    # Notify requester and assignee, excluding the user who made the update
+    requester_id, assignee_id = _ticket_parties(ticket, exclude_id=_current_user_id())
+    related = {'related_id': comment.id, 'related_type': 'comment'}
+    notifications = []
+    if requester_id:
+        notifications.append({'user_id': requester_id, 'type': 'comment_updated', **related,
+                              'message': f'A comment on your ticket "{ticket.subject}" was updated'})
+    if assignee_id:
+        notifications.append({'user_id': assignee_id, 'type': 'comment_updated', **related,
+                              'message': f'A comment on assigned ticket "{ticket.subject}" was updated'})
 
+    comment_data = comment.to_dict()  # Include full comment data for UI updates
+    side_effect('notify', _notify, notifications, comment_data)
 
-def _default_comment_deleted_handler(comment):
-    from app.models.notification import Notification
 
+def _default_comment_deleted_handler(comment):
     ticket = getattr(comment, 'ticket', None)
     if ticket is None:
         return
-    
-    if ticket.requester_id:
-        notification = Notification(
-            user_id=ticket.requester_id,
-            type='comment_deleted',
-            message=f'A comment on your ticket "{ticket.subject}" was deleted',
-            related_id=comment.id,
-            related_type='comment'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification)
-    
-    if ticket.assignee_id:
-        notification = Notification(
-            user_id=ticket.assignee_id,
-            type='comment_deleted',
-            message=f'A comment on assigned ticket "{ticket.subject}" was deleted',
-            related_id=comment.id,
-            related_type='comment'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification)
 
-    # Invalidate notifications cache since new notifications were created
-    cache.delete('notifications_list')
+    requester_id, assignee_id = _ticket_parties(ticket)
+    related = {'related_id': comment.id, 'related_type': 'comment'}
+    notifications = []
+    if requester_id:
+        notifications.append({'user_id': requester_id, 'type': 'comment_deleted', **related,
+                              'message': f'A comment on your ticket "{ticket.subject}" was deleted'})
+    if assignee_id:
+        notifications.append({'user_id': assignee_id, 'type': 'comment_deleted', **related,
+                              'message': f'A comment on assigned ticket "{ticket.subject}" was deleted'})
+    side_effect('notify', _notify, notifications)
 
 
 def _default_ticket_created_handler(ticket):
-    from app.models.notification import Notification
     from app.models.conversation import Conversation
     from app.models.conversation_participant import ConversationParticipant
 
-    # Create a conversation for the ticket
-    conv = Conversation(
-        type='ticket',
-        title=f"Ticket #{ticket.ticket_id}: {ticket.subject}",
-        ticket_id=ticket.id,
-        created_by_id=ticket.requester_id or ticket.assignee_id  # Use requester or assignee as creator
-    )
-    conv.save()
+    # Create a conversation for the ticket, reusing the one a failed earlier
+    # attempt of this handler may already have created
+    conv = Conversation.query.filter_by(ticket_id=ticket.id, type='ticket').first()
+    if conv is None:
+        conv = Conversation(
+            type='ticket',
+            title=f"Ticket #{ticket.ticket_id}: {ticket.subject}",
+            ticket_id=ticket.id,
+            created_by_id=ticket.requester_id or ticket.assignee_id  # Use requester or assignee as creator
+        )
+        conv.save()
 
     # Add participants: requester and assignee
     # Add participants: requester and assignee (deduplicate and tolerate races)
@@ -587,141 +642,81 @@ def _default_ticket_created_handler(ticket):
     # Notify all admins about new ticket (exclude the creator if they are an admin)
     from app.models.user import User
     creator_id = ticket.requester_id or ticket.assignee_id
-    admins = User.active().filter(User.role.ilike('ADMIN')).all()
-    for admin in admins:
-        if creator_id and str(admin.id) == str(creator_id):
-            continue  # Skip notifying the creator if they are an admin
-        notification = Notification(
-            user_id=admin.id,
-            type='new_ticket',
-            message=f'New ticket created: "{ticket.subject}"',
-            related_id=ticket.id,
-            related_type='ticket'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification)
+    admin_ids = _broadcast_recipients(User.active().filter(User.role.ilike('ADMIN')), exclude_id=creator_id)
+    side_effect(
+        'notify_admins', _notify_users,
+        admin_ids,
+        type='new_ticket',
+        message=f'New ticket created: "{ticket.subject}"',
+        related_id=ticket.id,
+        related_type='ticket'
+    )
 
     # Notify the assignee that they have been assigned this ticket (only if different from creator)
     if ticket.assignee_id and (not creator_id or str(ticket.assignee_id) != str(creator_id)):
         try:
-            assignee_notification = Notification(
-                user_id=ticket.assignee_id,
-                type='ticket_assigned',
-                message=f'You have been assigned ticket "{ticket.subject}"',
-                related_id=ticket.id,
-                related_type='ticket'
-            )
-            assignee_notification.save()
-            _send_webhook_for_notification(assignee_notification, ticket.to_dict())
+            side_effect('notify_assignee', _notify, [{
+                'user_id': ticket.assignee_id,
+                'type': 'ticket_assigned',
+                'message': f'You have been assigned ticket "{ticket.subject}"',
+                'related_id': ticket.id,
+                'related_type': 'ticket',
+            }], ticket.to_dict())
         except Exception:
             # Ensure hook errors don't break ticket creation flow
             import logging
 
             logging.exception('error creating assignee notification')
 
-    # Invalidate notifications cache since new notifications were created
-    cache.delete('notifications_list')
-
 
 def _default_ticket_updated_handler(ticket):
-    from app.models.notification import Notification
-
-    # Get the current user who made the update (from Flask-JWT-Extended)
-    from flask_jwt_extended import get_jwt_identity
-    try:
-        current_user_id = str(get_jwt_identity())
-    except:
-        current_user_id = None
-
     # Notify requester and assignee about ticket updates (exclude the updater)
-    ticket_data = ticket.to_dict()  # Include full ticket data for UI updates
-    
-    if ticket.requester_id and (not current_user_id or str(ticket.requester_id) != current_user_id):
-        notification = Notification(
-            user_id=ticket.requester_id,
-            type='ticket_updated',
-            message=f'Your ticket "{ticket.subject}" was updated',
-            related_id=ticket.id,
-            related_type='ticket'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification, ticket_data)
-
-    if ticket.assignee_id and (not current_user_id or str(ticket.assignee_id) != current_user_id):
-        notification = Notification(
-            user_id=ticket.assignee_id,
-            type='ticket_updated',
-            message=f'Assigned ticket "{ticket.subject}" was updated',
-            related_id=ticket.id,
-            related_type='ticket'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification, ticket_data)
+    requester_id, assignee_id = _ticket_parties(ticket, exclude_id=_current_user_id())
+    related = {'related_id': ticket.id, 'related_type': 'ticket'}
+    notifications = []
+    if requester_id:
+        notifications.append({'user_id': requester_id, 'type': 'ticket_updated', **related,
+                              'message': f'Your ticket "{ticket.subject}" was updated'})
+    if assignee_id:
+        notifications.append({'user_id': assignee_id, 'type': 'ticket_updated', **related,
+                              'message': f'Assigned ticket "{ticket.subject}" was updated'})
 
-    # Invalidate notifications cache since new notifications were created
-    cache.delete('notifications_list')
+    ticket_data = ticket.to_dict()  # Include full ticket data for UI updates
+    side_effect('notify', _notify, notifications, ticket_data)
 
 
 def _default_ticket_deleted_handler(ticket):
-    from app.models.notification import Notification
-
     # Notify requester and assignee about ticket deletion
-    if ticket.requester_id:
-        notification = Notification(
-            user_id=ticket.requester_id,
-            type='ticket_deleted',
-            message=f'Your ticket "{ticket.subject}" was deleted',
-            related_id=ticket.id,
-            related_type='ticket'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification)
-
-    if ticket.assignee_id:
-        notification = Notification(
-            user_id=ticket.assignee_id,
-            type='ticket_deleted',
-            message=f'Assigned ticket "{ticket.subject}" was deleted',
-            related_id=ticket.id,
-            related_type='ticket'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification)
-
-    # Invalidate notifications cache since new notifications were created
-    cache.delete('notifications_list')
+    requester_id, assignee_id = _ticket_parties(ticket)
+    related = {'related_id': ticket.id, 'related_type': 'ticket'}
+    notifications = []
+    if requester_id:
+        notifications.append({'user_id': requester_id, 'type': 'ticket_deleted', **related,
+                              'message': f'Your ticket "{ticket.subject}" was deleted'})
+    if assignee_id:
+        notifications.append({'user_id': assignee_id, 'type': 'ticket_deleted', **related,
+                              'message': f'Assigned ticket "{ticket.subject}" was deleted'})
+    side_effect('notify', _notify, notifications)
 
 
 def _default_user_created_handler(user):
     from app.models.notification import Notification
 
     # Get the current user who created this user
-    from flask_jwt_extended import get_jwt_identity
-    try:
-        current_user_id = str(get_jwt_identity())
-    except:
-        current_user_id = None
+    current_user_id = _current_user_id()
 
     # Notify all admins about new user (exclude the creator if they are an admin)
     from app.models.user import User
-    admins = User.active().filter(User.role.ilike('ADMIN')).all()
+    admin_ids = _broadcast_recipients(User.active().filter(User.role.ilike('ADMIN')), exclude_id=current_user_id)
     user_data = user.to_dict()  # Include full user data for UI updates
-    
-    for admin in admins:
-        if current_user_id and str(admin.id) == current_user_id:
-            continue  # Skip notifying the creator if they are an admin
-        notification = Notification(
-            user_id=admin.id,
-            type='user_created',
-            message=f'New user "{user.name or user.email}" was created',
-            related_id=user.id,
-            related_type='user'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification, user_data)
-
-    # Invalidate notifications cache since new notifications were created
-    cache.delete('notifications_list')
+    _notify_users(
+        admin_ids,
+        type='user_created',
+        message=f'New user "{user.name or user.email}" was created',
+        related_id=user.id,
+        related_type='user',
+        data=user_data
+    )
 
 
 def _default_user_updated_handler(user):
@@ -737,54 +732,36 @@ def _default_user_deleted_handler(user):
 
     # Notify all admins about user deactivation
     from app.models.user import User
-    admins = User.active().filter(User.role.ilike('ADMIN')).all()
+    admin_ids = _broadcast_recipients(User.active().filter(User.role.ilike('ADMIN')))
     user_data = user.to_dict()  # Include full user data for UI updates
-    
-    for admin in admins:
-        notification = Notification(
-            user_id=admin.id,
-            type='user_deactivated',
-            message=f'User "{user.name or user.email}" was deactivated',
-            related_id=user.id,
-            related_type='user'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification, user_data)
-
-    # Invalidate notifications cache since new notifications were created
-    cache.delete('notifications_list')
+    _notify_users(
+        admin_ids,
+        type='user_deactivated',
+        message=f'User "{user.name or user.email}" was deactivated',
+        related_id=user.id,
+        related_type='user',
+        data=user_data
+    )
 
 
 def _default_kb_article_created_handler(article):
     from app.models.notification import Notification
 
     # Get the current user who created this article
-    from flask_jwt_extended import get_jwt_identity
-    try:
-        current_user_id = str(get_jwt_identity())
-    except:
-        current_user_id = None
+    current_user_id = _current_user_id()
 
     # Notify all users about new KB article (exclude the creator)
     from app.models.user import User
-    users = User.active().all()
+    user_ids = _broadcast_recipients(User.active(), exclude_id=current_user_id)
     article_data = article.to_dict()  # Include full article data for UI updates
-    
-    for user in users:
-        if current_user_id and str(user.id) == current_user_id:
-            continue  # Skip notifying the creator
-        notification = Notification(
-            user_id=user.id,
-            type='kb_article_created',
-            message=f'New knowledge base article: "{article.title}"',
-            related_id=article.id,
-            related_type='kb_article'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification, article_data)
-
-    # Invalidate notifications cache since new notifications were created
-    cache.delete('notifications_list')
+    _notify_users(
+        user_ids,
+        type='kb_article_created',
+        message=f'New knowledge base article: "{article.title}"',
+        related_id=article.id,
+        related_type='kb_article',
+        data=article_data
+    )
 
 
 def _default_kb_article_updated_handler(article):
@@ -804,126 +781,72 @@ def _default_kb_article_deleted_handler(article):
 
 
 def _default_attachment_created_handler(attachment):
-    from app.models.notification import Notification
-
     ticket = getattr(attachment, 'ticket', None)
     if ticket is None:
         return
 
-    # Get the current user who uploaded the attachment
-    from flask_jwt_extended import get_jwt_identity
-    try:
-        current_user_id = str(get_jwt_identity())
-    except:
-        current_user_id = None
+    # Notify ticket requester and assignee, excluding the user who uploaded it
+    requester_id, assignee_id = _ticket_parties(ticket, exclude_id=_current_user_id())
+    related = {'related_id': attachment.id, 'related_type': 'attachment'}
+    notifications = []
+    if requester_id:
+        notifications.append({'user_id': requester_id, 'type': 'attachment_added', **related,
+                              'message': f'New attachment "{attachment.filename}" added to ticket "{ticket.subject}"'})
+    if assignee_id:
+        notifications.append({
+            'user_id': assignee_id, 'type': 'attachment_added', **related,
+            'message': f'New attachment "{attachment.filename}" added to assigned ticket "{ticket.subject}"',
+        })
 
     attachment_data = attachment.to_dict()  # Include full attachment data for UI updates
-
-    # Notify ticket requester and assignee about new attachment (exclude the uploader)
-    if ticket.requester_id and (not current_user_id or str(ticket.requester_id) != current_user_id):
-        notification = Notification(
-            user_id=ticket.requester_id,
-            type='attachment_added',
-            message=f'New attachment "{attachment.filename}" added to ticket "{ticket.subject}"',
-            related_id=attachment.id,
-            related_type='attachment'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification, attachment_data)
-
-    if ticket.assignee_id and (not current_user_id or str(ticket.assignee_id) != current_user_id):
-        notification = Notification(
-            user_id=ticket.assignee_id,
-            type='attachment_added',
-            message=f'New attachment "{attachment.filename}" added to assigned ticket "{ticket.subject}"',
-            related_id=attachment.id,
-            related_type='attachment'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification, attachment_data)
-
-    # Invalidate notifications cache since new notifications were created
-    cache.delete('notifications_list')
+    side_effect('notify', _notify, notifications, attachment_data)
 
 
 def _default_attachment_updated_handler(attachment):
-    from app.models.notification import Notification
-
     ticket = getattr(attachment, 'ticket', None)
     if ticket is None:
         return
 
-    # Get the current user who updated the attachment
-    from flask_jwt_extended import get_jwt_identity
-    try:
-        current_user_id = str(get_jwt_identity())
-    except:
-        current_user_id = None
-
-    # Notify ticket requester and assignee about attachment updates (exclude the updater)
-    if ticket.requester_id and (not current_user_id or str(ticket.requester_id) != current_user_id):
-        notification = Notification(
-            user_id=ticket.requester_id,
-            type='attachment_updated',
-            message=f'Attachment "{attachment.filename}" on ticket "{ticket.subject}" was updated',
-            related_id=attachment.id,
-            related_type='attachment'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification)
-
-    if ticket.assignee_id and (not current_user_id or str(ticket.assignee_id) != current_user_id):
-        notification = Notification(
-            user_id=ticket.assignee_id,
-            type='attachment_updated',
-            message=f'Attachment "{attachment.filename}" on assigned ticket "{ticket.subject}" was updated',
-            related_id=attachment.id,
-            related_type='attachment'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification)
-
-    # Invalidate notifications cache since new notifications were created
-    cache.delete('notifications_list')
+    # Notify ticket requester and assignee, excluding the user who updated it
+    requester_id, assignee_id = _ticket_parties(ticket, exclude_id=_current_user_id())
+    related = {'related_id': attachment.id, 'related_type': 'attachment'}
+    notifications = []
+    if requester_id:
+        notifications.append({
+            'user_id': requester_id, 'type': 'attachment_updated', **related,
+            'message': f'Attachment "{attachment.filename}" on ticket "{ticket.subject}" was updated',
+        })
+    if assignee_id:
+        notifications.append({
+            'user_id': assignee_id, 'type': 'attachment_updated', **related,
+            'message': f'Attachment "{attachment.filename}" on assigned ticket "{ticket.subject}" was updated',
+        })
+    side_effect('notify', _notify, notifications)
 
 
 def _default_attachment_deleted_handler(attachment):
-    from app.models.notification import Notification
-
     ticket = getattr(attachment, 'ticket', None)
     if ticket is None:
         return
 
     # Notify ticket requester and assignee about attachment deletion
-    if ticket.requester_id:
-        notification = Notification(
-            user_id=ticket.requester_id,
-            type='attachment_deleted',
-            message=f'Attachment "{attachment.filename}" on ticket "{ticket.subject}" was deleted',
-            related_id=attachment.id,
-            related_type='attachment'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification)
-
-    if ticket.assignee_id:
-        notification = Notification(
-            user_id=ticket.assignee_id,
-            type='attachment_deleted',
-            message=f'Attachment "{attachment.filename}" on assigned ticket "{ticket.subject}" was deleted',
-            related_id=attachment.id,
-            related_type='attachment'
-        )
-        notification.save()
-        _send_webhook_for_notification(notification)
-
-    # Invalidate notifications cache since new notifications were created
-    cache.delete('notifications_list')
+    requester_id, assignee_id = _ticket_parties(ticket)
+    related = {'related_id': attachment.id, 'related_type': 'attachment'}
+    notifications = []
+    if requester_id:
+        notifications.append({
+            'user_id': requester_id, 'type': 'attachment_deleted', **related,
+            'message': f'Attachment "{attachment.filename}" on ticket "{ticket.subject}" was deleted',
+        })
+    if assignee_id:
+        notifications.append({
+            'user_id': assignee_id, 'type': 'attachment_deleted', **related,
+            'message': f'Attachment "{attachment.filename}" on assigned ticket "{ticket.subject}" was deleted',
+        })
+    side_effect('notify', _notify, notifications)
 
 
 def _default_message_created_handler(message):
-    from app.models.notification import Notification
-
     conversation = getattr(message, 'conversation', None)
     sender = getattr(message, 'sender', None)
     sender_label = (sender.name or sender.email) if sender is not None else 'Someone'
@@ -931,50 +854,47 @@ def _default_message_created_handler(message):
     if conversation is None:
         return
 
+    # Replies in a ticket's conversation count as a response to the ticket
+    ticket = getattr(conversation, 'ticket', None)
+    if ticket is not None and message.message_type != 'system':
+        ticket.record_first_response(message.sender_id, message.created_at)
+
     message_data = message.to_dict()  # Include full message data for UI updates
 
     # Create message preview (truncate to 50 characters)
     message_preview = message.content[:50] + ('...' if len(message.content) > 50 else '')
 
+    # Determine the conversation title shown to recipients
+    if conversation.type == 'direct':
+        # For direct messages: "Joseph: Hello how are you..."
+        notification_message = f'{sender_label}: {message_preview}'
+        conv_title = sender_label
+    else:
+        # For group/ticket: "Joseph in Healplus: Hello everyone..."
+        conv_title = conversation.title or f"{conversation.type.title()} Conversation"
+        notification_message = f'{sender_label} in {conv_title}: {message_preview}'
+
     # Notify all participants except sender
-    participants = conversation.participants
-    for p in participants:
-        if str(p.user_id) != str(message.sender_id):
-            # Determine conversation title for this user
-            if conversation.type == 'direct':
-                # For direct messages: "Joseph: Hello how are you..."
-                notification_message = f'{sender_label}: {message_preview}'
-                conv_title = sender_label
-            else:
-                # For group/ticket: "Joseph in Healplus: Hello everyone..."
-                conv_title = conversation.title or f"{conversation.type.title()} Conversation"
-                notification_message = f'{sender_label} in {conv_title}: {message_preview}'
-
-            notification = Notification(
-                user_id=p.user_id,
-                type='message_on_conversation',
-                message=notification_message,
-                related_id=message.id,
-                related_type='message',
-                conversation_id=conversation.id,
-                conversation_title=conv_title
-            )
-            notification.save()
-            _send_webhook_for_notification(notification, message_data)
-
-    # Invalidate notifications cache since new notifications were created
-    cache.delete('notifications_list')
+    recipients = [p.user_id for p in conversation.participants if str(p.user_id) != str(message.sender_id)]
+    side_effect('notify', _notify, [{
+        'user_id': user_id,
+        'type': 'message_on_conversation',
+        'message': notification_message,
+        'related_id': message.id,
+        'related_type': 'message',
+        'conversation_id': conversation.id,
+        'conversation_title': conv_title,
+    } for user_id in recipients], message_data)
 
 
 def _default_message_deleted_handler(message):
-    from app.models.notification import Notification
-
     conversation = getattr(message, 'conversation', None)
     if conversation is None:
         return
 
     # Notify all participants
     participants = conversation.participants
+    notifications = []
     for p in participants:
         # Determine conversation title for this user
         if conversation.type == 'direct':
@@ -988,20 +908,16 @@ def _default_message_deleted_handler(message):
         else:
             conv_title = conversation.title or f"{conversation.type.title()} Conversation"
 
-        notification = Notification(
-            user_id=p.user_id,
-            type='message_deleted',
-            message=f'A message was deleted from {conv_title}',
-            related_id=message.id,
-            related_type='message',
-            conversation_id=conversation.id,
-            conversation_title=conv_title
-        )
-        notification.save()
-        _send_webhook_for_notification(notification)
-
-    # Invalidate notifications cache since new notifications were created
-    cache.delete('notifications_list')
+        notifications.append({
+            'user_id': p.user_id,
+            'type': 'message_deleted',
+            'message': f'A message was deleted from {conv_title}',
+            'related_id': message.id,
+            'related_type': 'message',
+            'conversation_id': conversation.id,
+            'conversation_title': conv_title,
+        })
+    side_effect('notify', _notify, notifications)
 
 
 def _default_conversation_created_handler(conversation):
@@ -1009,6 +925,12 @@ def _default_conversation_created_handler(conversation):
     pass
 
 
+def _default_monitor_alert_handler(monitor, events):
+    from app.monitoring.alerts import handle_alert_events
+
+    handle_alert_events(monitor, events)
+
+
 # Register defaults
 register('comment.created', _default_comment_created_handler)
 register('comment.updated', _default_comment_updated_handler)
@@ -1028,3 +950,4 @@ register('attachment.deleted', _default_attachment_deleted_handler)
 register('message.created', _default_message_created_handler)
 register('message.deleted', _default_message_deleted_handler)
 register('conversation.created', _default_conversation_created_handler)
+register('monitor.alert', _default_monitor_alert_handler)
@@ -0,0 +1,193 @@
+"""Full-text search over knowledge base articles.
+
+On PostgreSQL each article carries a weighted ``tsvector`` (title 'A',
+content 'B') in `KnowledgeBaseArticle.search_vector`, backed by a GIN
+index. It is set from the mapper events below whenever an article is
+inserted or its title or content change, so it is written in the same
+statement as the article itself. Matches are ranked with ``ts_rank_cd``
+and snippets come from ``ts_headline``.
+
+SQLite has no tsvector type; there the column is plain (unused) text and
+an FTS5 table, ``kb_articles_fts``, is created alongside ``kb_articles``
+and kept in sync from the same events. Matches are ranked with ``bm25``
+and snippets come from ``snippet``. This is what the tests run against
+when no PostgreSQL server is available.
+
+Both snippet functions return article content verbatim, so matches are
+delimited with control characters and the snippet is HTML-escaped before
+those are replaced with ``<mark>`` tags.
+
+``flask reindex-kb`` rebuilds the index for existing articles.
+"""
+
+import html
+import re
+
+from sqlalchemy import DDL, column, event, func, literal_column, table
+from sqlalchemy.orm import attributes, selectinload
+
+from app.models.base import db
+
+# Text search configuration used to parse articles and queries
+SEARCH_CONFIG = 'english'
+
+# Markers placed around matched terms in snippets
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+
+# Stand-ins for the markers while the snippet is built and escaped
+_START = '\x02'
+_STOP = '\x03'
+
+_HEADLINE_OPTIONS = f'StartSel={_START}, StopSel={_STOP}, MaxWords=35, MinWords=15, MaxFragments=2'
+
+_fts = table('kb_articles_fts', column('article_id'), column('title'), column('content'))
+
+
+def _search_vector(title, content):
+    """Weighted tsvector of an article's title and content (PostgreSQL)."""
+    return func.setweight(func.to_tsvector(SEARCH_CONFIG, func.coalesce(title, '')), 'A').op('||')(
+        func.setweight(func.to_tsvector(SEARCH_CONFIG, func.coalesce(content, '')), 'B')
+    )
+
+
+def _changed(target):
+    return any(attributes.get_history(target, name).has_changes() for name in ('title', 'content'))
+
+
+def _set_search_vector(mapper, connection, target):
+    if connection.dialect.name == 'postgresql':
+        target.search_vector = _search_vector(target.title, target.content)
+
+
+def _update_search_vector(mapper, connection, target):
+    if connection.dialect.name == 'postgresql' and _changed(target):
+        target.search_vector = _search_vector(target.title, target.content)
+
+
+def _fts_key(article_id):
+    # Same representation SQLAlchemy uses for UUIDs in SQLite columns
+    return article_id.hex
+
+
+def _fts_insert(mapper, connection, target):
+    if connection.dialect.name != 'sqlite':
+        return
+    connection.execute(_fts.delete().where(_fts.c.article_id == _fts_key(target.id)))
+    connection.execute(_fts.insert().values(article_id=_fts_key(target.id), title=target.title,
+                                            content=target.content))
+
+
+def _fts_update(mapper, connection, target):
+    if _changed(target):
+        _fts_insert(mapper, connection, target)
+
+
+def _fts_delete(mapper, connection, target):
+    if connection.dialect.name == 'sqlite':
+        connection.execute(_fts.delete().where(_fts.c.article_id == _fts_key(target.id)))
+
+
+def index_articles(model):
+    """Keep `model`'s search index in sync with its rows (see module docstring)."""
+    event.listen(model, 'before_insert', _set_search_vector)
+    event.listen(model, 'before_update', _update_search_vector)
+    event.listen(model, 'after_insert', _fts_insert)
+    event.listen(model, 'after_update', _fts_update)
+    event.listen(model, 'after_delete', _fts_delete)
+    event.listen(model.__table__, 'after_create', DDL(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS kb_articles_fts USING fts5(article_id UNINDEXED, title, content)'
+    ).execute_if(dialect='sqlite'))
+    event.listen(model.__table__, 'before_drop', DDL(
+        'DROP TABLE IF EXISTS kb_articles_fts'
+    ).execute_if(dialect='sqlite'))
+
+
+def reindex_articles():
+    """Rebuild the search index of every article; returns the number indexed."""
+    from app.models.kb import KnowledgeBaseArticle
+
+    articles = KnowledgeBaseArticle.__table__
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        result = db.session.execute(
+            articles.update().values(search_vector=_search_vector(articles.c.title, articles.c.content))
+        )
+        db.session.commit()
+        return result.rowcount
+    if dialect == 'sqlite':
+        db.session.execute(_fts.delete())
+        result = db.session.execute(
+            _fts.insert().from_select(['article_id', 'title', 'content'],
+                                      db.select(articles.c.id, articles.c.title, articles.c.content))
+        )
+        db.session.commit()
+        return result.rowcount
+    return 0
+
+
+def _fts_query(q):
+    """FTS5 query matching every word of `q` (free text can't be passed as-is)."""
+    words = re.findall(r'\w+', q)
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def _highlight(snippet):
+    """HTML-escaped `snippet` with only the match markers as markup."""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(_START, HIGHLIGHT_START).replace(_STOP, HIGHLIGHT_STOP)
+
+
+def search_articles(q, tags=(), limit=20, offset=0):
+    """Active articles matching `q` and having every tag in `tags`.
+
+    Returns ``(total, [(article, rank, snippet), ...])``, best match first.
+    Snippets are HTML with matches in ``<mark>`` and are built only for the
+    returned page.
+    """
+    from app.models.kb import KnowledgeBaseArticle, Tag
+
+    Article = KnowledgeBaseArticle
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        rank = func.ts_rank_cd(Article.search_vector, query)
+        matches = db.session.query(Article.id, rank.label('rank')) \
+            .filter(Article.search_vector.op('@@')(query))
+    elif dialect == 'sqlite':
+        fts_query = _fts_query(q)
+        if not fts_query:
+            return 0, []
+        # bm25 is lower for better matches; titles weigh 10x the content
+        rank = -func.bm25(literal_column('kb_articles_fts'), 0.0, 10.0, 1.0)
+        matches = db.session.query(Article.id, rank.label('rank')) \
+            .join(_fts, _fts.c.article_id == Article.id) \
+            .filter(literal_column('kb_articles_fts').op('MATCH')(fts_query))
+    else:
+        raise NotImplementedError(f'KB search is not supported on {dialect}')
+
+    matches = matches.filter(Article.is_deleted == False)  # noqa: E712
+    for name in tags:
+        matches = matches.filter(Article.tags.any(Tag.name == name))
+
+    total = matches.order_by(None).count()
+    page = matches.order_by(rank.desc(), Article.id).limit(limit).offset(offset).all()
+    if not page:
+        return total, []
+
+    ids = [article_id for article_id, _ in page]
+    if dialect == 'postgresql':
+        snippets = dict(db.session.query(
+            Article.id, func.ts_headline(SEARCH_CONFIG, Article.content, query, _HEADLINE_OPTIONS),
+        ).filter(Article.id.in_(ids)))
+    else:
+        snippets = dict(db.session.query(
+            Article.id,
+            func.snippet(literal_column('kb_articles_fts'), 2, _START, _STOP, '…', 24),
+        ).join(_fts, _fts.c.article_id == Article.id)
+            .filter(literal_column('kb_articles_fts').op('MATCH')(fts_query))
+            .filter(Article.id.in_(ids)))
+    articles = {a.id: a for a in Article.query.options(selectinload(Article.tags)).filter(Article.id.in_(ids))}
+    return total, [(articles[article_id], float(rank), _highlight(snippets.get(article_id)))
+                   for article_id, rank in page]
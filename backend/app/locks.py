@@ -0,0 +1,45 @@
+"""Cross-process locks for background jobs.
+
+Every worker process starts the same periodic jobs (stats reconcile,
+metric rollups), so on PostgreSQL a run takes an advisory lock first and
+other processes skip or wait. The lock is session-level and held on a
+connection of its own, so it spans jobs that commit several times. Other
+databases are used by a single process (SQLite in tests and development)
+and are not locked.
+"""
+
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from app.models.base import db
+
+# Advisory lock keys, one per job
+RECONCILE_LOCK_KEY = 0x7469636b
+ROLLUP_LOCK_KEY = 0x726f6c6c
+
+
+@contextmanager
+def advisory_lock(key, wait=True):
+    """Hold the advisory lock `key` for the duration of the block.
+
+    Yields True once the lock is held. Without `wait`, yields False
+    instead if another process holds it.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        yield True
+        return
+    connection = db.engine.connect()
+    params = {'key': key}
+    try:
+        if wait:
+            connection.execute(text('SELECT pg_advisory_lock(:key)'), params)
+        elif not connection.execute(text('SELECT pg_try_advisory_lock(:key)'), params).scalar():
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            connection.execute(text('SELECT pg_advisory_unlock(:key)'), params)
+    finally:
+        connection.close()
@@ -18,3 +18,8 @@ from .testing import *  # noqa: F401,F403
 from .message_read_status import *  # noqa: F401,F403
 from .server_monitor import *  # noqa: F401,F403
 from .module import *  # noqa: F401,F403
+from .webhook_dead_letter import *  # noqa: F401,F403
+from .metric_sample import *  # noqa: F401,F403
+from .metric_rollup import *  # noqa: F401,F403
+from .ticket_stat import *  # noqa: F401,F403
+from .ticket_daily_fact import *  # noqa: F401,F403
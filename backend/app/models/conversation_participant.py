@@ -9,10 +9,96 @@ class ConversationParticipant(BaseModel):
     user_id = db.Column(PG_UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
     role = db.Column(db.String(20), default='member', nullable=False)  # admin, member
 
+    # Read cursor: the newest message this participant has read. Messages are
+    # ordered by (created_at, id), so everything at or before
+    # (last_read_at, last_read_message_id) counts as read. last_read_at holds
+    # the message's created_at, not the time it was read.
+    last_read_message_id = db.Column(PG_UUID(as_uuid=True), db.ForeignKey('messages.id'), nullable=True)
+    last_read_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
     # Relationships
     conversation = db.relationship('Conversation', back_populates='participants')
     user = db.relationship('User', back_populates='conversation_participations')
 
     __table_args__ = (
         db.UniqueConstraint('conversation_id', 'user_id', name='unique_conversation_user'),
-    )
\ No newline at end of file
+    )
+
+    def has_read(self, message):
+        """Return True if `message` is at or before this participant's read cursor."""
+        if self.last_read_at is None:
+            return False
+        return (message.created_at, message.id) <= (self.last_read_at, self.last_read_message_id)
+
+    def unread_messages(self):
+        """Query for this conversation's messages after the read cursor."""
+        from app.models.message import Message
+        from app.pagination import keyset_condition
+
+        query = Message.active().filter_by(conversation_id=self.conversation_id)
+        if self.last_read_at is not None:
+            query = query.filter(keyset_condition(Message.created_at, Message.id,
+                                                  self.last_read_at, self.last_read_message_id,
+                                                  descending=False))
+        return query
+
+    @classmethod
+    def advance_read_cursor(cls, conversation_id, user_id, message):
+        """Move a participant's read cursor forward to `message` in one UPDATE.
+
+        The cursor never moves backwards: the WHERE clause only matches when
+        `message` is newer than the stored cursor. Returns True if it moved.
+        Does not commit.
+        """
+        from app.models.message import Message
+        from app.pagination import keyset_condition
+
+        newer = db.or_(
+            cls.last_read_at.is_(None),
+            keyset_condition(cls.last_read_at, cls.last_read_message_id,
+                             message.created_at, message.id),
+        )
+        updated = (db.session.query(cls)
+                   .filter(cls.conversation_id == conversation_id, cls.user_id == user_id)
+                   .filter(newer)
+                   .update({
+                       cls.last_read_message_id: message.id,
+                       # Copy the stored value so the cursor compares equal to
+                       # the message row on every backend
+                       cls.last_read_at: db.select(Message.created_at).where(Message.id == message.id).scalar_subquery(),
+                   }, synchronize_session=False))
+        return updated > 0
+
+    @classmethod
+    def backfill_read_cursors(cls, batch_size=500):
+        """Derive read cursors from legacy per-message MessageReadStatus rows.
+
+        Each participant without a cursor gets the newest message they have a
+        read-status row for. Safe to run repeatedly. Returns the number of
+        participants updated.
+        """
+        from app.models.message import Message
+        from app.models.message_read_status import MessageReadStatus
+
+        updated = 0
+        pending = cls.query.filter(cls.last_read_message_id.is_(None)).order_by(cls.id)
+        last_id = None
+        while True:
+            batch_query = pending if last_id is None else pending.filter(cls.id > last_id)
+            batch = batch_query.limit(batch_size).all()
+            if not batch:
+                break
+            for participant in batch:
+                latest = (db.session.query(Message.id, Message.created_at)
+                          .join(MessageReadStatus, MessageReadStatus.message_id == Message.id)
+                          .filter(MessageReadStatus.user_id == participant.user_id,
+                                  Message.conversation_id == participant.conversation_id)
+                          .order_by(Message.created_at.desc(), Message.id.desc())
+                          .first())
+                if latest is not None:
+                    participant.last_read_message_id = latest.id
+                    participant.last_read_at = latest.created_at
+                    updated += 1
+            last_id = batch[-1].id
+            db.session.commit()
+        return updated
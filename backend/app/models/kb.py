@@ -1,5 +1,7 @@
 from app.models.base import BaseModel, db
-from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID as PG_UUID
+from sqlalchemy.orm import deferred
+from app.kb_search import index_articles
 
 
 article_tags = db.Table('article_tags',
@@ -16,12 +18,22 @@ class KnowledgeBaseArticle(BaseModel):
     author_id = db.Column(PG_UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
     views = db.Column(db.Integer, default=0)
     is_public = db.Column(db.Boolean, default=True)
+    # Full-text search document; maintained by app/kb_search.py (unused text on SQLite)
+    search_vector = deferred(db.Column(TSVECTOR().with_variant(db.Text, 'sqlite'), nullable=True))
 
     author = db.relationship('User', back_populates='articles')
     tags = db.relationship('Tag', secondary=article_tags, back_populates='articles')
     # Optional media attached to knowledgebase articles
     media = db.relationship('Media', back_populates='kb_article', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_kb_articles_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+
+    def to_dict(self, exclude=None, include=None):
+        exclude = set(exclude or {'is_deleted', 'deleted_at'}) | {'search_vector'}
+        return super().to_dict(exclude=exclude, include=include)
+
 
 class Tag(BaseModel):
     __tablename__ = 'tags'
@@ -30,3 +42,6 @@ class Tag(BaseModel):
     color = db.Column(db.String(7), default='#3b82f6')
 
     articles = db.relationship('KnowledgeBaseArticle', secondary=article_tags, back_populates='tags')
+
+
+index_articles(KnowledgeBaseArticle)
@@ -16,4 +16,10 @@ class Message(BaseModel):
     sender = db.relationship('User', back_populates='messages')
     parent_message = db.relationship('Message', remote_side='Message.id', backref='replies')  # Self-referential for threading
     # Media attachments for this message
-    media = db.relationship('Media', back_populates='message', cascade='all, delete-orphan')
\ No newline at end of file
+    media = db.relationship('Media', back_populates='message', cascade='all, delete-orphan')
+
+    __table_args__ = (
+        # Backs keyset message windows: WHERE conversation_id = ?
+        # ORDER BY created_at, id
+        db.Index('ix_messages_conversation_created_id', 'conversation_id', 'created_at', 'id'),
+    )
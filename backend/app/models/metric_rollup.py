@@ -0,0 +1,52 @@
+from app.models.base import db
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+
+
+class MetricRollup(db.Model):
+    """Aggregate of one metric over a fixed bucket (5 minutes, 1 hour, 1 day).
+
+    Built from raw `MetricSample` rows (or from the next finer rollup tier)
+    by the rollup job in app/monitoring/rollup.py. `ts` is the bucket start
+    in epoch seconds and `resolution` its width in seconds. The sum is kept
+    instead of the average so coarser buckets can be combined exactly.
+    """
+    __tablename__ = 'metric_rollups'
+
+    monitor_id = db.Column(PG_UUID(as_uuid=True), db.ForeignKey('server_monitors.id', ondelete='CASCADE'),
+                           primary_key=True)
+    metric = db.Column(db.String(100), primary_key=True)
+    resolution = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    ts = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=False)
+    min = db.Column(db.Float, nullable=False)
+    max = db.Column(db.Float, nullable=False)
+    sum = db.Column(db.Float, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        # Rollup watermarks and per-tier retention scan by (resolution, ts)
+        db.Index('ix_metric_rollups_resolution_ts', 'resolution', 'ts'),
+    )
+
+    def to_dict(self):
+        return {
+            'monitor_id': str(self.monitor_id),
+            'metric': self.metric,
+            'resolution': self.resolution,
+            'ts': self.ts,
+            'min': self.min,
+            'max': self.max,
+            'avg': self.sum / self.count if self.count else None,
+            'count': self.count,
+        }
+
+
+class MetricLateBucket(db.Model):
+    """Start of a 5-minute bucket that received samples after it was rolled up.
+
+    Written on ingest for samples older than the rollup job recomputes on
+    its own (replayed agent spools, clock skew). The next rollup run takes
+    these marks and re-rolls every tier from the oldest one.
+    """
+    __tablename__ = 'metric_late_buckets'
+
+    ts = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=False)
@@ -0,0 +1,33 @@
+from app.models.base import db
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+
+
+class MetricSample(db.Model):
+    """One raw metric value reported by a monitoring agent.
+
+    Samples are narrow rows keyed by (monitor_id, metric, ts) rather than
+    BaseModel records: there is no surrogate id, soft delete or audit
+    timestamps, which keeps each row small and lets range scans for one
+    metric read a single contiguous slice of the primary key. `ts` is the
+    sample time in whole seconds since the Unix epoch (UTC).
+    """
+    __tablename__ = 'metric_samples'
+
+    monitor_id = db.Column(PG_UUID(as_uuid=True), db.ForeignKey('server_monitors.id', ondelete='CASCADE'),
+                           primary_key=True)
+    metric = db.Column(db.String(100), primary_key=True)  # e.g. 'cpu.percent', 'network.bytes_recv'
+    ts = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=False)
+    value = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (
+        # Retention deletes whole time ranges across every monitor
+        db.Index('ix_metric_samples_ts', 'ts'),
+    )
+
+    def to_dict(self):
+        return {
+            'monitor_id': str(self.monitor_id),
+            'metric': self.metric,
+            'ts': self.ts,
+            'value': self.value,
+        }
@@ -1,4 +1,9 @@
+import csv
+import io
+import uuid
+
 from app.models.base import BaseModel, db
+from app.notification_cache import record_changes, track_read_state
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 
 
@@ -18,21 +23,106 @@ class Notification(BaseModel):
     user = db.relationship('User', back_populates='notifications')
     conversation = db.relationship('Conversation', foreign_keys=[conversation_id])
 
-    def to_dict(self):
+    __table_args__ = (
+        # Backs the per-user feed: WHERE user_id = ? AND is_deleted = false
+        # ORDER BY created_at, plus the unread count and bulk mark-read
+        db.Index('ix_notifications_user_deleted_created', 'user_id', 'is_deleted', 'created_at'),
+    )
+
+    def to_dict(self, user_data=None):
+        """Serialize the notification.
+
+        Every notification in a feed belongs to the same recipient, so list
+        endpoints build the `user` summary once and pass it as `user_data`.
+        """
         data = super().to_dict()
-        # Include limited user info for notifications (exclude sensitive data)
-        if self.user:
-            data['user'] = {
-                'id': str(self.user.id),
-                'name': self.user.name,
-                'email': self.user.email,
-                'role': self.user.role,
-                'is_active': self.user.is_active,
-                'created_at': self.user.created_at.isoformat() + 'Z' if self.user.created_at else None,
-                'updated_at': self.user.updated_at.isoformat() + 'Z' if self.user.updated_at else None
-            }
-        else:
-            data['user'] = None
+        data['user'] = user_data if user_data is not None else self.user_summary(self.user)
         data['conversation_id'] = str(self.conversation_id) if self.conversation_id else None
         data['conversation_title'] = self.conversation_title
-        return data
\ No newline at end of file
+        return data
+
+    @staticmethod
+    def user_summary(user):
+        # Include limited user info for notifications (exclude sensitive data)
+        if not user:
+            return None
+        return {
+            'id': str(user.id),
+            'name': user.name,
+            'email': user.email,
+            'role': user.role,
+            'is_active': user.is_active,
+            'created_at': user.created_at.isoformat() + 'Z' if user.created_at else None,
+            'updated_at': user.updated_at.isoformat() + 'Z' if user.updated_at else None
+        }
+
+    # Above this many rows Postgres loads notifications with COPY instead of
+    # a batched multi-row INSERT.
+    COPY_THRESHOLD = 1000
+
+    _BULK_COLUMNS = ('id', 'user_id', 'type', 'message', 'related_id', 'related_type',
+                     'conversation_id', 'conversation_title', 'is_read', 'is_deleted')
+
+    @classmethod
+    def bulk_create(cls, user_ids, type, message, related_id=None, related_type=None,
+                    conversation_id=None, conversation_title=None, commit=True):
+        """Create the same notification for many recipients in one statement.
+
+        Ids are generated client-side so no RETURNING round trip is needed.
+        Postgres uses COPY for large batches; every other case goes through
+        SQLAlchemy's executemany, which psycopg2 turns into multi-row INSERTs
+        and SQLite runs as a single prepared statement. Returns the new ids
+        in recipient order.
+        """
+        rows = [{
+            'id': uuid.uuid4(),
+            'user_id': user_id,
+            'type': type,
+            'message': message,
+            'related_id': related_id,
+            'related_type': related_type,
+            'conversation_id': conversation_id,
+            'conversation_title': conversation_title,
+            'is_read': False,
+            'is_deleted': False,
+        } for user_id in dict.fromkeys(user_ids)]
+        if not rows:
+            return []
+
+        if db.engine.dialect.name == 'postgresql' and len(rows) >= cls.COPY_THRESHOLD:
+            cls._copy_rows(rows)
+        else:
+            db.session.execute(cls.__table__.insert(), rows)
+        # Core inserts skip ORM flush events, so report the new unread rows
+        record_changes(db.session, {row['user_id']: 1 for row in rows})
+        if commit:
+            db.session.commit()
+        return [row['id'] for row in rows]
+
+    @classmethod
+    def _copy_rows(cls, rows):
+        buf = io.StringIO()
+        # QUOTE_NONNUMERIC leaves None unquoted, which COPY reads as NULL
+        writer = csv.writer(buf, quoting=csv.QUOTE_NONNUMERIC)
+        for row in rows:
+            writer.writerow([_copy_value(row[col]) for col in cls._BULK_COLUMNS])
+        buf.seek(0)
+        cursor = db.session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f'COPY {cls.__tablename__} ({", ".join(cls._BULK_COLUMNS)}) FROM STDIN WITH (FORMAT csv)',
+                buf,
+            )
+        finally:
+            cursor.close()
+
+
+track_read_state(Notification)
+
+
+def _copy_value(value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return str(value)
@@ -10,7 +10,7 @@ class ServerMonitor(BaseModel):
     description = db.Column(db.Text)
 
     # API credentials for accessing the monitoring data
-    api_key = db.Column(db.Text, nullable=False)  # API key for authentication
+    api_key = db.Column(db.Text, nullable=False, index=True)  # API key for authentication
     api_secret = db.Column(db.Text)  # Optional additional secret
 
     # Server information
@@ -1,5 +1,8 @@
 from app.models.base import BaseModel, db
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from app.ticket_stats import apply_deltas, track_ticket_stats
+from app.ticket_facts import track_ticket_facts
+from datetime import timezone
 
 
 class Ticket(BaseModel):
@@ -11,6 +14,8 @@ class Ticket(BaseModel):
     status = db.Column(db.String(20), default='OPEN')
     priority = db.Column(db.String(20), default='MEDIUM')
     status_changed_at = db.Column(db.DateTime(timezone=True), nullable=True)  # Track when status last changed
+    first_response_at = db.Column(db.DateTime(timezone=True), nullable=True)  # First comment/message not by the requester
+    first_response_seconds = db.Column(db.Integer, nullable=True)  # first_response_at - created_at
     requester_id = db.Column(PG_UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=True)  # Optional for external requesters
     requester_name = db.Column(db.String(200), nullable=True)  # For external requesters (e.g., company name or phone contact)
     assignee_id = db.Column(PG_UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=True)
@@ -31,6 +36,14 @@ class Ticket(BaseModel):
         db.Index('ix_tickets_status', 'status'),
         db.Index('ix_tickets_priority', 'priority'),
         db.Index('ix_tickets_created', 'created_at'),
+        # Response-time averages and percentiles over a creation date range
+        db.Index('ix_tickets_created_first_response', 'created_at', 'first_response_seconds'),
+        # Composite indexes backing keyset pagination on (updated_at, id),
+        # alone and combined with the most common list filters
+        db.Index('ix_tickets_updated_id', 'updated_at', 'id'),
+        db.Index('ix_tickets_status_updated_id', 'status', 'updated_at', 'id'),
+        db.Index('ix_tickets_assignee_updated_id', 'assignee_id', 'updated_at', 'id'),
+        db.Index('ix_tickets_module_updated_id', 'module_id', 'updated_at', 'id'),
     )
 
     def to_dict(self, exclude=None, include=None):
@@ -42,3 +55,88 @@ class Ticket(BaseModel):
         else:
             data['module'] = None
         return data
+
+    def record_first_response(self, responder_id, responded_at):
+        """Record the ticket's first response if this is it.
+
+        Responses by the requester don't count. The update only applies while
+        first_response_at is still empty, so concurrent first responses can't
+        both win. Commits; returns True if this response was recorded.
+        """
+        if self.first_response_at is not None or responded_at is None:
+            return False
+        if self.requester_id is not None and str(responder_id) == str(self.requester_id):
+            return False
+        seconds = max(0, int((_as_utc(responded_at) - _as_utc(self.created_at)).total_seconds()))
+        table = Ticket.__table__
+        result = db.session.execute(
+            table.update()
+            .where(table.c.id == self.id, table.c.first_response_at.is_(None))
+            .values(first_response_at=responded_at, first_response_seconds=seconds)
+        )
+        recorded = result.rowcount == 1
+        if recorded and not self.is_deleted:
+            # Core update, so the dashboard counters are adjusted here
+            apply_deltas(db.session.connection(), {'response:sum': seconds, 'response:count': 1})
+        db.session.commit()
+        return recorded
+
+    @classmethod
+    def backfill_first_response(cls, batch_size=500):
+        """Fill first_response_at for tickets that have none from existing
+        comments and ticket conversation messages.
+
+        Safe to run repeatedly. Returns the number of tickets updated.
+        """
+        from sqlalchemy import func, or_
+        from app.models.comment import Comment
+        from app.models.conversation import Conversation
+        from app.models.message import Message
+
+        def not_requester(author_id):
+            return or_(cls.requester_id.is_(None), author_id != cls.requester_id)
+
+        updated = 0
+        pending = cls.query.filter(cls.first_response_at.is_(None)).order_by(cls.id)
+        last_id = None
+        while True:
+            batch_query = pending if last_id is None else pending.filter(cls.id > last_id)
+            batch = batch_query.limit(batch_size).all()
+            if not batch:
+                break
+            ids = [ticket.id for ticket in batch]
+            first_comments = dict(
+                db.session.query(Comment.ticket_id, func.min(Comment.created_at))
+                .join(cls, cls.id == Comment.ticket_id)
+                .filter(Comment.ticket_id.in_(ids), Comment.is_deleted == False,  # noqa: E712
+                        not_requester(Comment.author_id))
+                .group_by(Comment.ticket_id)
+            )
+            first_messages = dict(
+                db.session.query(Conversation.ticket_id, func.min(Message.created_at))
+                .join(Message, Message.conversation_id == Conversation.id)
+                .join(cls, cls.id == Conversation.ticket_id)
+                .filter(Conversation.ticket_id.in_(ids), Message.is_deleted == False,  # noqa: E712
+                        Message.message_type != 'system', not_requester(Message.sender_id))
+                .group_by(Conversation.ticket_id)
+            )
+            for ticket in batch:
+                candidates = [t for t in (first_comments.get(ticket.id), first_messages.get(ticket.id)) if t]
+                if candidates:
+                    first = min(candidates, key=_as_utc)
+                    ticket.first_response_at = first
+                    ticket.first_response_seconds = max(
+                        0, int((_as_utc(first) - _as_utc(ticket.created_at)).total_seconds()))
+                    updated += 1
+            last_id = batch[-1].id
+            db.session.commit()
+        return updated
+
+
+def _as_utc(value):
+    # SQLite hands back naive datetimes; they are stored in UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+track_ticket_stats(Ticket)
+track_ticket_facts(Ticket)
@@ -0,0 +1,35 @@
+import uuid
+
+from app.models.base import db
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+
+# Stored in place of a missing assignee or module, so every dimension can be
+# part of the primary key (NULLs would never conflict on upsert). The max
+# UUID rather than the nil one: SQLite would read the all-digit hex of the
+# latter back as the integer 0.
+NO_ID = uuid.UUID(int=(1 << 128) - 1)
+
+
+class TicketDailyFact(db.Model):
+    """Ticket activity for one day and one combination of dimensions.
+
+    - `created`: tickets created that day with these dimensions
+    - `resolved`: tickets moved into a resolved status that day
+    - `reopened`: tickets moved from a resolved status back to another one
+    - `net`: change in the number of (non-deleted) tickets currently having
+      these dimensions; summing it over all days up to D gives the state of
+      the tickets at the end of D
+
+    Maintained incrementally by app/ticket_facts.py.
+    """
+    __tablename__ = 'ticket_daily_facts'
+
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    priority = db.Column(db.String(20), primary_key=True)
+    assignee_id = db.Column(PG_UUID(as_uuid=True), primary_key=True, default=NO_ID)
+    module_id = db.Column(PG_UUID(as_uuid=True), primary_key=True, default=NO_ID)
+    created = db.Column(db.Integer, nullable=False, default=0)
+    resolved = db.Column(db.Integer, nullable=False, default=0)
+    reopened = db.Column(db.Integer, nullable=False, default=0)
+    net = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,15 @@
+from app.models.base import db
+
+
+class TicketStat(db.Model):
+    """One named counter of the materialized dashboard statistics.
+
+    Names are ``total``, ``status:<status>``, ``priority:<priority>``,
+    ``month:<YYYY-MM>`` (tickets created that month) and the
+    ``response:sum`` / ``response:count`` pair behind the average response
+    time. Maintained by app/ticket_stats.py; only non-deleted tickets count.
+    """
+    __tablename__ = 'ticket_stats'
+
+    name = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
@@ -0,0 +1,14 @@
+from app.models.base import BaseModel, db
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+
+
+class WebhookDeadLetter(BaseModel):
+    """A webhook delivery that exhausted its retries or hit an open circuit."""
+    __tablename__ = 'webhook_dead_letters'
+
+    url = db.Column(db.String(500), nullable=False, index=True)
+    payload = db.Column(db.Text, nullable=False)  # JSON body exactly as it would have been sent
+    notification_id = db.Column(PG_UUID(as_uuid=True), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    status_code = db.Column(db.Integer, nullable=True)  # Last HTTP status, if a response was received
+    last_error = db.Column(db.Text, nullable=True)
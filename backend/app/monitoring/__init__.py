@@ -3,12 +3,13 @@ Server monitoring package.
 Provides system resource monitoring capabilities.
 """
 
-from .collector import MetricsCollector
+from .collector import MetricsCollector, SharedSampler
 from .sender import MetricsSender
 from .worker import MonitoringWorker, init_monitoring_worker, get_monitoring_worker
 
 __all__ = [
     'MetricsCollector',
+    'SharedSampler',
     'MetricsSender',
     'MonitoringWorker',
     'init_monitoring_worker',
@@ -0,0 +1,267 @@
+"""
+Streaming threshold alerts for server monitors.
+
+`ServerMonitor.alert_thresholds` maps a resource to its limit::
+
+    {"cpu": 80, "ram": 85, "storage": 90, "network": 1000000000}
+
+A limit may also be a dict to override the defaults for that resource::
+
+    {"cpu": {"value": 90, "for": 300, "clear": 70, "ticket": true}}
+
+- ``for``: seconds the value must stay at or above the limit before the
+  alert fires (sustained-for window);
+- ``clear``: the value must drop to this level before the alert resolves
+  (hysteresis, so a value hovering around the limit doesn't flap);
+- ``ticket``: also open a Ticket when the alert fires.
+
+`AlertEvaluator` keeps a small state record per monitor and resource and
+updates it from each incoming sample, so evaluation costs the same no
+matter how much history exists. An alert fires once per episode, and a
+new episode within the cooldown of the last notification is recorded but
+not notified again.
+"""
+
+import logging
+import threading
+import uuid
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Resource key in alert_thresholds -> stored metric name (see timeseries.extract_samples)
+RESOURCE_METRICS = {
+    'cpu': 'cpu.percent',
+    'ram': 'memory.percent',
+    'storage': 'storage.percent',
+}
+
+# Network thresholds are a rate (bytes/s) derived from these counters
+NETWORK_COUNTERS = ('network.bytes_sent', 'network.bytes_recv')
+
+RESOURCE_LABELS = {'cpu': 'CPU', 'ram': 'Memory', 'storage': 'Storage', 'network': 'Network'}
+
+OK, PENDING, FIRING = 'ok', 'pending', 'firing'
+
+AlertRule = namedtuple('AlertRule', 'resource threshold clear sustain ticket')
+
+AlertEvent = namedtuple('AlertEvent', 'monitor_id resource status value threshold started_at ts ticket')
+
+
+class _State:
+    __slots__ = ('status', 'since', 'last_ts', 'notified', 'last_notified', 'counter', 'counter_ts')
+
+    def __init__(self):
+        self.status = OK
+        self.since = None
+        self.last_ts = None
+        self.notified = False
+        self.last_notified = None
+        self.counter = None
+        self.counter_ts = None
+
+
+def _flag(value):
+    """Read a boolean option that may have been stored as a string."""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+def parse_rules(thresholds, sustain=0, hysteresis=0.0, ticket=False):
+    """Build AlertRules from a monitor's alert_thresholds, skipping invalid entries."""
+    rules = []
+    for resource, spec in (thresholds or {}).items():
+        if resource not in RESOURCE_METRICS and resource != 'network':
+            continue
+        options = spec if isinstance(spec, dict) else {'value': spec}
+        try:
+            threshold = float(options['value'])
+            clear = float(options.get('clear', threshold * (1 - hysteresis)))
+            rule_sustain = float(options.get('for', sustain))
+        except (KeyError, TypeError, ValueError):
+            continue
+        rules.append(AlertRule(resource, threshold, min(clear, threshold), rule_sustain,
+                               _flag(options.get('ticket', ticket))))
+    return rules
+
+
+class AlertEvaluator:
+    """Incremental per-sample threshold evaluation with sustain, hysteresis and dedup."""
+
+    def __init__(self, sustain=120, hysteresis=0.1, cooldown=900, auto_ticket=False):
+        self.sustain = sustain
+        self.hysteresis = hysteresis
+        self.cooldown = cooldown
+        self.auto_ticket = auto_ticket
+        self._states = {}  # monitor_id -> {resource: _State}
+        self._lock = threading.Lock()
+
+    def evaluate(self, monitor_id, thresholds, ts, samples):
+        """Feed one sample set; return the AlertEvents it triggers.
+
+        `samples` is a mapping or iterable of (metric, value) pairs for the
+        epoch-second timestamp `ts`. Samples at or before the last seen
+        timestamp for a resource are ignored, so replays are harmless.
+        """
+        values = dict(samples)
+        rules = parse_rules(thresholds, self.sustain, self.hysteresis, self.auto_ticket)
+        events = []
+        with self._lock:
+            states = self._states.setdefault(str(monitor_id), {})
+            for rule in rules:
+                state = states.get(rule.resource)
+                if state is None:
+                    state = states[rule.resource] = _State()
+                if state.last_ts is not None and ts <= state.last_ts:
+                    continue
+                if rule.resource == 'network':
+                    value = self._network_rate(state, ts, values)
+                else:
+                    value = values.get(RESOURCE_METRICS[rule.resource])
+                if value is None:
+                    continue
+                state.last_ts = ts
+                event = self._step(state, rule, ts, value)
+                if event is not None:
+                    events.append(AlertEvent(str(monitor_id), rule.resource, event, value,
+                                             rule.threshold, state.since, ts, rule.ticket))
+        return events
+
+    def forget(self, monitor_id):
+        """Drop all state for a monitor (e.g. when it is deleted)."""
+        with self._lock:
+            self._states.pop(str(monitor_id), None)
+
+    def status(self, monitor_id):
+        """Return {resource: status} for a monitor."""
+        with self._lock:
+            return {resource: state.status for resource, state in self._states.get(str(monitor_id), {}).items()}
+
+    @staticmethod
+    def _network_rate(state, ts, values):
+        if not all(name in values for name in NETWORK_COUNTERS):
+            return None
+        counter = sum(values[name] for name in NETWORK_COUNTERS)
+        previous, previous_ts = state.counter, state.counter_ts
+        state.counter, state.counter_ts = counter, ts
+        if previous is None or counter < previous:
+            # First sample, or the counters were reset (agent restart)
+            return None
+        return (counter - previous) / (ts - previous_ts)
+
+    def _step(self, state, rule, ts, value):
+        if state.status == FIRING:
+            if value > rule.clear:
+                return None
+            state.status, state.since = OK, None
+            if state.notified:
+                state.notified = False
+                return 'resolved'
+            return None
+
+        if value < rule.threshold:
+            state.status, state.since = OK, None
+            return None
+
+        if state.status == OK:
+            state.status, state.since = PENDING, ts
+        if ts - state.since < rule.sustain:
+            return None
+
+        state.status = FIRING
+        if state.last_notified is not None and ts - state.last_notified < self.cooldown:
+            state.notified = False
+            return None
+        state.notified = True
+        state.last_notified = ts
+        return 'firing'
+
+
+def _format_value(resource, value):
+    if resource == 'network':
+        return f'{value / 1e6:.1f} MB/s'
+    return f'{value:.1f}%'
+
+
+def describe(monitor, event):
+    """One-line human description of an alert event."""
+    label = RESOURCE_LABELS.get(event.resource, event.resource)
+    value = _format_value(event.resource, event.value)
+    limit = _format_value(event.resource, event.threshold)
+    if event.status == 'firing':
+        return f'{monitor.name}: {label} at {value}, above the {limit} threshold'
+    return f'{monitor.name}: {label} back to {value} (threshold {limit})'
+
+
+def handle_alert_events(monitor, events):
+    """Notify the monitor owner about alert events; open tickets where requested.
+
+    Registered as the 'monitor.alert' hook handler, so it runs on the
+    fan-out pipeline rather than inside the ingest request. `events` are
+    AlertEvent dicts.
+    """
+    from app.fanout import side_effect
+    from app.hooks import _notify_users
+
+    # Each step is keyed so a retry after a failure doesn't notify twice or
+    # open a second ticket
+    for i, event in enumerate(events):
+        event = AlertEvent(**event) if isinstance(event, dict) else event
+        message = describe(monitor, event)
+        side_effect(f'notify:{i}', _notify_users, [monitor.user_id], 'monitor_alert', message,
+                    related_id=monitor.id, related_type='server_monitor',
+                    data={'alert': event._asdict()})
+        if event.status == 'firing' and event.ticket:
+            side_effect(f'ticket:{i}', _open_alert_ticket, monitor, event, message)
+
+
+def _open_alert_ticket(monitor, event, message):
+    from app.hooks import send_ticket_created
+    from app.models.ticket import Ticket
+
+    ticket = Ticket(
+        ticket_id=f"#{uuid.uuid4().hex[:8]}",
+        subject=message[:200],
+        description=(f"Opened automatically by monitor '{monitor.name}'.\n\n"
+                     f"{RESOURCE_LABELS.get(event.resource, event.resource)} has been at or above "
+                     f"{_format_value(event.resource, event.threshold)} since epoch {event.started_at}."),
+        priority='HIGH',
+        requester_id=monitor.user_id,
+    )
+    ticket.save()
+    send_ticket_created(ticket)
+
+
+def evaluate_monitor(monitor, ts, samples):
+    """Evaluate a sample set for a monitor and queue notifications for any events."""
+    evaluator = get_alert_evaluator()
+    if evaluator is None:
+        return []
+    events = evaluator.evaluate(monitor.id, monitor.alert_thresholds, ts, samples)
+    if events:
+        from app.hooks import send
+
+        send('monitor.alert', monitor, [event._asdict() for event in events])
+    return events
+
+
+# Global evaluator instance
+alert_evaluator = None
+
+
+def init_alert_evaluator(app):
+    """Create the global alert evaluator from app config."""
+    global alert_evaluator
+    alert_evaluator = AlertEvaluator(
+        sustain=app.config.get('MONITOR_ALERT_SUSTAIN_SECONDS', 120),
+        hysteresis=app.config.get('MONITOR_ALERT_HYSTERESIS', 0.1),
+        cooldown=app.config.get('MONITOR_ALERT_COOLDOWN_SECONDS', 900),
+        auto_ticket=app.config.get('MONITOR_ALERT_AUTO_TICKET', False),
+    )
+    return alert_evaluator
+
+
+def get_alert_evaluator():
+    """Get the global alert evaluator instance."""
+    return alert_evaluator
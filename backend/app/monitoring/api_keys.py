@@ -0,0 +1,230 @@
+"""
+Cache of agent API keys for the metrics ingest endpoint.
+
+`/api/monitoring/data` authenticates every request by its ``X-API-Key``
+header. Instead of looking the key up in `server_monitors` each time,
+`resolve_api_key` keeps an in-process LRU of ``sha256(api_key)`` ->
+``(monitor_id, is_active)`` entries that expire after `ttl` seconds.
+Unknown keys are cached too, for a shorter `negative_ttl`, so a flood of
+bad keys doesn't reach the database either. Raw keys are never stored.
+
+When the app has a Redis client the entries are also kept in Redis
+(``monitor_api_key:<hash>``) so other processes can skip the database on
+their first lookup.
+
+Entries are dropped when a ServerMonitor is created, updated or deleted
+through the ORM (from SQLAlchemy session events, once the transaction
+commits). That clears this process's cache and Redis; other processes'
+in-memory entries expire within `ttl`.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, attributes
+
+from app.models.base import db
+from app.models.server_monitor import ServerMonitor
+
+logger = logging.getLogger(__name__)
+
+REDIS_PREFIX = 'monitor_api_key:'
+
+_SESSION_KEY = 'monitor_api_key_changes'
+
+# Cached result for keys that match no monitor
+_UNKNOWN = (None, False)
+
+
+def hash_key(api_key):
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+
+def _redis():
+    try:
+        return getattr(current_app, 'redis_client', None)
+    except RuntimeError:
+        return None
+
+
+class ApiKeyCache:
+    """Thread-safe LRU of key hash -> (monitor_id, is_active) with expiry."""
+
+    def __init__(self, maxsize=10000, ttl=60, negative_ttl=10):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()  # key_hash -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key_hash):
+        """Return the cached value, or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key_hash)
+            if item is None:
+                return None
+            if item[0] <= now:
+                del self._entries[key_hash]
+                return None
+            self._entries.move_to_end(key_hash)
+            return item[1]
+
+    def set(self, key_hash, value):
+        ttl = self.ttl if value[0] is not None else self.negative_ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key_hash] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key_hash)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key_hashes):
+        with self._lock:
+            for key_hash in key_hashes:
+                self._entries.pop(key_hash, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # Shared layer
+
+    def get_shared(self, key_hash):
+        client = _redis()
+        if client is None:
+            return None
+        try:
+            raw = client.get(REDIS_PREFIX + key_hash)
+        except Exception:
+            logger.warning('Could not read API key cache', exc_info=True)
+            return None
+        if raw is None:
+            return None
+        if isinstance(raw, bytes):
+            raw = raw.decode('utf-8')
+        if raw == '-':
+            return _UNKNOWN
+        monitor_id, _, active = raw.partition(':')
+        try:
+            return uuid.UUID(monitor_id), active == '1'
+        except ValueError:
+            return None
+
+    def set_shared(self, key_hash, value):
+        client = _redis()
+        ttl = self.ttl if value[0] is not None else self.negative_ttl
+        if client is None or ttl <= 0:
+            return
+        raw = '-' if value[0] is None else f'{value[0]}:{int(bool(value[1]))}'
+        try:
+            client.set(REDIS_PREFIX + key_hash, raw, ex=max(1, int(ttl)))
+        except Exception:
+            logger.warning('Could not write API key cache', exc_info=True)
+
+    def invalidate_shared(self, key_hashes):
+        client = _redis()
+        if client is None or not key_hashes:
+            return
+        try:
+            client.delete(*[REDIS_PREFIX + key_hash for key_hash in key_hashes])
+        except Exception:
+            logger.warning('Could not invalidate API key cache', exc_info=True)
+
+
+def resolve_api_key(api_key):
+    """Return ``(monitor_id, is_active)`` for an agent API key.
+
+    `monitor_id` is None when no (non-deleted) monitor uses the key.
+    """
+    cache = get_api_key_cache()
+    key_hash = hash_key(api_key)
+    value = cache.get(key_hash)
+    if value is not None:
+        return value
+
+    value = cache.get_shared(key_hash)
+    if value is None:
+        row = db.session.query(ServerMonitor.id, ServerMonitor.is_active) \
+            .filter_by(api_key=api_key, is_deleted=False).first()
+        value = (row.id, bool(row.is_active)) if row is not None else _UNKNOWN
+        cache.set_shared(key_hash, value)
+    cache.set(key_hash, value)
+    return value
+
+
+def invalidate_api_keys(api_keys):
+    """Drop cached lookups for the given raw API keys."""
+    hashes = {hash_key(key) for key in api_keys if key}
+    if not hashes:
+        return
+    cache = get_api_key_cache()
+    cache.invalidate(hashes)
+    cache.invalidate_shared(hashes)
+
+
+# Global cache instance
+api_key_cache = ApiKeyCache()
+
+
+def init_api_key_cache(app):
+    """Size the global cache from the app configuration."""
+    global api_key_cache
+    api_key_cache = ApiKeyCache(
+        maxsize=app.config.get('MONITORING_API_KEY_CACHE_SIZE', 10000),
+        ttl=app.config.get('MONITORING_API_KEY_CACHE_TTL', 60),
+        negative_ttl=app.config.get('MONITORING_API_KEY_NEGATIVE_TTL', 10),
+    )
+    return api_key_cache
+
+
+def get_api_key_cache():
+    return api_key_cache
+
+
+def _noop_set(target, value, oldvalue, initiator):
+    pass
+
+
+# Load the previous API key on assignment so its cache entry can be dropped.
+# Scalar attributes don't keep their old value when set on an expired
+# instance, which would leave the replaced key cached until it expires.
+event.listen(ServerMonitor.api_key, 'set', _noop_set, active_history=True)
+
+
+def _keys_of(obj):
+    """The monitor's current API key plus the one it replaced in this flush."""
+    history = attributes.get_history(obj, 'api_key')
+    return [obj.api_key, *history.deleted]
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_monitor_changes(session, flush_context):
+    keys = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, ServerMonitor):
+            keys.update(key for key in _keys_of(obj) if key)
+    if keys:
+        session.info.setdefault(_SESSION_KEY, set()).update(keys)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_monitor_changes(session):
+    keys = session.info.pop(_SESSION_KEY, None)
+    if keys:
+        invalidate_api_keys(keys)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_monitor_changes(session):
+    session.info.pop(_SESSION_KEY, None)
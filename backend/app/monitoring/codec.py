@@ -0,0 +1,150 @@
+"""
+Compact wire format for batches of metric snapshots.
+
+A batch carries several snapshots from one agent in a single request::
+
+    {
+        "v": 1,
+        "monitor_id": "...",
+        "system_info": {...},   # only when it changed since the last batch
+        "counters": "delta",    # or "absolute"
+        "samples": [snapshot, snapshot, ...]
+    }
+
+Each snapshot has the `MetricsCollector.collect_all_metrics` shape minus
+`system_info`. With ``"counters": "delta"`` (the default) per-interface
+network counters are absolute in the first snapshot and deltas from the
+previous snapshot afterwards, so a batch decodes on its own even if
+earlier batches were lost; agents that don't delta-encode send
+``"absolute"``. The body is JSON, or MessagePack when the optional
+`msgpack` package is installed, and may be gzip-compressed
+(``Content-Encoding: gzip``).
+"""
+
+import copy
+import gzip
+import json
+import zlib
+
+try:
+    import msgpack
+except Exception:
+    msgpack = None
+
+BATCH_VERSION = 1
+
+JSON_CONTENT_TYPE = 'application/json'
+MSGPACK_CONTENT_TYPE = 'application/msgpack'
+
+# Network interface counters that are delta-encoded within a batch
+COUNTER_FIELDS = (
+    'bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv',
+    'errin', 'errout', 'dropin', 'dropout',
+)
+
+# Upper bound on a decompressed request body
+MAX_DECODED_SIZE = 16 * 1024 * 1024
+
+
+class UnsupportedEncoding(ValueError):
+    """The body uses a format or compression this process can't decode."""
+
+
+def is_batch(payload):
+    return isinstance(payload, dict) and isinstance(payload.get('samples'), list)
+
+
+def encode_batch(snapshots, monitor_id=None, system_info=None):
+    """Build a batch from full snapshots (which are left unmodified)."""
+    samples = []
+    previous = {}
+    for snapshot in snapshots:
+        sample = {key: value for key, value in snapshot.items() if key != 'system_info'}
+        network = []
+        for nic in snapshot.get('network') or []:
+            name = nic.get('interface')
+            entry = dict(nic)
+            last = previous.get(name)
+            if last is not None:
+                for field in COUNTER_FIELDS:
+                    if isinstance(nic.get(field), (int, float)) and isinstance(last.get(field), (int, float)):
+                        entry[field] = nic[field] - last[field]
+            previous[name] = nic
+            network.append(entry)
+        if 'network' in snapshot:
+            sample['network'] = network
+        samples.append(sample)
+
+    batch = {'v': BATCH_VERSION, 'monitor_id': monitor_id, 'counters': 'delta', 'samples': samples}
+    if system_info is not None:
+        batch['system_info'] = system_info
+    return batch
+
+
+def decode_batch(batch):
+    """Expand a batch into `{"monitor_id", "data"}` payloads, one per snapshot."""
+    if batch.get('v', BATCH_VERSION) != BATCH_VERSION:
+        raise UnsupportedEncoding(f"unsupported batch version {batch.get('v')!r}")
+    payloads = []
+    running = {}
+    delta = batch.get('counters', 'delta') == 'delta'
+    for index, sample in enumerate(batch['samples']):
+        if not isinstance(sample, dict):
+            raise ValueError('batch samples must be objects')
+        data = copy.deepcopy(sample)
+        for nic in (data.get('network') or []) if delta else []:
+            name = nic.get('interface')
+            totals = running.get(name)
+            if totals is not None:
+                for field in COUNTER_FIELDS:
+                    if isinstance(nic.get(field), (int, float)) and isinstance(totals.get(field), (int, float)):
+                        nic[field] = totals[field] + nic[field]
+            running[name] = nic
+        if index == 0 and batch.get('system_info') is not None:
+            data['system_info'] = batch['system_info']
+        payloads.append({'monitor_id': batch.get('monitor_id'), 'data': data})
+    return payloads
+
+
+def dumps(obj, fmt='json', compression=None):
+    """Serialize `obj`; returns (body, headers)."""
+    if fmt == 'msgpack':
+        if msgpack is None:
+            raise UnsupportedEncoding('msgpack is not installed')
+        body = msgpack.packb(obj, use_bin_type=True)
+        headers = {'Content-Type': MSGPACK_CONTENT_TYPE}
+    else:
+        body = json.dumps(obj, separators=(',', ':')).encode('utf-8')
+        headers = {'Content-Type': JSON_CONTENT_TYPE}
+    if compression == 'gzip':
+        body = gzip.compress(body)
+        headers['Content-Encoding'] = 'gzip'
+    return body, headers
+
+
+def loads(body, content_type=None, content_encoding=None, max_size=MAX_DECODED_SIZE):
+    """Parse a request body produced by `dumps` (or a plain JSON body)."""
+    encoding = (content_encoding or '').strip().lower()
+    if encoding == 'gzip':
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = inflater.decompress(body, max_size)
+        except zlib.error as exc:
+            raise ValueError(f'invalid gzip body: {exc}') from exc
+        if inflater.unconsumed_tail:
+            raise ValueError('decompressed body too large')
+    elif encoding not in ('', 'identity'):
+        raise UnsupportedEncoding(f'unsupported content encoding {encoding!r}')
+
+    mimetype = (content_type or JSON_CONTENT_TYPE).split(';')[0].strip().lower()
+    if mimetype in (MSGPACK_CONTENT_TYPE, 'application/x-msgpack'):
+        if msgpack is None:
+            raise UnsupportedEncoding('msgpack is not installed')
+        try:
+            return msgpack.unpackb(body, raw=False)
+        except Exception as exc:
+            raise ValueError(f'invalid msgpack body: {exc}') from exc
+    try:
+        return json.loads(body)
+    except ValueError as exc:
+        raise ValueError(f'invalid JSON body: {exc}') from exc
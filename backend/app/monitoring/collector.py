@@ -4,6 +4,7 @@ Collects system resource usage data.
 """
 
 import psutil
+import threading
 import time
 from datetime import datetime, timezone
 import socket
@@ -11,19 +12,51 @@ import uuid
 import platform
 
 
+# Seconds between re-enumerations of mounted partitions
+PARTITIONS_TTL = 60
+
+
+def _total_cpu_time(times):
+    """Sum of cpu_times without guest time, which Linux also counts in user/nice."""
+    return sum(times) - getattr(times, 'guest', 0.0) - getattr(times, 'guest_nice', 0.0)
+
+
 class MetricsCollector:
     """Collects system metrics like CPU, RAM, storage, and network usage."""
 
     def __init__(self):
         self.hostname = socket.gethostname()
         self.system_id = str(uuid.uuid4())  # Unique identifier for this system
+        self._cpu_count = psutil.cpu_count()
+        self._cpu_count_logical = psutil.cpu_count(logical=True)
+        self._platform = platform.platform()
+        self._boot_time = datetime.fromtimestamp(psutil.boot_time(), tz=timezone.utc).isoformat()
+        self._last_cpu_times = None
+        self._partitions = None
+        self._partitions_at = 0.0
+
+    def _cpu_percent(self):
+        """CPU usage since the previous call, from cpu_times deltas (never blocks).
+
+        The first call reports the average since boot.
+        """
+        times = psutil.cpu_times()
+        last, self._last_cpu_times = self._last_cpu_times, times
+        total = _total_cpu_time(times)
+        idle = times.idle + getattr(times, 'iowait', 0.0)
+        if last is not None:
+            total -= _total_cpu_time(last)
+            idle -= last.idle + getattr(last, 'iowait', 0.0)
+        if total <= 0:
+            return 0.0
+        return round(max(0.0, min(100.0, 100.0 * (1.0 - idle / total))), 1)
 
     def get_cpu_usage(self):
         """Get CPU usage percentage."""
         return {
-            'usage_percent': psutil.cpu_percent(interval=1),
-            'cores': psutil.cpu_count(),
-            'cores_logical': psutil.cpu_count(logical=True),
+            'usage_percent': self._cpu_percent(),
+            'cores': self._cpu_count,
+            'cores_logical': self._cpu_count_logical,
             'load_average': psutil.getloadavg() if hasattr(psutil, 'getloadavg') else None
         }
 
@@ -40,8 +73,11 @@ class MetricsCollector:
 
     def get_storage_usage(self):
         """Get storage/disk usage for all mounted partitions."""
+        now = time.monotonic()
+        if self._partitions is None or now - self._partitions_at >= PARTITIONS_TTL:
+            self._partitions, self._partitions_at = psutil.disk_partitions(), now
         disks = []
-        for partition in psutil.disk_partitions():
+        for partition in self._partitions:
             try:
                 usage = psutil.disk_usage(partition.mountpoint)
                 disks.append({
@@ -53,8 +89,8 @@ class MetricsCollector:
                     'free': usage.free,
                     'percentage': usage.percent
                 })
-            except PermissionError:
-                # Skip partitions we can't access
+            except (PermissionError, FileNotFoundError):
+                # Skip partitions we can't access (or that were unmounted)
                 continue
         return disks
 
@@ -81,8 +117,8 @@ class MetricsCollector:
         return {
             'hostname': self.hostname,
             'system_id': self.system_id,
-            'platform': platform.platform(),
-            'boot_time': datetime.fromtimestamp(psutil.boot_time(), tz=timezone.utc).isoformat()
+            'platform': self._platform,
+            'boot_time': self._boot_time
         }
 
     def collect_all_metrics(self):
@@ -96,4 +132,36 @@ class MetricsCollector:
             'memory': self.get_memory_usage(),
             'storage': self.get_storage_usage(),
             'network': self.get_network_usage()
-        }
\ No newline at end of file
+        }
+
+
+class SharedSampler:
+    """Collects host metrics at most once per `ttl` seconds and shares the snapshot.
+
+    Every monitor driven by one process watches the same machine, so the
+    monitoring worker reads from one sampler instead of collecting per
+    monitor. Concurrent callers that find the snapshot stale wait for a
+    single collection rather than each starting their own. Callers must
+    treat the returned dict as read-only.
+    """
+
+    def __init__(self, collector=None, ttl=5.0):
+        self.collector = collector or MetricsCollector()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._taken_at = 0.0
+
+    def snapshot(self):
+        """Return the current metrics snapshot, collecting a new one if stale."""
+        with self._lock:
+            if self._snapshot is None or time.monotonic() - self._taken_at >= self.ttl:
+                self._snapshot = self.collector.collect_all_metrics()
+                self._taken_at = time.monotonic()
+            return self._snapshot
+
+    def age(self):
+        """Seconds since the current snapshot was taken (None before the first)."""
+        if self._snapshot is None:
+            return None
+        return time.monotonic() - self._taken_at
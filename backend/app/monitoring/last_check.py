@@ -0,0 +1,145 @@
+"""
+Coalesced writes of ServerMonitor.last_check_at.
+
+Agents post metrics every few seconds, and the monitoring worker checks
+every monitor on its own schedule. Updating `last_check_at` on each of
+those would mean one UPDATE and commit per sample. Instead the newest
+timestamp per monitor is kept in memory and written by a background
+thread every `flush_interval` seconds, in one executemany UPDATE for all
+monitors seen since the last flush.
+
+`last_check_at` can therefore lag by up to `flush_interval` seconds.
+With MONITORING_LAST_CHECK_FLUSH_INTERVAL=0 no thread is started and
+`record_check` writes immediately.
+"""
+
+import atexit
+import logging
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import bindparam
+
+from app.models.base import db
+from app.models.server_monitor import ServerMonitor
+
+logger = logging.getLogger(__name__)
+
+
+def _as_uuid(monitor_id):
+    return monitor_id if isinstance(monitor_id, uuid.UUID) else uuid.UUID(str(monitor_id))
+
+
+def _update_statement():
+    table = ServerMonitor.__table__
+    return table.update().where(table.c.id == bindparam('monitor_id')) \
+        .values(last_check_at=bindparam('checked_at'))
+
+
+def write_last_checks(pending):
+    """Write {monitor_id: checked_at} in one statement (needs an app context)."""
+    db.session.execute(_update_statement(), [
+        {'monitor_id': _as_uuid(monitor_id), 'checked_at': checked_at}
+        for monitor_id, checked_at in pending.items()
+    ])
+    db.session.commit()
+
+
+class LastCheckRecorder:
+    """Buffers the latest check time per monitor and flushes them periodically."""
+
+    def __init__(self, app, flush_interval=5.0):
+        self.app = app
+        self.flush_interval = flush_interval
+        self._pending = {}  # monitor_id -> latest check time
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def record(self, monitor_id, checked_at=None):
+        checked_at = checked_at or datetime.now(timezone.utc)
+        with self._lock:
+            current = self._pending.get(monitor_id)
+            if current is None or checked_at > current:
+                self._pending[monitor_id] = checked_at
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Write everything recorded so far. Returns the number of monitors updated."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            with self.app.app_context():
+                write_last_checks(pending)
+        except Exception:
+            logger.exception("Failed to record last check times for %d monitor(s)", len(pending))
+            # Keep them for the next flush unless newer times arrived meanwhile
+            with self._lock:
+                for monitor_id, checked_at in pending.items():
+                    self._pending.setdefault(monitor_id, checked_at)
+            return 0
+        return len(pending)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='last-check-recorder', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+
+# Global recorder instance
+last_check_recorder = None
+
+
+def init_last_check_recorder(app):
+    """Start the global recorder; returns None when writes are immediate."""
+    global last_check_recorder
+    if last_check_recorder is not None:
+        last_check_recorder.stop()
+        last_check_recorder = None
+    interval = app.config.get('MONITORING_LAST_CHECK_FLUSH_INTERVAL', 5.0)
+    if not interval or interval <= 0:
+        return None
+    last_check_recorder = LastCheckRecorder(app, flush_interval=interval)
+    last_check_recorder.start()
+    return last_check_recorder
+
+
+def get_last_check_recorder():
+    return last_check_recorder
+
+
+def record_check(monitor_id, checked_at=None):
+    """Note a successful check; written by the recorder, or now if there is none.
+
+    Writing immediately needs an app context.
+    """
+    checked_at = checked_at or datetime.now(timezone.utc)
+    if last_check_recorder is not None:
+        last_check_recorder.record(monitor_id, checked_at)
+    else:
+        write_last_checks({monitor_id: checked_at})
+
+
+@atexit.register
+def _flush_on_exit():
+    if last_check_recorder is not None:
+        last_check_recorder.stop()
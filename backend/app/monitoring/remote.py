@@ -0,0 +1,191 @@
+"""
+Pooled, cached fetches of `/api/monitoring/system` from monitored servers.
+
+The dashboard shows live snapshots of many servers at once. Fetching them
+one `requests.get` at a time paid a new connection per call and made a
+refresh as slow as the sum of all hosts. A `RemoteSystemFetcher` instead:
+
+- keeps one keep-alive `requests.Session` per host;
+- fetches all targets of a request concurrently on a bounded thread pool
+  and waits at most `timeout` (plus a small margin) overall, so a refresh
+  is bounded by the slowest host rather than the sum;
+- caches successful responses per target for `cache_ttl` seconds, and
+  shares an in-flight fetch between callers asking for the same target.
+
+Each target gets its own result with status, latency and error, so one
+unreachable host doesn't fail the whole request.
+"""
+
+import atexit
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+SYSTEM_PATH = '/api/monitoring/system'
+
+# Extra seconds to wait for the pool beyond the per-request timeout
+DEADLINE_MARGIN = 0.5
+
+RemoteTarget = namedtuple('RemoteTarget', 'key url api_key')
+
+
+class RemoteSystemFetcher:
+    """Fetches remote system snapshots concurrently over pooled sessions."""
+
+    def __init__(self, max_workers=32, pool_size=4, timeout=5.0, connect_timeout=2.0, cache_ttl=5.0,
+                 clock=time.monotonic):
+        self.timeout = timeout
+        self.connect_timeout = min(connect_timeout, timeout)
+        self.cache_ttl = cache_ttl
+        self.pool_size = pool_size
+        self.clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='remote-system')
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._cache = {}  # (url, api_key) -> (expires_at, result)
+        self._inflight = {}
+
+    def fetch_all(self, targets):
+        """Return {target.key: result} for every target.
+
+        A result has `ok`, `status`, `latency_ms`, `cached` and either
+        `data` or `error`.
+        """
+        futures = {target.key: self._submit(target) for target in targets}
+        _, pending = wait(futures.values(), timeout=self.timeout + DEADLINE_MARGIN)
+        results = {}
+        for key, future in futures.items():
+            if future in pending:
+                results[key] = _error(None, f'timed out after {self.timeout}s', self.timeout)
+            else:
+                results[key] = future.result()
+        return results
+
+    def fetch(self, target):
+        """Fetch a single target (see `fetch_all`)."""
+        return self.fetch_all([target])[target.key]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def _submit(self, target):
+        cache_key = (target.url, target.api_key)
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None and cached[0] > self.clock():
+                return _done({**cached[1], 'cached': True})
+            future = self._inflight.get(cache_key)
+            if future is None:
+                future = self._executor.submit(self._get, target, cache_key)
+                self._inflight[cache_key] = future
+                future.add_done_callback(lambda _f: self._forget(cache_key))
+            return future
+
+    def _forget(self, cache_key):
+        with self._lock:
+            self._inflight.pop(cache_key, None)
+
+    def _session_for(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+            return session
+
+    def _get(self, target, cache_key):
+        started = time.perf_counter()
+        try:
+            response = self._session_for(target.url).get(
+                target.url,
+                headers={'X-Metrics-Key': target.api_key},
+                timeout=(self.connect_timeout, self.timeout),
+            )
+        except requests.RequestException as e:
+            return _error(None, f'remote metrics fetch error: {e}', time.perf_counter() - started)
+        latency = time.perf_counter() - started
+        try:
+            data = response.json()
+        except ValueError:
+            return _error(response.status_code, 'invalid JSON response', latency)
+
+        result = {
+            'ok': response.ok,
+            'status': response.status_code,
+            'latency_ms': round(latency * 1000, 1),
+            'cached': False,
+            'data': data,
+        }
+        if response.ok and self.cache_ttl > 0:
+            with self._lock:
+                self._cache[cache_key] = (self.clock() + self.cache_ttl, result)
+                self._evict_expired()
+        return result
+
+    def _evict_expired(self):
+        # Caller holds self._lock
+        now = self.clock()
+        for key in [key for key, (expires_at, _) in self._cache.items() if expires_at <= now]:
+            del self._cache[key]
+
+
+def _error(status, message, latency):
+    return {
+        'ok': False,
+        'status': status,
+        'latency_ms': round(latency * 1000, 1),
+        'cached': False,
+        'error': message,
+    }
+
+
+def _done(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def system_url(base):
+    return base.rstrip('/') + SYSTEM_PATH
+
+
+# Global fetcher instance
+remote_fetcher = None
+
+
+def init_remote_fetcher(app):
+    """Create the global fetcher from MONITORING_PROXY_* settings."""
+    global remote_fetcher
+    if remote_fetcher is not None:
+        remote_fetcher.shutdown(wait=False)
+    remote_fetcher = RemoteSystemFetcher(
+        max_workers=app.config.get('MONITORING_PROXY_WORKERS', 32),
+        pool_size=app.config.get('MONITORING_PROXY_POOL_SIZE', 4),
+        timeout=app.config.get('MONITORING_PROXY_TIMEOUT', 5.0),
+        cache_ttl=app.config.get('MONITORING_PROXY_CACHE_TTL', 5.0),
+    )
+    return remote_fetcher
+
+
+def get_remote_fetcher():
+    return remote_fetcher
+
+
+@atexit.register
+def _shutdown_on_exit():
+    if remote_fetcher is not None:
+        remote_fetcher.shutdown(wait=False)
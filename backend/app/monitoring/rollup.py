@@ -0,0 +1,211 @@
+"""
+Rollup and retention job for stored monitoring metrics.
+
+Raw samples are compacted into 5-minute buckets, 5-minute buckets into
+hourly ones and hourly into daily ones (see `timeseries.TIERS`). Each
+bucket keeps min/max/sum/count, so the coarser tiers are exact
+aggregates of the finer ones. Only complete buckets are rolled up; the
+newest bucket of each tier is recomputed on every run so samples that
+arrive a little late still land in it. Samples that arrive later than that
+(a replayed agent spool, say) mark their bucket on ingest
+(`MetricLateBucket`); the next run re-rolls every tier from the oldest
+marked bucket.
+
+After rolling up, the raw samples and every tier are purged after their
+own retention (METRICS_RAW_RETENTION_DAYS, METRICS_RETENTION_5M_DAYS, ...).
+Every worker process runs the job; on PostgreSQL a run is skipped while
+another process holds the rollup advisory lock.
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+from sqlalchemy import func, literal, select
+
+from app.locks import ROLLUP_LOCK_KEY, advisory_lock
+from app.models.base import db
+from app.models.metric_rollup import MetricLateBucket, MetricRollup
+from app.models.metric_sample import MetricSample
+from app.monitoring.timeseries import (
+    RAW_RESOLUTION, ROLLUP_LAG, TIERS, mark_late_buckets, purge_expired, retention_by_resolution,
+    rollup_watermark,
+)
+
+logger = logging.getLogger(__name__)
+
+# Buckets aggregated per INSERT ... SELECT statement
+ROLLUP_BATCH_BUCKETS = 288
+
+
+def _source_select(resolution, source_resolution, start, end):
+    if source_resolution == RAW_RESOLUTION:
+        source = MetricSample
+        aggregates = (func.min(source.value), func.max(source.value), func.sum(source.value), func.count())
+        criteria = ()
+    else:
+        source = MetricRollup
+        aggregates = (func.min(source.min), func.max(source.max), func.sum(source.sum), func.sum(source.count))
+        criteria = (source.resolution == source_resolution,)
+    bucket = source.ts // resolution * resolution
+    return (
+        select(source.monitor_id, source.metric, literal(resolution), bucket, *aggregates)
+        .where(*criteria, source.ts >= start, source.ts < end)
+        .group_by(source.monitor_id, source.metric, bucket)
+    )
+
+
+def _source_start(source_resolution):
+    if source_resolution == RAW_RESOLUTION:
+        return db.session.query(func.min(MetricSample.ts)).scalar()
+    return db.session.query(func.min(MetricRollup.ts)) \
+        .filter(MetricRollup.resolution == source_resolution).scalar()
+
+
+def rollup_tier(resolution, source_resolution, now=None, since=None):
+    """Roll complete buckets of `source_resolution` data up into `resolution`.
+
+    `since` (epoch seconds) re-rolls already covered buckets from there on,
+    but never from before the oldest source data still retained.
+    Returns the number of buckets (per monitor and metric) written.
+    """
+    now = int(now if now is not None else time.time())
+    end = (now - ROLLUP_LAG) // resolution * resolution
+    covered = rollup_watermark(resolution)
+    if covered is not None:
+        # Recompute the newest bucket to pick up late samples
+        start = covered - resolution
+        first = _source_start(source_resolution) if since is not None and since < start else None
+        if first is not None:
+            # A bucket whose source was partly purged is left as it is
+            start = min(start, max(since // resolution * resolution, -(-first // resolution) * resolution))
+    else:
+        first = _source_start(source_resolution)
+        if first is None:
+            return 0
+        start = first // resolution * resolution
+
+    table = MetricRollup.__table__
+    columns = ['monitor_id', 'metric', 'resolution', 'ts', 'min', 'max', 'sum', 'count']
+    written = 0
+    while start < end:
+        window_end = min(end, start + resolution * ROLLUP_BATCH_BUCKETS)
+        db.session.execute(table.delete().where(
+            table.c.resolution == resolution, table.c.ts >= start, table.c.ts < window_end,
+        ))
+        result = db.session.execute(table.insert().from_select(
+            columns, _source_select(resolution, source_resolution, start, window_end),
+        ))
+        db.session.commit()
+        written += max(result.rowcount or 0, 0)
+        start = window_end
+    return written
+
+
+def _take_late_buckets():
+    marks = [ts for ts, in db.session.query(MetricLateBucket.ts)]
+    if marks:
+        db.session.execute(MetricLateBucket.__table__.delete().where(MetricLateBucket.ts.in_(marks)))
+        db.session.commit()
+    return marks
+
+
+def run_rollups(now=None):
+    """Roll up every tier from the next finer one, finest first.
+
+    Buckets marked late on ingest are re-rolled in every tier; the marks
+    are put back if the run fails.
+    """
+    marks = _take_late_buckets()
+    since = min(marks) if marks else None
+    source = RAW_RESOLUTION
+    written = {}
+    try:
+        for resolution, _, _ in TIERS:
+            written[resolution] = rollup_tier(resolution, source, now=now, since=since)
+            source = resolution
+    except Exception:
+        db.session.rollback()
+        if marks:
+            mark_late_buckets(marks)
+            db.session.commit()
+        raise
+    return written
+
+
+def purge_all(retention, now=None):
+    """Purge raw samples and every rollup tier after their retention."""
+    return {
+        resolution: purge_expired(days, now=now, resolution=resolution)
+        for resolution, days in retention.items()
+        if days
+    }
+
+
+class RollupJob:
+    """Runs rollups and retention purges periodically on a background thread."""
+
+    def __init__(self, app, interval=300):
+        self.app = app
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='metrics-rollup', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def run_once(self):
+        with self.app.app_context():
+            try:
+                with advisory_lock(ROLLUP_LOCK_KEY, wait=False) as locked:
+                    if not locked:
+                        logger.debug('Metric rollup already running elsewhere, skipped')
+                        return
+                    run_rollups()
+                    purge_all(retention_by_resolution(self.app.config))
+            except Exception:
+                db.session.rollback()
+                logger.exception('Metric rollup failed')
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.run_once()
+
+
+# Global rollup job instance
+rollup_job = None
+
+
+def init_rollup_job(app):
+    """Create and start the global rollup job.
+
+    Returns None when METRICS_ROLLUP_INTERVAL is 0.
+    """
+    global rollup_job
+    if rollup_job is not None:
+        rollup_job.stop()
+        rollup_job = None
+    interval = app.config.get('METRICS_ROLLUP_INTERVAL', 300)
+    if not interval:
+        return None
+    rollup_job = RollupJob(app, interval=interval)
+    rollup_job.start()
+    return rollup_job
+
+
+def get_rollup_job():
+    """Get the global rollup job instance."""
+    return rollup_job
+
+
+@atexit.register
+def _stop_on_exit():
+    if rollup_job is not None:
+        rollup_job.stop()
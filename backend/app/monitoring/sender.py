@@ -8,16 +8,58 @@ import json
 import logging
 from datetime import datetime, timezone
 
+from app.monitoring.codec import dumps, encode_batch
+from app.monitoring.spool import Backoff, Spool
+
 logger = logging.getLogger(__name__)
 
+# Buffered snapshots kept (per batch size) while the endpoint is unreachable
+MAX_PENDING_BATCHES = 10
 
-class MetricsSender:
-    """Sends monitoring metrics to the configured API endpoint."""
+# Snapshots replayed per request when draining the spool
+SPOOL_REPLAY_BATCH = 500
+
+# (connect, read) timeouts; a short connect timeout avoids piling up slow
+# attempts against an endpoint that is down
+REQUEST_TIMEOUT = (5, 30)
 
-    def __init__(self, api_key, api_secret=None, endpoint_url=None):
+# Returned by `MetricsSender.send_metrics` when a snapshot was buffered or
+# spooled for a later delivery rather than delivered
+QUEUED = 'queued'
+
+
+class MetricsSender:
+    """Sends monitoring metrics to the configured API endpoint.
+
+    With the defaults every snapshot is posted as plain JSON. With
+    `batch_size` > 1 snapshots are buffered and sent together as a batch
+    (see app/monitoring/codec.py) in which system info is only included
+    when it changed and network counters are delta-encoded; `fmt`
+    ('json' or 'msgpack') and `compression` ('gzip' or None) set the body
+    encoding.
+
+    With `spool_dir`, snapshots are first appended to a disk spool (see
+    app/monitoring/spool.py) and delivered from there, so an outage of
+    the endpoint (or a restart of this process) loses nothing until the
+    spool's `spool_max_bytes` bound is reached. After a failed delivery
+    the spool is not retried until an exponential backoff expires, then
+    replayed in batches of up to SPOOL_REPLAY_BATCH snapshots.
+    """
+
+    def __init__(self, api_key, api_secret=None, endpoint_url=None, batch_size=1, fmt='json', compression=None,
+                 spool_dir=None, spool_max_bytes=50 * 1024 * 1024):
         self.api_key = api_key
         self.api_secret = api_secret
         self.endpoint_url = endpoint_url
+        self.batch_size = max(1, int(batch_size or 1))
+        self.fmt = fmt
+        self.compression = compression
+        self._pending = []
+        self._sent_system_info = None
+        self.spool = Spool(spool_dir, max_bytes=spool_max_bytes) if spool_dir else None
+        self.backoff = Backoff()
+        # Unknown after a restart, so assume a full batch may be waiting
+        self._spooled = self.batch_size if self.spool is not None else 0
         self.session = requests.Session()
 
         # Set default headers
@@ -29,6 +71,10 @@ class MetricsSender:
         if self.api_secret:
             self.session.headers['X-API-Secret'] = self.api_secret
 
+    def close(self):
+        """Close the underlying HTTP session."""
+        self.session.close()
+
     def send_metrics(self, metrics_data, monitor_id=None):
         """
         Send metrics data to the monitoring endpoint.
@@ -38,12 +84,19 @@ class MetricsSender:
             monitor_id (str, optional): The monitor configuration ID
 
         Returns:
-            bool: True if successful, False otherwise
+            True once delivered, QUEUED if kept in the batch buffer or the
+            spool for a later delivery, False otherwise
         """
         if not self.endpoint_url:
             logger.warning("No endpoint URL configured for sending metrics")
             return False
 
+        if self.spool is not None:
+            return self._send_spooled(metrics_data, monitor_id)
+
+        if self.batch_size > 1 or self.compression or self.fmt != 'json':
+            return self._send_batched(metrics_data, monitor_id)
+
         try:
             payload = {
                 'monitor_id': monitor_id,
@@ -53,7 +106,7 @@ class MetricsSender:
             response = self.session.post(
                 self.endpoint_url,
                 json=payload,
-                timeout=30
+                timeout=REQUEST_TIMEOUT
             )
 
             if response.status_code == 200:
@@ -70,6 +123,90 @@ class MetricsSender:
             logger.error(f"Unexpected error sending metrics: {e}")
             return False
 
+    def _post_batch(self, snapshots, monitor_id, system_info):
+        batch = encode_batch(snapshots, monitor_id=monitor_id, system_info=system_info)
+        body, headers = dumps(batch, fmt=self.fmt, compression=self.compression)
+        response = self.session.post(self.endpoint_url, data=body, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code != 200:
+            logger.error(f"Failed to send metrics batch. Status: {response.status_code}, Response: {response.text}")
+            return False
+        logger.info(f"Sent {len(snapshots)} metric snapshot(s) to {self.endpoint_url}")
+        return True
+
+    def _send_spooled(self, metrics_data, monitor_id):
+        try:
+            self.spool.append(metrics_data)
+        except OSError as e:
+            logger.error(f"Could not spool metrics: {e}")
+            return False
+        self._spooled += 1
+        if self._spooled >= self.batch_size and self.drain(monitor_id):
+            return True
+        return QUEUED
+
+    def drain(self, monitor_id=None):
+        """Deliver spooled snapshots, oldest first, unless backing off.
+
+        Returns True once the spool is empty.
+        """
+        if self.spool is None:
+            return self.flush(monitor_id)
+        while self.backoff.ready():
+            snapshots, token = self.spool.read_batch(SPOOL_REPLAY_BATCH)
+            if not snapshots:
+                self._spooled = 0
+                return True
+            system_info = snapshots[-1].get('system_info')
+            try:
+                delivered = self._post_batch(
+                    snapshots, monitor_id,
+                    system_info if system_info != self._sent_system_info else None,
+                )
+            except Exception as e:
+                logger.error(f"Error sending spooled metrics: {e}")
+                delivered = False
+            if not delivered:
+                delay = self.backoff.failure()
+                logger.warning(f"Metrics endpoint unavailable, retrying spooled metrics in {delay:.0f}s")
+                return False
+            self.spool.ack(token)
+            self.backoff.success()
+            self._sent_system_info = system_info
+            self._spooled = max(0, self._spooled - len(snapshots))
+        return False
+
+    def _send_batched(self, metrics_data, monitor_id):
+        self._pending.append(metrics_data)
+        if len(self._pending) < self.batch_size:
+            return QUEUED
+        return self.flush(monitor_id)
+
+    def flush(self, monitor_id=None):
+        """Send buffered snapshots as one batch. Returns True on success.
+
+        On failure the snapshots stay buffered (up to MAX_PENDING_BATCHES
+        batches, oldest dropped first) and are retried with the next batch.
+        """
+        if not self._pending:
+            return True
+        if self.spool is not None:
+            return self.drain(monitor_id)
+        system_info = self._pending[-1].get('system_info')
+        try:
+            if self._post_batch(self._pending, monitor_id,
+                                system_info if system_info != self._sent_system_info else None):
+                self._pending = []
+                self._sent_system_info = system_info
+                return True
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error sending metrics batch: {e}")
+        except Exception as e:
+            logger.error(f"Unexpected error sending metrics batch: {e}")
+        limit = self.batch_size * MAX_PENDING_BATCHES
+        if len(self._pending) > limit:
+            self._pending = self._pending[-limit:]
+        return False
+
     def test_connection(self):
         """Test connection to the monitoring endpoint."""
         if not self.endpoint_url:
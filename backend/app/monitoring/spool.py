@@ -0,0 +1,184 @@
+"""
+Disk-backed spool for metric snapshots that could not be sent yet.
+
+Records are appended as JSON lines to numbered segment files in one
+directory (``00000000000000000001.seg``, ...). A new segment is started
+once the active one reaches `segment_bytes`. When the spool grows past
+`max_bytes` the oldest segments are deleted first, so the disk footprint
+stays bounded and the newest data survives a long outage.
+
+Readers take records in order with `read_batch` and `ack` them once they
+were delivered. The read position is kept in a small ``cursor`` file
+(replaced atomically), so records are neither lost nor replayed twice
+after a restart, apart from the batch that was in flight.
+
+This module only uses the standard library so it can be copied next to
+standalone_worker.py on monitored servers.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+
+SEGMENT_SUFFIX = '.seg'
+CURSOR_FILE = 'cursor'
+
+
+class Spool:
+    """Append-only, size-bounded queue of JSON records in segment files."""
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024, segment_bytes=1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = min(segment_bytes, max_bytes)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._cursor = self._load_cursor()
+
+    # Segment bookkeeping
+
+    def _segments(self):
+        names = [n for n in os.listdir(self.directory) if n.endswith(SEGMENT_SUFFIX)]
+        return sorted(int(n[:-len(SEGMENT_SUFFIX)]) for n in names)
+
+    def _path(self, seq):
+        return os.path.join(self.directory, f'{seq:020d}{SEGMENT_SUFFIX}')
+
+    def _load_cursor(self):
+        try:
+            with open(os.path.join(self.directory, CURSOR_FILE)) as f:
+                seq, offset = json.load(f)
+                return int(seq), int(offset)
+        except (OSError, ValueError, TypeError):
+            segments = self._segments()
+            return (segments[0] if segments else 1), 0
+
+    def _save_cursor(self):
+        path = os.path.join(self.directory, CURSOR_FILE)
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(list(self._cursor), f)
+        os.replace(tmp, path)
+
+    def size_bytes(self):
+        """Total bytes held in segment files."""
+        total = 0
+        for seq in self._segments():
+            try:
+                total += os.path.getsize(self._path(seq))
+            except OSError:
+                pass
+        return total
+
+    # Writing
+
+    def append(self, record):
+        """Append one JSON-serializable record."""
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._lock:
+            segments = self._segments()
+            seq = segments[-1] if segments else max(1, self._cursor[0])
+            path = self._path(seq)
+            if os.path.exists(path) and os.path.getsize(path) + len(line) > self.segment_bytes:
+                seq += 1
+                path = self._path(seq)
+            with open(path, 'ab') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._evict()
+
+    def _evict(self):
+        """Delete the oldest segments until the spool fits in max_bytes."""
+        segments = self._segments()
+        sizes = {seq: os.path.getsize(self._path(seq)) for seq in segments}
+        total = sum(sizes.values())
+        # Never delete the segment being written to
+        for seq in segments[:-1]:
+            if total <= self.max_bytes:
+                break
+            os.remove(self._path(seq))
+            total -= sizes[seq]
+            if self._cursor[0] <= seq:
+                self._cursor = (seq + 1, 0)
+                self._save_cursor()
+
+    # Reading
+
+    def read_batch(self, max_records):
+        """Return ``(records, token)`` for up to `max_records` unacked records.
+
+        Pass `token` to `ack` once the records were delivered. Torn lines
+        left by a crash mid-write are skipped.
+        """
+        records = []
+        with self._lock:
+            seq, offset = self._cursor
+            for segment in self._segments():
+                if segment < seq:
+                    continue
+                if segment > seq:
+                    seq, offset = segment, 0
+                with open(self._path(segment), 'rb') as f:
+                    f.seek(offset)
+                    while len(records) < max_records:
+                        line = f.readline()
+                        if not line.endswith(b'\n'):
+                            break
+                        offset += len(line)
+                        try:
+                            records.append(json.loads(line))
+                        except ValueError:
+                            continue
+                if len(records) >= max_records:
+                    break
+            return records, (seq, offset)
+
+    def ack(self, token):
+        """Mark everything up to `token` as delivered and drop consumed segments."""
+        with self._lock:
+            self._cursor = token
+            segments = self._segments()
+            for seq in segments:
+                if seq < token[0]:
+                    os.remove(self._path(seq))
+            # A fully read segment that is no longer written to can go too
+            if segments and token[0] in segments and token[0] != segments[-1]:
+                if token[1] >= os.path.getsize(self._path(token[0])):
+                    os.remove(self._path(token[0]))
+                    self._cursor = (token[0] + 1, 0)
+            self._save_cursor()
+
+    def empty(self):
+        """True when every record has been acknowledged."""
+        records, _ = self.read_batch(1)
+        return not records
+
+
+class Backoff:
+    """Exponential backoff with jitter between delivery attempts."""
+
+    def __init__(self, base=1.0, cap=300.0, clock=time.monotonic):
+        self.base = base
+        self.cap = cap
+        self.clock = clock
+        self.failures = 0
+        self.next_attempt = 0.0
+
+    def ready(self):
+        """True when the next attempt may be made."""
+        return self.clock() >= self.next_attempt
+
+    def failure(self):
+        """Record a failed attempt and return the delay until the next one."""
+        self.failures += 1
+        delay = min(self.cap, self.base * (2 ** (self.failures - 1)))
+        delay *= random.uniform(0.5, 1.0)
+        self.next_attempt = self.clock() + delay
+        return delay
+
+    def success(self):
+        self.failures = 0
+        self.next_attempt = 0.0
@@ -4,8 +4,15 @@ Server Monitoring Worker
 
 This script collects system metrics and sends them to a monitoring dashboard.
 Configure your credentials in config.py before running.
+
+Metrics are written to a local spool (spool.py, copied next to this
+script) before being sent, so nothing is lost while the dashboard is
+unreachable. Spooled samples are replayed in batches once it recovers,
+with exponential backoff between failed attempts.
 """
 
+import gzip
+import os
 import time
 import requests
 import json
@@ -13,6 +20,7 @@ import psutil
 import socket
 from datetime import datetime, timezone
 from config import *
+from spool import Backoff, Spool
 
 class MonitoringWorker:
     def __init__(self):
@@ -23,6 +31,14 @@ class MonitoringWorker:
         self.check_interval = CHECK_INTERVAL
         self.monitored_resources = MONITORED_RESOURCES
 
+        # Local spool for samples that have not been delivered yet
+        spool_dir = SPOOL_DIR if 'SPOOL_DIR' in globals() else os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'spool')
+        spool_max_mb = SPOOL_MAX_MB if 'SPOOL_MAX_MB' in globals() else 50
+        self.replay_batch_size = REPLAY_BATCH_SIZE if 'REPLAY_BATCH_SIZE' in globals() else 500
+        self.spool = Spool(spool_dir, max_bytes=spool_max_mb * 1024 * 1024)
+        self.backoff = Backoff(base=min(self.check_interval, 30), cap=600)
+
         # Setup session with authentication
         self.session = requests.Session()
         self.session.headers.update({
@@ -122,29 +138,48 @@ class MonitoringWorker:
         return metrics
 
     def send_metrics(self, metrics):
-        """Send metrics to the monitoring endpoint."""
-        payload = {
-            'monitor_id': self.monitor_id,
-            'data': metrics
-        }
-
-        try:
-            response = self.session.post(
-                self.endpoint_url,
-                json=payload,
-                timeout=30
-            )
-
-            if response.status_code == 200:
-                print(f"[{datetime.now()}] Successfully sent metrics")
+        """Spool metrics and deliver everything pending to the monitoring endpoint."""
+        self.spool.append(metrics)
+        return self.drain_spool()
+
+    def drain_spool(self):
+        """Send spooled samples in batches, oldest first, unless backing off.
+
+        Returns True once the spool is empty.
+        """
+        while self.backoff.ready():
+            samples, token = self.spool.read_batch(self.replay_batch_size)
+            if not samples:
                 return True
-            else:
-                print(f"[{datetime.now()}] Failed to send metrics: {response.status_code}")
+            batch = {
+                'v': 1,
+                'monitor_id': self.monitor_id,
+                'counters': 'absolute',
+                'samples': samples,
+            }
+            try:
+                response = self.session.post(
+                    self.endpoint_url,
+                    data=gzip.compress(json.dumps(batch).encode('utf-8')),
+                    headers={'Content-Encoding': 'gzip'},
+                    timeout=(5, 30)
+                )
+                delivered = response.status_code == 200
+                if not delivered:
+                    print(f"[{datetime.now()}] Failed to send metrics: {response.status_code}")
+            except Exception as e:
+                print(f"[{datetime.now()}] Error sending metrics: {e}")
+                delivered = False
+
+            if not delivered:
+                delay = self.backoff.failure()
+                print(f"[{datetime.now()}] Keeping metrics in the spool, next attempt in {delay:.0f}s")
                 return False
 
-        except Exception as e:
-            print(f"[{datetime.now()}] Error sending metrics: {e}")
-            return False
+            self.spool.ack(token)
+            self.backoff.success()
+            print(f"[{datetime.now()}] Successfully sent {len(samples)} sample(s)")
+        return False
 
     def run(self):
         """Main worker loop."""
@@ -159,7 +194,7 @@ class MonitoringWorker:
                 success = self.send_metrics(metrics)
 
                 if not success:
-                    print("Failed to send metrics, will retry on next interval")
+                    print("Metrics spooled, will retry when the endpoint is reachable")
 
             except Exception as e:
                 print(f"Error in monitoring loop: {e}")
@@ -0,0 +1,199 @@
+"""
+Background sampler for the local `/api/monitoring/system` snapshot.
+
+The endpoint used to call `psutil.cpu_percent(interval=0.1)` inline,
+blocking the worker for 100ms per poll. A `SystemSampler` thread now
+refreshes one snapshot every `interval` seconds and the endpoint returns
+it from memory, already serialized. CPU usage is measured since the
+previous refresh (never blocking), and network and disk I/O counters are
+turned into per-second rates from the deltas between refreshes.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import psutil
+except Exception:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+NETWORK_COUNTERS = ('bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv')
+DISK_COUNTERS = ('read_bytes', 'write_bytes', 'read_count', 'write_count')
+
+
+def _rates(current, previous, fields, elapsed):
+    """Per-second deltas of counter `fields` (None without a previous sample)."""
+    rates = {}
+    for field in fields:
+        if previous is None or elapsed <= 0:
+            rates[f'{field}_per_sec'] = None
+        else:
+            # Counters reset on interface/device changes; report 0, not a negative rate
+            delta = getattr(current, field) - getattr(previous, field)
+            rates[f'{field}_per_sec'] = round(max(0, delta) / elapsed, 2)
+    return rates
+
+
+class SystemSampler:
+    """Refreshes a shared system metrics snapshot at a fixed cadence."""
+
+    def __init__(self, interval=2.0, disk_path='/', clock=time.monotonic):
+        self.interval = interval
+        self.disk_path = disk_path
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._previous = None  # (taken_at, net counters, disk counters)
+        self._snapshot = None
+        self._body = None
+        self._cpu_count = psutil.cpu_count(logical=True) if psutil is not None else None
+        if psutil is not None:
+            # Prime the counter so the first refresh reports usage since now
+            psutil.cpu_percent(interval=None)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def refresh(self):
+        """Take a new snapshot and return it."""
+        now = self.clock()
+        try:
+            load = os.getloadavg()
+        except Exception:
+            load = None
+        virtual_mem = psutil.virtual_memory()
+        swap_mem = psutil.swap_memory()
+        disk_usage = psutil.disk_usage(self.disk_path)
+        net_io = psutil.net_io_counters()
+        try:
+            disk_io = psutil.disk_io_counters()
+        except Exception:
+            disk_io = None
+
+        previous_at, previous_net, previous_disk = self._previous or (None, None, None)
+        elapsed = now - previous_at if previous_at is not None else 0
+
+        snapshot = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'cpu': {
+                'percent': psutil.cpu_percent(interval=None),
+                'count': self._cpu_count,
+                'loadavg_1m_5m_15m': load,
+            },
+            'memory': {
+                'total': virtual_mem.total,
+                'available': virtual_mem.available,
+                'used': virtual_mem.used,
+                'free': getattr(virtual_mem, 'free', None),
+                'percent': virtual_mem.percent,
+                'swap_total': swap_mem.total,
+                'swap_used': swap_mem.used,
+                'swap_free': swap_mem.free,
+                'swap_percent': swap_mem.percent,
+            },
+            'disk': {
+                'total': disk_usage.total,
+                'used': disk_usage.used,
+                'free': disk_usage.free,
+                'percent': disk_usage.percent,
+            },
+            'network': {
+                'bytes_sent': net_io.bytes_sent,
+                'bytes_recv': net_io.bytes_recv,
+                'packets_sent': net_io.packets_sent,
+                'packets_recv': net_io.packets_recv,
+                'errin': net_io.errin,
+                'errout': net_io.errout,
+                'dropin': net_io.dropin,
+                'dropout': net_io.dropout,
+                **_rates(net_io, previous_net, NETWORK_COUNTERS, elapsed),
+            },
+        }
+        if disk_io is not None:
+            snapshot['disk']['io'] = _rates(disk_io, previous_disk, DISK_COUNTERS, elapsed)
+
+        body = json.dumps(snapshot, separators=(',', ':')).encode('utf-8')
+        with self._lock:
+            self._previous = (now, net_io, disk_io)
+            self._snapshot, self._body = snapshot, body
+        return snapshot
+
+    def snapshot(self):
+        """The latest snapshot, taking one first if there is none yet."""
+        with self._lock:
+            snapshot = self._snapshot
+        return snapshot if snapshot is not None else self.refresh()
+
+    def body(self):
+        """The latest snapshot as JSON bytes."""
+        with self._lock:
+            body = self._body
+        if body is None:
+            self.refresh()
+            with self._lock:
+                body = self._body
+        return body
+
+    def start(self):
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='system-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Failed to sample system metrics")
+            if self._stop_event.wait(self.interval):
+                return
+
+
+# Global sampler instance
+system_sampler = None
+
+
+def init_system_sampler(app):
+    """Start the global sampler; returns None when psutil is unavailable.
+
+    With MONITORING_SYSTEM_SAMPLE_INTERVAL=0 no thread is started and the
+    snapshot is refreshed on every request instead.
+    """
+    global system_sampler
+    if system_sampler is not None:
+        system_sampler.stop()
+        system_sampler = None
+    if psutil is None:
+        return None
+    interval = app.config.get('MONITORING_SYSTEM_SAMPLE_INTERVAL', 2.0)
+    system_sampler = SystemSampler(interval=interval)
+    if interval and interval > 0:
+        system_sampler.start()
+    return system_sampler
+
+
+def get_system_sampler():
+    return system_sampler
+
+
+@atexit.register
+def _stop_on_exit():
+    if system_sampler is not None:
+        system_sampler.stop()
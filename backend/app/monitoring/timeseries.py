@@ -0,0 +1,437 @@
+"""
+Time-series storage for metrics pushed to /api/monitoring/data.
+
+Agent payloads are flattened into narrow `MetricSample` rows
+(monitor, metric name, epoch second, value). Writes are buffered and
+flushed in batches by a background thread so a burst of agents reporting
+at the same time turns into a few multi-row INSERTs instead of one
+transaction per request. Reads aggregate samples into fixed-size buckets
+(min/max/avg per bucket) in SQL, served from the coarsest rollup tier
+(see app/monitoring/rollup.py) that matches the requested step. Each tier
+and the raw samples are purged by time range after their own retention.
+"""
+
+import atexit
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import func
+
+from app.models.base import db
+from app.models.metric_rollup import MetricLateBucket, MetricRollup
+from app.models.metric_sample import MetricSample
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the number of buckets returned per series
+MAX_POINTS = 1000
+
+# Rows deleted per statement when purging expired samples
+PURGE_CHUNK = 10000
+
+# Raw samples are stored at whole-second resolution
+RAW_RESOLUTION = 1
+
+# Rollup tiers: (bucket width in seconds, retention config key, default days)
+TIERS = (
+    (300, 'METRICS_RETENTION_5M_DAYS', 90),
+    (3600, 'METRICS_RETENTION_1H_DAYS', 365),
+    (86400, 'METRICS_RETENTION_1D_DAYS', 1825),
+)
+
+# Seconds to wait after a bucket ends before rolling it up, for agents
+# whose samples arrive late
+ROLLUP_LAG = 120
+
+
+def _number(value):
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _timestamp(payload, data):
+    raw = data.get('timestamp') or payload.get('timestamp')
+    if isinstance(raw, (int, float)) and not isinstance(raw, bool):
+        return int(raw)
+    if raw:
+        try:
+            value = datetime.fromisoformat(str(raw).replace('Z', '+00:00'))
+        except ValueError:
+            value = None
+        if value is not None:
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            return int(value.timestamp())
+    return int(time.time())
+
+
+def extract_samples(payload):
+    """Flatten an agent payload into ``(ts, [(metric, value), ...])``.
+
+    Understands both payload shapes in use:
+
+    - the Python agents (`MetricsSender`, standalone_worker.py) send
+      ``{"monitor_id", "data": {"cpu": {"usage_percent"}, "memory":
+      {"percentage"}, "storage": [...], "network": [...]}}``;
+    - the Rust agent and /api/monitoring/system send ``{"cpu": {"percent"},
+      "memory": {"percent"}, "disk": {...}, "network": {...}}``.
+
+    Network counters are summed over interfaces; storage is reported per
+    mount point plus the fullest mount as ``storage.percent``.
+    """
+    data = payload.get('data') if isinstance(payload.get('data'), dict) else payload
+    ts = _timestamp(payload, data)
+    samples = []
+
+    def add(metric, value):
+        value = _number(value)
+        if value is not None:
+            samples.append((metric, value))
+
+    cpu = data.get('cpu')
+    if isinstance(cpu, dict):
+        add('cpu.percent', cpu.get('usage_percent', cpu.get('percent')))
+        load = cpu.get('load_average') or cpu.get('loadavg_1m_5m_15m')
+        if isinstance(load, (list, tuple)) and load:
+            add('cpu.load1', load[0])
+
+    memory = data.get('memory')
+    if isinstance(memory, dict):
+        add('memory.percent', memory.get('percentage', memory.get('percent')))
+        add('memory.used', memory.get('used'))
+
+    storage = data.get('storage', data.get('disk'))
+    if isinstance(storage, dict):
+        storage = [storage]
+    if isinstance(storage, list):
+        fullest = None
+        for disk in storage:
+            if not isinstance(disk, dict):
+                continue
+            percent = _number(disk.get('percentage', disk.get('percent')))
+            if percent is None:
+                continue
+            if disk.get('mountpoint'):
+                add(f"storage[{disk['mountpoint']}].percent", percent)
+            fullest = percent if fullest is None else max(fullest, percent)
+        add('storage.percent', fullest)
+
+    network = data.get('network')
+    if isinstance(network, dict):
+        network = [network]
+    if isinstance(network, list):
+        totals = {}
+        for nic in network:
+            if not isinstance(nic, dict):
+                continue
+            for key in ('bytes_sent', 'bytes_recv'):
+                value = _number(nic.get(key))
+                if value is not None:
+                    totals[key] = totals.get(key, 0.0) + value
+        for key, value in totals.items():
+            add(f'network.{key}', value)
+
+    return ts, samples
+
+
+def _insert_ignore(table, rows):
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        stmt = pg_insert(table).on_conflict_do_nothing()
+    elif dialect == 'sqlite':
+        stmt = table.insert().prefix_with('OR IGNORE')
+    else:
+        stmt = table.insert()
+    db.session.execute(stmt, rows)
+
+
+def mark_late_buckets(buckets):
+    """Record 5-minute bucket starts the rollup job has to recompute."""
+    _insert_ignore(MetricLateBucket.__table__, [{'ts': ts} for ts in sorted(set(buckets))])
+
+
+def _insert_rows(rows, now=None):
+    """Insert sample dicts, ignoring duplicates of an existing (monitor, metric, ts).
+
+    Samples older than the newest 5-minute bucket the rollup job recomputes
+    on every run (replayed spools, skewed clocks) mark their bucket in
+    `MetricLateBucket` so the next run re-rolls it.
+    """
+    if not rows:
+        return
+    _insert_ignore(MetricSample.__table__, rows)
+    finest = TIERS[0][0]
+    now = int(now if now is not None else time.time())
+    horizon = (now - ROLLUP_LAG) // finest * finest - finest
+    late = {row['ts'] // finest * finest for row in rows if row['ts'] < horizon}
+    if late:
+        mark_late_buckets(late)
+    db.session.commit()
+
+
+def store_samples(monitor_id, ts, samples):
+    """Write one payload's samples immediately (used when no writer runs)."""
+    _insert_rows([{'monitor_id': monitor_id, 'metric': m, 'ts': ts, 'value': v} for m, v in samples])
+
+
+class SampleWriter:
+    """Buffers samples and flushes them in batches from a background thread."""
+
+    def __init__(self, app, batch_size=500, flush_interval=2.0):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='metrics-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def add(self, monitor_id, ts, samples):
+        with self._lock:
+            self._buffer.extend(
+                {'monitor_id': monitor_id, 'metric': m, 'ts': ts, 'value': v} for m, v in samples
+            )
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+        with self.app.app_context():
+            try:
+                for start in range(0, len(rows), self.batch_size):
+                    _insert_rows(rows[start:start + self.batch_size])
+            except Exception:
+                db.session.rollback()
+                logger.exception('Failed to write %d metric samples', len(rows))
+                return 0
+        return len(rows)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+def purge_expired(retention_days, now=None, resolution=RAW_RESOLUTION):
+    """Delete samples of one tier older than `retention_days`, oldest range first.
+
+    `resolution` selects raw samples (RAW_RESOLUTION) or a rollup tier.
+    Deletes in chunks of about PURGE_CHUNK rows so a large backlog never
+    holds one long transaction. Returns the number of rows deleted.
+    """
+    if resolution == RAW_RESOLUTION:
+        table, criteria = MetricSample.__table__, ()
+    else:
+        table = MetricRollup.__table__
+        criteria = (table.c.resolution == resolution,)
+    ts = table.c.ts
+    cutoff = int(now if now is not None else time.time()) - int(retention_days * 86400)
+    deleted = 0
+    while True:
+        oldest = db.session.query(func.min(ts)).filter(*criteria).scalar()
+        if oldest is None or oldest >= cutoff:
+            break
+        # Grow the range until it holds about one chunk, capped at the cutoff
+        upper = db.session.query(ts).filter(*criteria, ts < cutoff) \
+            .order_by(ts).offset(PURGE_CHUNK).limit(1).scalar()
+        upper = cutoff if upper is None else min(upper, cutoff)
+        if upper <= oldest:
+            upper = oldest + 1
+        result = db.session.execute(table.delete().where(*criteria, ts < upper))
+        db.session.commit()
+        deleted += result.rowcount or 0
+    return deleted
+
+
+def retention_by_resolution(config):
+    """Map each resolution (raw and every tier) to its retention in days."""
+    retention = {RAW_RESOLUTION: config.get('METRICS_RAW_RETENTION_DAYS', 14)}
+    for resolution, key, default in TIERS:
+        retention[resolution] = config.get(key, default)
+    return retention
+
+
+def min_resolution(start, retention, now=None):
+    """Finest resolution whose retention window still reaches back to `start`."""
+    now = int(now if now is not None else time.time())
+    for resolution in sorted(retention):
+        if start >= now - int(retention[resolution] * 86400):
+            return resolution
+    return max(retention)
+
+
+def choose_step(start, end, requested=None, minimum=RAW_RESOLUTION):
+    """Return a bucket width (seconds) giving at most MAX_POINTS buckets.
+
+    Steps of 5 minutes or more are rounded up to a multiple of the coarsest
+    rollup tier they cover, so the query can be answered from that tier.
+    """
+    span = max(1, end - start)
+    step = max(minimum, int(requested or 0), math.ceil(span / MAX_POINTS))
+    resolution = pick_resolution(step, exact=False)
+    return math.ceil(step / resolution) * resolution
+
+
+def pick_resolution(step, exact=True):
+    """Coarsest stored resolution that can answer buckets of `step` seconds.
+
+    With `exact`, the tier must divide `step` so no rollup bucket straddles
+    two result buckets; otherwise the coarsest tier not wider than `step`.
+    """
+    for resolution, _, _ in reversed(TIERS):
+        if resolution <= step and (not exact or step % resolution == 0):
+            return resolution
+    return RAW_RESOLUTION
+
+
+def rollup_watermark(resolution):
+    """End (exclusive, epoch seconds) of the data already rolled up into a tier."""
+    last = db.session.query(func.max(MetricRollup.ts)) \
+        .filter(MetricRollup.resolution == resolution).scalar()
+    return None if last is None else last + resolution
+
+
+def _finer(resolution):
+    finer = [r for r, _, _ in TIERS if r < resolution]
+    return finer[-1] if finer else RAW_RESOLUTION
+
+
+def _aggregate(monitor_id, metrics, start, end, step, resolution):
+    if resolution == RAW_RESOLUTION:
+        source = MetricSample
+        columns = (func.min(source.value), func.max(source.value), func.sum(source.value), func.count())
+        criteria = ()
+    else:
+        source = MetricRollup
+        columns = (func.min(source.min), func.max(source.max), func.sum(source.sum), func.sum(source.count))
+        criteria = (source.resolution == resolution,)
+    bucket = (source.ts // step * step) if step > 1 else source.ts
+    bucket = bucket.label('bucket')
+    return (
+        db.session.query(source.metric, bucket, *columns)
+        .filter(
+            source.monitor_id == monitor_id,
+            source.metric.in_(metrics),
+            *criteria,
+            source.ts >= start,
+            source.ts < end,
+        )
+        .group_by(source.metric, bucket)
+        .all()
+    )
+
+
+def query_series(monitor_id, metrics, start, end, step):
+    """Aggregate samples into ``step``-second buckets.
+
+    Reads the coarsest rollup tier that divides `step`; the tail of the
+    range that the tier doesn't cover yet is read from the next finer tier
+    (ultimately raw samples) and merged in. Returns ``{metric: [{"t",
+    "min", "max", "avg", "count"}, ...]}`` with buckets in ascending time
+    order; empty buckets are omitted.
+    """
+    buckets = {m: {} for m in metrics}
+    resolution = pick_resolution(step)
+    while start < end:
+        if resolution == RAW_RESOLUTION:
+            split = end
+        else:
+            covered = rollup_watermark(resolution)
+            split = start if covered is None else min(end, max(start, covered))
+        if split > start:
+            for metric, t, lo, hi, total, count in _aggregate(monitor_id, metrics, start, split, step, resolution):
+                merged = buckets[metric].get(int(t))
+                if merged is None:
+                    buckets[metric][int(t)] = [lo, hi, total, count]
+                else:
+                    merged[0] = min(merged[0], lo)
+                    merged[1] = max(merged[1], hi)
+                    merged[2] += total
+                    merged[3] += count
+        start = split
+        resolution = _finer(resolution)
+
+    return {
+        metric: [
+            {'t': t, 'min': lo, 'max': hi, 'avg': total / count if count else None, 'count': int(count)}
+            for t, (lo, hi, total, count) in sorted(points.items())
+        ]
+        for metric, points in buckets.items()
+    }
+
+
+def list_metric_names(monitor_id, since):
+    """Metric names reported by a monitor since `since` (epoch seconds)."""
+    names = set()
+    for source in (MetricSample, MetricRollup):
+        rows = (db.session.query(source.metric)
+                .filter(source.monitor_id == monitor_id, source.ts >= since)
+                .distinct()
+                .all())
+        names.update(r.metric for r in rows)
+    return sorted(names)
+
+
+# Global writer instance
+sample_writer = None
+
+
+def init_sample_writer(app):
+    """Create and start the global sample writer.
+
+    Returns None when METRICS_WRITE_BACKEND is 'inline'.
+    """
+    global sample_writer
+    if sample_writer is not None:
+        sample_writer.stop()
+        sample_writer = None
+    if app.config.get('METRICS_WRITE_BACKEND', 'batch') == 'inline':
+        return None
+    sample_writer = SampleWriter(
+        app,
+        batch_size=app.config.get('METRICS_WRITE_BATCH_SIZE', 500),
+        flush_interval=app.config.get('METRICS_FLUSH_INTERVAL', 2.0),
+    )
+    sample_writer.start()
+    return sample_writer
+
+
+def get_sample_writer():
+    """Get the global sample writer, or None when samples are written inline."""
+    return sample_writer
+
+
+@atexit.register
+def _flush_on_exit():
+    if sample_writer is not None:
+        sample_writer.stop()
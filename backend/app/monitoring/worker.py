@@ -1,55 +1,113 @@
 """
 Server monitoring worker.
 Background worker that periodically collects and sends system metrics.
+
+All monitors are driven by one scheduler thread that keeps a heap of
+(next due time, monitor) entries and hands due checks to a bounded thread
+pool, so the number of threads doesn't grow with the number of monitors.
+Host metrics are sampled once per `sample_ttl` seconds and the snapshot
+is shared by all monitors. Each monitor's configuration is cached (refreshed every `config_ttl`
+seconds) together with its `MetricsSender`, whose HTTP session is reused
+across checks, and `last_check_at` updates are written in batches (see
+app/monitoring/last_check.py).
 """
 
+import atexit
+import heapq
+import itertools
+import os
 import threading
 import time
+import uuid
 import logging
-from datetime import datetime, timezone
-from app.monitoring.collector import MetricsCollector
+from concurrent.futures import ThreadPoolExecutor
+from app.monitoring.alerts import evaluate_monitor
+from app.monitoring.collector import MetricsCollector, SharedSampler
+from app.monitoring.last_check import record_check
 from app.monitoring.sender import MetricsSender
+from app.monitoring.timeseries import extract_samples
 from app.models.server_monitor import ServerMonitor
 from app.models.base import db
 
 logger = logging.getLogger(__name__)
 
+# Delay before retrying a monitor whose check raised
+ERROR_RETRY_DELAY = 60
+
+
+class _MonitorEntry:
+    """Scheduling state and cached configuration for one monitor."""
+
+    __slots__ = ('monitor_id', 'monitor', 'loaded_at', 'sender', 'sender_key',
+                 'busy', 'next_run', 'last_run', 'last_error')
+
+    def __init__(self, monitor_id):
+        self.monitor_id = monitor_id
+        self.monitor = None  # detached ServerMonitor snapshot
+        self.loaded_at = None
+        self.sender = None
+        self.sender_key = None
+        self.busy = False
+        self.next_run = None
+        self.last_run = None
+        self.last_error = None
+
 
 class MonitoringWorker:
     """Background worker for server monitoring."""
 
-    def __init__(self, app=None):
+    def __init__(self, app=None, max_workers=8, config_ttl=60, sample_ttl=5.0, send_options=None):
         self.app = app
+        # Extra MetricsSender arguments (batch_size, fmt, compression, spool_dir, ...)
+        self.send_options = send_options or {}
         self.collector = MetricsCollector()
-        self.workers = {}  # monitor_id -> thread
-        self.running = False
+        # One host snapshot per `sample_ttl` seconds, shared by every monitor
+        self.sampler = SharedSampler(self.collector, ttl=sample_ttl)
+        self.max_workers = max_workers
+        self.config_ttl = config_ttl
+        self._entries = {}  # monitor_id -> _MonitorEntry
+        self._heap = []  # (due, seq, entry)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._pool = None
+        self._thread = None
 
-    def start_monitoring(self, monitor_id):
-        """Start monitoring for a specific monitor configuration."""
-        if monitor_id in self.workers:
-            logger.warning(f"Monitoring already running for {monitor_id}")
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _ensure_started(self):
+        if self.running:
             return
+        self._stop_event.clear()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='monitor-check')
+        self._thread = threading.Thread(target=self._run, name='monitor-scheduler', daemon=True)
+        self._thread.start()
 
-        thread = threading.Thread(
-            target=self._monitor_loop,
-            args=(monitor_id,),
-            daemon=True
-        )
-        self.workers[monitor_id] = thread
-        thread.start()
-        logger.info(f"Started monitoring worker for {monitor_id}")
+    def start_monitoring(self, monitor_id):
+        """Start monitoring for a specific monitor configuration."""
+        with self._cond:
+            if monitor_id in self._entries:
+                logger.warning(f"Monitoring already running for {monitor_id}")
+                return
+            entry = _MonitorEntry(monitor_id)
+            self._entries[monitor_id] = entry
+            self._schedule(entry, time.monotonic())
+            self._ensure_started()
+        logger.info(f"Started monitoring for {monitor_id}")
 
     def stop_monitoring(self, monitor_id):
         """Stop monitoring for a specific monitor configuration."""
-        if monitor_id not in self.workers:
+        with self._cond:
+            entry = self._entries.pop(monitor_id, None)
+        if entry is None:
             logger.warning(f"No monitoring worker found for {monitor_id}")
             return
-
-        # Set a flag to stop the thread
-        self.workers[monitor_id]._stop_event = True
-        self.workers[monitor_id].join(timeout=5)
-        del self.workers[monitor_id]
-        logger.info(f"Stopped monitoring worker for {monitor_id}")
+        # A queued heap item for the entry is skipped when it comes due
+        if entry.sender is not None:
+            entry.sender.close()
+        logger.info(f"Stopped monitoring for {monitor_id}")
 
     def start_all_active_monitors(self):
         """Start monitoring for all active monitor configurations."""
@@ -60,57 +118,140 @@ class MonitoringWorker:
 
     def stop_all_monitors(self):
         """Stop all monitoring workers."""
-        for monitor_id in list(self.workers.keys()):
+        for monitor_id in list(self._entries.keys()):
             self.stop_monitoring(monitor_id)
 
-    def _monitor_loop(self, monitor_id):
-        """Main monitoring loop for a specific monitor."""
-        thread = threading.current_thread()
-        thread._stop_event = False
-
-        while not getattr(thread, '_stop_event', False):
-            try:
-                with self.app.app_context():
-                    monitor = ServerMonitor.query.get(monitor_id)
-                    if not monitor or not monitor.is_active:
-                        logger.info(f"Monitor {monitor_id} is no longer active, stopping worker")
-                        break
-
-                    # Collect metrics
-                    metrics = self.collector.collect_all_metrics()
-
-                    # Send metrics if endpoint is configured
-                    if monitor.endpoint_url:
-                        sender = MetricsSender(
-                            api_key=monitor.api_key,
-                            api_secret=monitor.api_secret,
-                            endpoint_url=monitor.endpoint_url
-                        )
-
-                        success = sender.send_metrics(metrics, monitor_id)
-                        if success:
-                            # Update last check timestamp
-                            monitor.last_check_at = datetime.now(timezone.utc)
-                            db.session.commit()
-
-                    # Wait for next check interval
-                    time.sleep(monitor.check_interval)
-
-            except Exception as e:
-                logger.error(f"Error in monitoring loop for {monitor_id}: {e}")
-                time.sleep(60)  # Wait a minute before retrying
+    def shutdown(self):
+        """Stop all monitors, the scheduler thread and the check pool."""
+        for entry in list(self._entries.values()):
+            if entry.sender is not None:
+                entry.sender.flush(entry.monitor_id)
+        self.stop_all_monitors()
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def _schedule(self, entry, due):
+        # Caller holds self._cond
+        entry.next_run = due
+        heapq.heappush(self._heap, (due, next(self._seq), entry))
+        self._cond.notify()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            with self._cond:
+                now = time.monotonic()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    _, _, entry = heapq.heappop(self._heap)
+                    # Skip entries that were stopped (or restarted) since being queued
+                    if self._entries.get(entry.monitor_id) is entry and not entry.busy:
+                        entry.busy = True
+                        due.append(entry)
+                if not due:
+                    self._cond.wait(self._heap[0][0] - now if self._heap else None)
+                    continue
+            for entry in due:
+                self._pool.submit(self._check, entry)
+
+    def _check(self, entry):
+        """Run one check for a monitor and schedule its next one."""
+        delay = ERROR_RETRY_DELAY
+        try:
+            with self.app.app_context():
+                monitor = self._monitor_config(entry)
+                if monitor is None or not monitor.is_active:
+                    logger.info(f"Monitor {entry.monitor_id} is no longer active, stopping worker")
+                    with self._cond:
+                        if self._entries.get(entry.monitor_id) is entry:
+                            del self._entries[entry.monitor_id]
+                    return
+
+                # Collect metrics (shared with the other monitors due now)
+                metrics = self.sampler.snapshot()
+
+                # Check alert thresholds against the fresh sample
+                ts, samples = extract_samples({'data': metrics})
+                evaluate_monitor(monitor, ts, samples)
+
+                # Send metrics if endpoint is configured
+                if monitor.endpoint_url:
+                    sender = self._sender(entry, monitor)
+                    # Only a delivered snapshot counts; a spooled one may never arrive
+                    if sender.send_metrics(metrics, entry.monitor_id) is True:
+                        record_check(entry.monitor_id)
+
+                entry.last_run = time.time()
+                entry.last_error = None
+                delay = monitor.check_interval or 60
+        except Exception as e:
+            entry.last_error = str(e)
+            logger.error(f"Error in monitoring loop for {entry.monitor_id}: {e}")
+        finally:
+            with self._cond:
+                entry.busy = False
+                if self._entries.get(entry.monitor_id) is entry:
+                    self._schedule(entry, time.monotonic() + delay)
+
+    def _monitor_config(self, entry):
+        """Return the cached monitor snapshot, reloading it once it is stale."""
+        now = time.monotonic()
+        if entry.monitor is not None and now - entry.loaded_at < self.config_ttl:
+            return entry.monitor
+        monitor = db.session.get(ServerMonitor, _as_uuid(entry.monitor_id))
+        if monitor is not None and monitor.is_deleted:
+            monitor = None
+        if monitor is not None:
+            db.session.expunge(monitor)
+        entry.monitor, entry.loaded_at = monitor, now
+        return monitor
+
+    def _sender(self, entry, monitor):
+        """Reuse the monitor's sender (and its HTTP session) until its credentials change."""
+        key = (monitor.api_key, monitor.api_secret, monitor.endpoint_url)
+        if entry.sender is None or entry.sender_key != key:
+            if entry.sender is not None:
+                entry.sender.close()
+            options = dict(self.send_options)
+            if options.get('spool_dir'):
+                # One spool per monitor
+                options['spool_dir'] = os.path.join(options['spool_dir'], str(entry.monitor_id))
+            entry.sender = MetricsSender(
+                api_key=monitor.api_key,
+                api_secret=monitor.api_secret,
+                endpoint_url=monitor.endpoint_url,
+                **options
+            )
+            entry.sender_key = key
+        return entry.sender
 
     def get_worker_status(self):
         """Get status of all monitoring workers."""
+        thread_id = self._thread.ident if self._thread is not None else None
+        now = time.monotonic()
+        with self._cond:
+            entries = list(self._entries.values())
         return {
-            monitor_id: {
-                'running': thread.is_alive(),
-                'thread_id': thread.ident
+            entry.monitor_id: {
+                'running': self.running,
+                'thread_id': thread_id,
+                'next_check_in': max(0.0, entry.next_run - now) if entry.next_run is not None else None,
+                'last_error': entry.last_error,
             }
-            for monitor_id, thread in self.workers.items()
+            for entry in entries
         }
 
 
+def _as_uuid(monitor_id):
+    return monitor_id if isinstance(monitor_id, uuid.UUID) else uuid.UUID(str(monitor_id))
+
+
 # Global worker instance
 monitoring_worker = None
 
@@ -118,10 +259,30 @@ monitoring_worker = None
 def init_monitoring_worker(app):
     """Initialize the global monitoring worker."""
     global monitoring_worker
-    monitoring_worker = MonitoringWorker(app)
+    if monitoring_worker is not None:
+        monitoring_worker.shutdown()
+    monitoring_worker = MonitoringWorker(
+        app,
+        max_workers=app.config.get('MONITORING_WORKERS', 8),
+        config_ttl=app.config.get('MONITORING_CONFIG_TTL', 60),
+        sample_ttl=app.config.get('MONITORING_SAMPLE_TTL', 5.0),
+        send_options={
+            'batch_size': app.config.get('MONITORING_SEND_BATCH_SIZE', 1),
+            'fmt': app.config.get('MONITORING_SEND_FORMAT', 'json'),
+            'compression': app.config.get('MONITORING_SEND_COMPRESSION') or None,
+            'spool_dir': app.config.get('MONITORING_SPOOL_DIR') or None,
+            'spool_max_bytes': app.config.get('MONITORING_SPOOL_MAX_MB', 50) * 1024 * 1024,
+        },
+    )
     return monitoring_worker
 
 
 def get_monitoring_worker():
     """Get the global monitoring worker instance."""
-    return monitoring_worker
\ No newline at end of file
+    return monitoring_worker
+
+
+@atexit.register
+def _shutdown_on_exit():
+    if monitoring_worker is not None:
+        monitoring_worker.shutdown()
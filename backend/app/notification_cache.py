@@ -0,0 +1,193 @@
+"""Per-user notification cache keys and unread counters.
+
+Each user's notification list is cached under a versioned key,
+``notifications:{user_id}:v{n}``. Writing a notification bumps ``n`` for
+that recipient only, so the stale entry is simply never read again and
+expires on its own; other users keep their cached lists.
+
+The unread count lives in a Redis counter (``notifications:{user_id}:unread``)
+that is seeded from the database on first read and then adjusted by the
+deltas of each committed transaction. A seed is dropped if the user's list
+version moved while it was being counted, since the delta of that commit
+may already be missing from (or included in) the count; it also expires
+after UNREAD_TTL, which bounds the error of a commit that lands between
+its COUNT and its version bump.
+
+Both are maintained from SQLAlchemy session events, so every code path that
+creates, reads or deletes a Notification through the ORM is covered. Core
+statements that bypass the ORM (`Notification.bulk_create`, bulk mark-read)
+report their changes with `record_changes`.
+"""
+
+import logging
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, attributes
+
+logger = logging.getLogger(__name__)
+
+LIST_TTL = 60
+UNREAD_TTL = 300
+VERSION_TTL = 86400
+
+_SESSION_KEY = 'notification_changes'
+
+# INCRBY only when the counter exists; a missing counter is re-seeded from the
+# database on the next read instead of starting from a wrong baseline.
+_INCR_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return nil
+"""
+
+# SET NX only when the list version still matches the one read before the
+# COUNT, i.e. no commit touched this user's notifications in between.
+_SEED_IF_UNCHANGED = """
+if (redis.call('GET', KEYS[1]) or '0') == ARGV[1] then
+    return redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3], 'NX')
+end
+return nil
+"""
+
+
+def _redis():
+    try:
+        return getattr(current_app, 'redis_client', None)
+    except RuntimeError:
+        return None
+
+
+def _version_key(user_id):
+    return f'notifications:{user_id}:ver'
+
+
+def _unread_key(user_id):
+    return f'notifications:{user_id}:unread'
+
+
+def list_cache_key(user_id):
+    """Cache key for a user's notification list at its current version."""
+    version = 0
+    client = _redis()
+    if client is not None:
+        try:
+            version = int(client.get(_version_key(user_id)) or 0)
+        except Exception:
+            logger.warning('Could not read notification cache version', exc_info=True)
+    return f'notifications:{user_id}:v{version}'
+
+
+def _count_unread(user_id):
+    from app.models.notification import Notification
+    return Notification.active().filter_by(user_id=user_id, is_read=False).count()
+
+
+def unread_count(user_id):
+    """Return the number of unread notifications for a user."""
+    client = _redis()
+    version = None
+    if client is not None:
+        try:
+            value, version = client.mget(_unread_key(user_id), _version_key(user_id))
+            if value is not None:
+                return max(0, int(value))
+        except Exception:
+            logger.warning('Could not read unread counter', exc_info=True)
+            client = None
+
+    count = _count_unread(user_id)
+    if client is not None:
+        try:
+            client.eval(_SEED_IF_UNCHANGED, 2, _version_key(user_id), _unread_key(user_id),
+                        int(version or 0), count, UNREAD_TTL)
+        except Exception:
+            logger.warning('Could not seed unread counter', exc_info=True)
+    return count
+
+
+def record_changes(session, unread_deltas):
+    """Register recipients touched in `session`, applied when it commits.
+
+    `unread_deltas` maps user_id -> change in that user's unread count (0 when
+    only the list changed).
+    """
+    pending = session.info.setdefault(_SESSION_KEY, {})
+    for user_id, delta in unread_deltas.items():
+        pending[user_id] = pending.get(user_id, 0) + delta
+
+
+def invalidate(unread_deltas):
+    """Bump list versions and adjust unread counters for the given users."""
+    client = _redis()
+    if client is None or not unread_deltas:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for user_id, delta in unread_deltas.items():
+            pipe.incr(_version_key(user_id))
+            pipe.expire(_version_key(user_id), VERSION_TTL)
+            if delta:
+                pipe.eval(_INCR_IF_EXISTS, 1, _unread_key(user_id), delta)
+        pipe.execute()
+    except Exception:
+        logger.warning('Could not invalidate notification cache', exc_info=True)
+
+
+def _is_unread(is_read, is_deleted):
+    return not is_read and not is_deleted
+
+
+def _previous(obj, name):
+    history = attributes.get_history(obj, name)
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, name)
+
+
+def track_read_state(model):
+    """Load the previous read/deleted flags on assignment.
+
+    Scalar attributes don't keep their old value when set on an expired
+    instance (e.g. right after a commit), which would hide the unread ->
+    read transition from the flush hook below.
+    """
+    for attr in (model.is_read, model.is_deleted):
+        event.listen(attr, 'set', _noop_set, active_history=True)
+
+
+def _noop_set(target, value, oldvalue, initiator):
+    pass
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_notification_changes(session, flush_context):
+    from app.models.notification import Notification
+
+    deltas = {}
+    for obj in session.new:
+        if isinstance(obj, Notification):
+            deltas[obj.user_id] = deltas.get(obj.user_id, 0) + int(_is_unread(obj.is_read, obj.is_deleted))
+    for obj in session.dirty:
+        if isinstance(obj, Notification) and session.is_modified(obj, include_collections=False):
+            before = _is_unread(_previous(obj, 'is_read'), _previous(obj, 'is_deleted'))
+            after = _is_unread(obj.is_read, obj.is_deleted)
+            deltas[obj.user_id] = deltas.get(obj.user_id, 0) + int(after) - int(before)
+    for obj in session.deleted:
+        if isinstance(obj, Notification):
+            deltas[obj.user_id] = deltas.get(obj.user_id, 0) - int(_is_unread(obj.is_read, obj.is_deleted))
+    if deltas:
+        record_changes(session, deltas)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_notification_changes(session):
+    pending = session.info.pop(_SESSION_KEY, None)
+    if pending:
+        invalidate(pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_notification_changes(session):
+    session.info.pop(_SESSION_KEY, None)
@@ -0,0 +1,196 @@
+"""Keyset (cursor) pagination helpers shared by list endpoints.
+
+Cursors are opaque to clients: they are URL-safe base64 encoded JSON arrays
+holding the sort key of the last row on a page, e.g. ``[updated_at, id]``.
+Endpoints order by a timestamp column plus the primary key so that rows with
+identical timestamps are still totally ordered and no row is skipped or
+repeated between pages.
+
+Polling for new rows (`poll_since`) can't rely on that order alone: a
+timestamp set when the inserting transaction started can commit after a
+cursor past it was handed out. `since` cursors therefore hold the newest
+timestamp delivered plus the ids delivered within an overlap window behind
+it; each poll re-reads that window and skips those ids.
+"""
+
+import base64
+import json
+import uuid
+from datetime import datetime, timezone
+
+from flask import abort, request
+from sqlalchemy import String, and_, literal, or_
+
+from app.models.base import db
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(ts, id_):
+    """Encode a (timestamp, id) sort key into an opaque cursor string."""
+    if ts is not None and ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    raw = json.dumps([ts.isoformat() if ts else None, str(id_)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by `encode_cursor`.
+
+    Returns a ``(datetime, uuid.UUID)`` tuple. Raises ValueError on any
+    malformed input so callers can turn it into a 400 response.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        ts_raw, id_raw = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        ts = datetime.fromisoformat(ts_raw)
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        return ts, uuid.UUID(id_raw)
+    except Exception:
+        raise ValueError('invalid cursor')
+
+
+def get_page_size(default=DEFAULT_PAGE_SIZE):
+    """Read and clamp the `limit` query parameter."""
+    try:
+        limit = int(request.args.get('limit', default))
+    except (TypeError, ValueError):
+        abort(400, 'limit must be an integer')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def parse_datetime_arg(name):
+    """Parse an optional ISO-8601 query parameter into an aware datetime."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        abort(400, f'{name} must be an ISO-8601 datetime')
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def keyset_filter(ts_column, id_column, cursor, descending=True):
+    """Return a WHERE clause selecting rows strictly after `cursor`.
+
+    The expanded ``ts < :ts OR (ts = :ts AND id < :id)`` form is used instead
+    of a row-value comparison so it works on every backend we run against
+    while still letting the planner use a ``(ts, id)`` composite index.
+    """
+    ts, id_ = decode_cursor(cursor)
+    return keyset_condition(ts_column, id_column, ts, id_, descending)
+
+
+def keyset_condition(ts_column, id_column, ts, id_, descending=True, inclusive=False):
+    """WHERE clause comparing ``(ts_column, id_column)`` with ``(ts, id_)``.
+
+    Selects rows before the key when `descending`, after it otherwise;
+    `inclusive` also matches the key's own row.
+    """
+    ts = _bind_timestamp(ts)
+    if descending:
+        tie = id_column <= id_ if inclusive else id_column < id_
+        return or_(ts_column < ts, and_(ts_column == ts, tie))
+    tie = id_column >= id_ if inclusive else id_column > id_
+    return or_(ts_column > ts, and_(ts_column == ts, tie))
+
+
+def _bind_timestamp(ts):
+    """Bind a cursor timestamp in the same form the backend stores it.
+
+    SQLite keeps datetimes as text and `func.now()` defaults are written
+    without microseconds, so the default bind format (always `.%f`) would
+    never compare equal to a stored value and pages would repeat rows.
+    """
+    if db.engine.dialect.name == 'sqlite':
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+        fmt = '%Y-%m-%d %H:%M:%S.%f' if ts.microsecond else '%Y-%m-%d %H:%M:%S'
+        return literal(ts.strftime(fmt), String)
+    return ts
+
+
+def paginate(query, ts_column, id_column, limit, cursor=None, descending=True, ts_attr=None):
+    """Run a keyset-paginated query.
+
+    Fetches ``limit + 1`` rows to know whether another page exists without a
+    separate COUNT. Returns ``(rows, next_cursor)`` where `next_cursor` is None
+    on the last page.
+    """
+    if cursor:
+        try:
+            query = query.filter(keyset_filter(ts_column, id_column, cursor, descending))
+        except ValueError:
+            abort(400, 'invalid cursor')
+    if descending:
+        query = query.order_by(ts_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(ts_column.asc(), id_column.asc())
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, ts_attr or ts_column.key), last.id)
+    return rows, next_cursor
+
+
+def _aware(ts):
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts
+
+
+def since_cursor(rows, ts_attr, overlap, mark=None):
+    """Encode a `since` cursor after delivering `rows`.
+
+    `mark` is the newest timestamp delivered before them, if any. Only the
+    ids within `overlap` of the new mark are kept, so the cursor stays small.
+    """
+    stamps = [(_aware(getattr(row, ts_attr)), row.id) for row in rows]
+    if mark is None and not stamps:
+        return None
+    mark = max([ts for ts, _ in stamps] + ([mark] if mark is not None else []))
+    ids = sorted(str(id_) for ts, id_ in stamps if ts >= mark - overlap)
+    raw = json.dumps([mark.isoformat(), ids], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_since(cursor):
+    """Decode a `since` cursor into ``(mark, set of delivered ids)``.
+
+    Plain `encode_cursor` cursors are accepted too, with their id as the only
+    delivered one. Raises ValueError on malformed input.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        ts_raw, ids = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if isinstance(ids, str):
+            ids = [ids]
+        return _aware(datetime.fromisoformat(ts_raw)), {uuid.UUID(i) for i in ids}
+    except Exception:
+        raise ValueError('invalid cursor')
+
+
+def poll_since(query, ts_column, id_column, limit, since, overlap, ts_attr=None):
+    """Rows not yet delivered according to the `since` cursor, oldest first.
+
+    Returns ``(rows, since, has_more)`` with the cursor for the next poll.
+    A row is only missed if it commits more than `overlap` after the newest
+    row delivered before it.
+    """
+    try:
+        mark, seen = decode_since(since)
+    except ValueError:
+        abort(400, 'invalid cursor')
+    rows = query.filter(ts_column >= _bind_timestamp(mark - overlap)) \
+        .order_by(ts_column.asc(), id_column.asc()) \
+        .limit(limit + 1 + len(seen)).all()
+    fresh = [row for row in rows if row.id not in seen]
+    has_more = len(fresh) > limit
+    fresh = fresh[:limit]
+    delivered = [row for row in rows if row.id in seen] + fresh
+    return fresh, since_cursor(delivered, ts_attr or ts_column.key, overlap, mark=mark), has_more
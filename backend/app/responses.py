@@ -0,0 +1,47 @@
+"""Response helpers for write endpoints.
+
+Historically every create/update endpoint answered with the whole collection
+(`Model.active().all()`), which makes each write O(table size). Clients can
+now ask for just the affected entity instead, either per request with
+``?response=entity`` / ``X-Response-Mode: entity`` or globally through the
+`WRITE_RESPONSE_MODE` config value. Entity responses carry an ETag and an
+``X-Resource-Version`` header derived from ``updated_at`` so SPA clients can
+merge the change into their local copy and discard stale updates.
+"""
+
+from datetime import timezone
+
+from flask import current_app, jsonify, request
+
+ENTITY = 'entity'
+COLLECTION = 'collection'
+
+
+def wants_entity_response():
+    """Return True when the caller asked for only the mutated resource."""
+    mode = (
+        request.args.get('response')
+        or request.headers.get('X-Response-Mode')
+        or current_app.config.get('WRITE_RESPONSE_MODE', COLLECTION)
+    )
+    return mode.strip().lower() == ENTITY
+
+
+def resource_version(obj):
+    """Version string for a model instance: its updated_at in microseconds."""
+    updated_at = getattr(obj, 'updated_at', None)
+    if updated_at is None:
+        return '0'
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return str(int(updated_at.timestamp() * 1_000_000))
+
+
+def entity_response(obj, payload=None, status=200):
+    """JSON response for a single entity with ETag/version headers."""
+    version = resource_version(obj)
+    resp = jsonify(payload if payload is not None else obj.to_dict())
+    resp.status_code = status
+    resp.set_etag(f'{obj.id}:{version}', weak=True)
+    resp.headers['X-Resource-Version'] = version
+    return resp
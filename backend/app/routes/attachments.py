@@ -5,6 +5,7 @@ from app.models.user import User
 from app.models.notification import Notification
 from app.hooks import send_attachment_created, send_attachment_updated, send_attachment_deleted
 from app.models.base import db
+from app.responses import wants_entity_response, entity_response
 
 attachments_bp = Blueprint('attachments', __name__)
 
@@ -111,7 +112,9 @@ def create_attachment():
     # Keep backward-compatible fields in the payload
     payload = a.to_dict()
     payload['type'] = data.get('type', payload.get('resource_type') or 'raw')
-    
+
+    if wants_entity_response():
+        return entity_response(a, payload, status=201)
     # Return all attachments
     items = Media.active().all()
     return jsonify([a.to_dict() for a in items]), 201
@@ -143,7 +146,9 @@ def update_attachment(id_):
     
     payload = a.to_dict()
     payload['type'] = data.get('type', payload.get('resource_type') or 'raw')
-    
+
+    if wants_entity_response():
+        return entity_response(a, payload)
     # Return all attachments
     items = Media.active().all()
     return jsonify([a.to_dict() for a in items])
@@ -5,6 +5,7 @@ from app.models.user import User
 from app.models.notification import Notification
 from app.hooks import send_comment_created, send_comment_updated, send_comment_deleted
 from app.models.base import db
+from app.responses import wants_entity_response, entity_response
 
 comments_bp = Blueprint('comments', __name__)
 
@@ -61,6 +62,8 @@ def create_comment():
 
         logging.exception('error running comment.created hooks')
 
+    if wants_entity_response():
+        return entity_response(c, status=201)
     comments = Comment.active().all()
     return jsonify([c.to_dict() for c in comments]), 201
 
@@ -85,7 +88,9 @@ def update_comment(id_):
         import logging
 
         logging.exception('error running comment.updated hooks')
-    
+
+    if wants_entity_response():
+        return entity_response(c)
     comments = Comment.active().all()
     return jsonify([c.to_dict() for c in comments])
 
@@ -2,17 +2,20 @@ from flask import Blueprint, request, jsonify, abort
 from app.models.conversation import Conversation
 from app.models.conversation_participant import ConversationParticipant
 from app.models.message import Message
-from app.models.message_read_status import MessageReadStatus
 from app.models.user import User
 from app.models.ticket import Ticket
 from app.hooks import send_conversation_created, send_message_created, send_message_deleted
 from app.models.base import db
+from app.pagination import encode_cursor, get_page_size, keyset_condition, paginate
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import uuid
 from functools import wraps
 
 conversations_bp = Blueprint('conversations', __name__)
 
+# Characters of the latest message included in the conversation list
+LAST_MESSAGE_PREVIEW_LENGTH = 140
+
 
 def jwt_required_optional(fn):
     """JWT required decorator that allows OPTIONS requests through"""
@@ -47,20 +50,75 @@ def list_conversations():
     # Subquery of conversation ids where the current user is a participant
     participant_conv_ids = db.session.query(ConversationParticipant.conversation_id).filter_by(user_id=current_user_id)
 
-    # Include conversations that are not direct OR where the user is a participant
-    conversations = Conversation.active().filter(
-        (Conversation.type != 'direct') | (Conversation.id.in_(participant_conv_ids))
-    ).all()
+    # Everything the list shows is computed in one statement: the viewer's
+    # read cursor is outer-joined, while the last message, unread count and
+    # the other participant's name (for direct chats) are correlated
+    # subqueries backed by the (conversation_id, created_at, id) index.
+    viewer = db.aliased(ConversationParticipant)
+    last_message = db.aliased(Message)
+
+    last_message_id = (
+        db.select(Message.id)
+        .where(Message.conversation_id == Conversation.id, Message.is_deleted.is_(False))
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(1)
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+    unread_count = (
+        db.select(db.func.count(Message.id))
+        .where(
+            Message.conversation_id == Conversation.id,
+            Message.is_deleted.is_(False),
+            Message.sender_id != current_user_id,
+            db.or_(
+                viewer.last_read_at.is_(None),
+                Message.created_at > viewer.last_read_at,
+                db.and_(Message.created_at == viewer.last_read_at, Message.id > viewer.last_read_message_id),
+            ),
+        )
+        .correlate(Conversation, viewer)
+        .scalar_subquery()
+    )
+    other_name = (
+        db.select(db.func.coalesce(User.name, User.email))
+        .join(ConversationParticipant, ConversationParticipant.user_id == User.id)
+        .where(ConversationParticipant.conversation_id == Conversation.id,
+               ConversationParticipant.user_id != current_user_id)
+        .limit(1)
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+
+    rows = (
+        db.session.query(
+            Conversation,
+            last_message,
+            unread_count.label('unread_count'),
+            db.case((Conversation.type == 'direct', other_name), else_=None).label('other_name'),
+        )
+        .outerjoin(viewer, db.and_(viewer.conversation_id == Conversation.id, viewer.user_id == current_user_id))
+        .outerjoin(last_message, last_message.id == last_message_id)
+        .filter(Conversation.is_deleted.is_(False))
+        # Include conversations that are not direct OR where the user is a participant
+        .filter((Conversation.type != 'direct') | (Conversation.id.in_(participant_conv_ids)))
+        .all()
+    )
 
     result = []
-    for c in conversations:
+    for c, last, unread, other in rows:
         conv_dict = c.to_dict()
-        if c.type == 'direct':
+        if c.type == 'direct' and other:
             # For direct conversations, set title to the other participant's name
-            other_participants = [p for p in c.participants if str(p.user_id) != str(current_user_id)]
-            if other_participants:
-                other_user = other_participants[0].user
-                conv_dict['title'] = other_user.name or other_user.email
+            conv_dict['title'] = other
+        conv_dict['unread_count'] = unread or 0
+        conv_dict['last_message'] = {
+            'id': str(last.id),
+            'sender_id': str(last.sender_id),
+            'content': last.content[:LAST_MESSAGE_PREVIEW_LENGTH],
+            'message_type': last.message_type,
+            'created_at': last.to_dict()['created_at'],
+        } if last else None
         result.append(conv_dict)
 
     return jsonify(result)
@@ -233,24 +291,56 @@ def get_messages(id_):
     if not participant:
         abort(403, 'not a participant in this conversation')
     
-    messages = Message.active().filter_by(conversation_id=conv.id).order_by(Message.created_at).all()
-    
-    # Get read status for current user
-    read_message_ids = set(
-        db.session.query(MessageReadStatus.message_id)
-        .filter_by(user_id=current_user_id)
-        .filter(MessageReadStatus.message_id.in_([m.id for m in messages]))
-        .all()
-    )
-    read_message_ids = {str(mid) for (mid,) in read_message_ids}
-    
-    result = []
-    for m in messages:
-        msg_dict = m.to_dict()
-        msg_dict['is_read'] = str(m.id) in read_message_ids
-        result.append(msg_dict)
-    
-    return jsonify(result)
+    query = Message.active().filter_by(conversation_id=conv.id)
+
+    # Message windows are opt-in (via `limit`, `before` or `after`) so the
+    # existing client that expects the full history as an array keeps working.
+    if any(k in request.args for k in ('limit', 'before', 'after')):
+        return jsonify(_message_window(query, participant))
+
+    messages = query.order_by(Message.created_at, Message.id).all()
+    return jsonify([_message_dict(m, participant) for m in messages])
+
+
+def _message_dict(message, participant):
+    msg_dict = message.to_dict()
+    msg_dict['is_read'] = participant.has_read(message)
+    return msg_dict
+
+
+def _message_window(query, participant):
+    """Return a window of messages in chronological order.
+
+    - no cursor: the latest `limit` messages;
+    - `before=<cursor>`: the `limit` messages preceding the cursor;
+    - `after=<cursor>`: the `limit` messages following the cursor.
+
+    The response carries a `before` cursor to load older messages (null once
+    the start of the conversation is reached) and an `after` cursor pointing
+    at the newest message returned, for polling.
+    """
+    limit = get_page_size()
+    after = request.args.get('after')
+    if after:
+        messages, more = paginate(query, Message.created_at, Message.id, limit,
+                                  cursor=after, descending=False)
+        first = messages[0] if messages else None
+        before_cursor = encode_cursor(first.created_at, first.id) if first else None
+        has_more = more is not None
+    else:
+        messages, before_cursor = paginate(query, Message.created_at, Message.id, limit,
+                                           cursor=request.args.get('before'))
+        messages.reverse()
+        has_more = False
+
+    last = messages[-1] if messages else None
+    return {
+        'items': [_message_dict(m, participant) for m in messages],
+        'before': before_cursor,
+        'after': encode_cursor(last.created_at, last.id) if last else after,
+        'has_more': has_more,
+        'limit': limit,
+    }
 
 
 @conversations_bp.route('/<id_>/messages', methods=['POST'])
@@ -295,6 +385,9 @@ def create_message(id_):
         parent_message_id=parent_message_id
     )
     m.save()
+    # The sender has obviously read their own message
+    ConversationParticipant.advance_read_cursor(conv.id, current_user_id, m)
+    db.session.commit()
     print(f"[MESSAGE] Created message {m.id} in conversation {conv.id} by user {sender_id}")
 
     # emit hook
@@ -304,18 +397,8 @@ def create_message(id_):
         import logging
         logging.exception('error running message.created hooks')
 
-    # Return the conversation with messages
-    conv_dict = conv.to_dict()
-    if conv.type == 'direct':
-        # For direct conversations, set title to the other participant's name
-        other_participants = [p for p in conv.participants if str(p.user_id) != str(sender_id)]
-        if other_participants:
-            other_user = other_participants[0].user
-            conv_dict['title'] = other_user.name or other_user.email
-
-    messages = Message.active().filter_by(conversation_id=conv.id).order_by(Message.created_at).all()
-    conv_dict['messages'] = [msg.to_dict() for msg in messages]
-    return jsonify(conv_dict), 201
+    # Return only the new message; clients append it to their window
+    return jsonify(m.to_dict()), 201
 
 
 @conversations_bp.route('/<conv_id>/messages/<message_id>/read', methods=['POST'])
@@ -339,39 +422,24 @@ def mark_message_read(conv_id, message_id):
     if not participant:
         abort(403, 'not a participant in this conversation')
     
-    # Check if already read, insert if needed (safe against races/duplicates)
-    from app.models.message_read_status import MessageReadStatus
-    existing = MessageReadStatus.query.filter_by(message_id=message_id, user_id=current_user_id).first()
-    if existing:
+    marked = _advance_read_cursor(participant, message)
+    if not marked:
         return jsonify({'status': 'already read', 'messages_marked_read': 0}), 200
+    return jsonify({'status': 'marked as read', 'messages_marked_read': marked}), 200
 
-    # Attempt to insert safely. If Postgres available, use ON CONFLICT DO NOTHING for efficiency.
-    read_status = MessageReadStatus(message_id=message_id, user_id=current_user_id)
-    if db.session.bind and getattr(db.session.bind, 'dialect', None) and db.session.bind.dialect.name == 'postgresql':
-        try:
-            from sqlalchemy.dialects.postgresql import insert as pg_insert
-            row = {
-                'id': uuid.uuid4(),
-                'message_id': read_status.message_id,
-                'user_id': read_status.user_id,
-                'is_deleted': read_status.is_deleted,
-            }
-            stmt = pg_insert(MessageReadStatus.__table__).values([row])
-            stmt = stmt.on_conflict_do_nothing(index_elements=['message_id', 'user_id'])
-            db.session.execute(stmt)
-            db.session.commit()
-            return jsonify({'status': 'marked as read', 'messages_marked_read': 1}), 200
-        except Exception:
-            db.session.rollback()
-    # Fallback: try a per-row insert and tolerate IntegrityError if inserted concurrently
-    try:
-        db.session.add(read_status)
-        db.session.commit()
-        return jsonify({'status': 'marked as read', 'messages_marked_read': 1}), 200
-    except Exception:
-        # likely an IntegrityError due to a concurrent insert. Return success: 0 newly created.
-        db.session.rollback()
-        return jsonify({'status': 'already read', 'messages_marked_read': 0}), 200
+
+def _advance_read_cursor(participant, message):
+    """Mark everything up to and including `message` read for `participant`.
+
+    Returns the number of messages that became read.
+    """
+    newly_read = participant.unread_messages().filter(
+        keyset_condition(Message.created_at, Message.id, message.created_at, message.id,
+                         descending=True, inclusive=True)
+    ).count()
+    moved = ConversationParticipant.advance_read_cursor(participant.conversation_id, participant.user_id, message)
+    db.session.commit()
+    return newly_read if moved else 0
 
 
 @conversations_bp.route('/<conv_id>/read', methods=['POST'])
@@ -391,101 +459,12 @@ def mark_conversation_read(conv_id):
     if not participant:
         abort(403, 'not a participant in this conversation')
 
-    # Get all unread messages in this conversation
-    unread_messages = Message.active().filter_by(conversation_id=conv.id).filter(
-        ~Message.id.in_(
-            db.session.query(MessageReadStatus.message_id).filter_by(user_id=current_user_id)
-        )
-    ).all()
+    latest = (Message.active().filter_by(conversation_id=conv.id)
+              .order_by(Message.created_at.desc(), Message.id.desc())
+              .first())
+    marked = _advance_read_cursor(participant, latest) if latest else 0
 
-    # Build read status objects
-    read_statuses = []
-    for msg in unread_messages:
-        read_statuses.append(MessageReadStatus(message_id=msg.id, user_id=current_user_id))
-
-    # Insert with upsert on Postgres or safe per-row insert
-    if read_statuses:
-        if db.session.bind and getattr(db.session.bind, 'dialect', None) and db.session.bind.dialect.name == 'postgresql':
-            try:
-                from sqlalchemy.dialects.postgresql import insert as pg_insert
-                rows = [
-                    {
-                        'id': uuid.uuid4(),
-                        'message_id': rs.message_id,
-                        'user_id': rs.user_id,
-                        'is_deleted': rs.is_deleted,
-                    }
-                    for rs in read_statuses
-                ]
-                stmt = pg_insert(MessageReadStatus.__table__).values(rows)
-                stmt = stmt.on_conflict_do_nothing(index_elements=['message_id', 'user_id'])
-                db.session.execute(stmt)
-                db.session.commit()
-            except Exception:
-                db.session.rollback()
-        else:
-            from sqlalchemy.exc import IntegrityError
-            try:
-                db.session.bulk_save_objects(read_statuses)
-                db.session.commit()
-            except IntegrityError:
-                db.session.rollback()
-                for rs in read_statuses:
-                    exists = MessageReadStatus.query.filter_by(message_id=rs.message_id, user_id=rs.user_id).first()
-                    if not exists:
-                        db.session.add(rs)
-                db.session.commit()
-
-    return jsonify({'status': 'conversation marked as read', 'messages_marked_read': len(read_statuses)}), 200
-    
-    # Mark all unread messages as read
-    # Deduplicate message IDs in case unread_messages contains duplicates
-    read_statuses = []
-    seen_msg_ids = set()
-    for message in unread_messages:
-        if message.id in seen_msg_ids:
-            continue
-        seen_msg_ids.add(message.id)
-        read_status = MessageReadStatus(message_id=message.id, user_id=current_user_id)
-        read_statuses.append(read_status)
-    
-    if read_statuses:
-        # Try to perform a bulk upsert (insert do nothing on conflict) on Postgres
-        try:
-            from sqlalchemy.dialects.postgresql import insert as pg_insert
-            rows = [
-                {
-                    'id': uuid.uuid4(),
-                    'message_id': rs.message_id,
-                    'user_id': rs.user_id,
-                    'is_deleted': rs.is_deleted,
-                }
-                for rs in read_statuses
-            ]
-            stmt = pg_insert(MessageReadStatus.__table__).values(rows)
-            stmt = stmt.on_conflict_do_nothing(index_elements=['message_id', 'user_id'])
-            db.session.execute(stmt)
-            db.session.commit()
-        except Exception:
-            # Fall back to safe per-row insert if upsert isn't available (e.g., sqlite or older SQLAlchemy)
-            from sqlalchemy.exc import IntegrityError
-            try:
-                # As a fallback for distinctive DBs, prefer session.add_all with an exist check
-                db.session.bulk_save_objects(read_statuses)
-                db.session.commit()
-            except IntegrityError:
-                db.session.rollback()
-                # Insert rows individually, skipping any that already exist to avoid UniqueViolation
-                for rs in read_statuses:
-                    exists = MessageReadStatus.query.filter_by(message_id=rs.message_id, user_id=rs.user_id).first()
-                    if not exists:
-                        db.session.add(rs)
-                db.session.commit()
-    
-    return jsonify({
-        'status': 'conversation marked as read',
-        'messages_marked_read': len(read_statuses)
-    }), 200
+    return jsonify({'status': 'conversation marked as read', 'messages_marked_read': marked}), 200
 
 
 @conversations_bp.route('/<conv_id>/read-up-to/<message_id>', methods=['POST'])
@@ -510,54 +489,11 @@ def mark_messages_read_up_to(conv_id, message_id):
     if not participant:
         abort(403, 'not a participant in this conversation')
     
-    # Get all unread messages in this conversation that were sent before or at the same time as the specified message
-    unread_messages = Message.active().filter_by(conversation_id=conv.id).filter(
-        Message.created_at <= message.created_at
-    ).filter(
-        ~Message.id.in_(
-            db.session.query(MessageReadStatus.message_id).filter_by(user_id=current_user_id)
-        )
-    ).all()
-    
-    # Mark all these messages as read
-    # Deduplicate message IDs before creating read status objects
-    read_statuses = []
-    seen_msg_ids = set()
-    for msg in unread_messages:
-        if msg.id in seen_msg_ids:
-            continue
-        seen_msg_ids.add(msg.id)
-        read_status = MessageReadStatus(message_id=msg.id, user_id=current_user_id)
-        read_statuses.append(read_status)
-    
-    if read_statuses:
-        # If we're backed by Postgres, use an efficient ON CONFLICT DO NOTHING upsert
-        if db.session.bind and getattr(db.session.bind, 'dialect', None) and db.session.bind.dialect.name == 'postgresql':
-            from sqlalchemy.dialects.postgresql import insert as pg_insert
-            rows = [
-                {
-                    'id': uuid.uuid4(),
-                    'message_id': rs.message_id,
-                    'user_id': rs.user_id,
-                    'is_deleted': rs.is_deleted,
-                }
-                for rs in read_statuses
-            ]
-            stmt = pg_insert(MessageReadStatus.__table__).values(rows)
-            stmt = stmt.on_conflict_do_nothing(index_elements=['message_id', 'user_id'])
-            db.session.execute(stmt)
-            db.session.commit()
-        else:
-            # Fall back to safe per-row insert; skip existing rows to avoid duplicates
-            for rs in read_statuses:
-                exists = MessageReadStatus.query.filter_by(message_id=rs.message_id, user_id=rs.user_id).first()
-                if not exists:
-                    db.session.add(rs)
-            db.session.commit()
-    
+    marked = _advance_read_cursor(participant, message)
+
     return jsonify({
         'status': 'messages marked as read up to specified message',
-        'messages_marked_read': len(read_statuses)
+        'messages_marked_read': marked
     }), 200
 
 
@@ -1,100 +1,90 @@
-from flask import Blueprint, request, jsonify, abort
+import functools
+import logging
+import uuid
+from collections import Counter
+from urllib.parse import urlencode
+
+from flask import Blueprint, request, jsonify, abort, current_app
+from app import cache
 from app.models.ticket import Ticket
-from app.models.comment import Comment
+from app.models.ticket_daily_fact import NO_ID
 from app.models.user import User
 from app.models.base import db
-from sqlalchemy import func, extract, case
-from datetime import datetime, timedelta
+from app.ticket_facts import DIMENSIONS, PERIODS, read_facts, read_state
+from app.ticket_stats import RESOLVED_STATUSES, read_stats
+from sqlalchemy import func
+from datetime import datetime, timedelta, timezone
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
 
+# Months shown in the dashboard's ticket chart (including the current one)
+CHART_MONTHS = 6
+
+# Default span of the date-range reports, in days (including `to`)
+REPORT_DAYS = 30
+
+
+def _format_duration(seconds):
+    if seconds < 3600:  # Less than 1 hour
+        return f"{int(seconds // 60)}m"
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    return f"{hours}h {minutes}m"
+
+
+def _recent_months(count, now=None):
+    """(year, month) for the last `count` calendar months, oldest first."""
+    now = now or datetime.utcnow()
+    year, month = now.year, now.month
+    months = []
+    for _ in range(count):
+        months.append((year, month))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return months[::-1]
+
+
 @dashboard_bp.route('/', methods=['GET'])
 def get_dashboard():
-    # Total tickets
-    total_tickets = Ticket.active().count()
-    
+    # Counters are maintained incrementally in ticket_stats (see
+    # app/ticket_stats.py), so this reads one small table instead of
+    # aggregating over every ticket and comment.
+    stats = read_stats()
+
+    total_tickets = stats.get('total', 0)
+
     # Resolved tickets (assuming 'CLOSED' or 'RESOLVED' status)
-    resolved_tickets = Ticket.active().filter(Ticket.status.in_(['CLOSED', 'RESOLVED'])).count()
-    
-    # Average response time (time from ticket creation to first comment)
-    # This is complex - for simplicity, we'll calculate average time to first response
-    avg_response_query = db.session.query(
-        func.avg(
-            func.extract('epoch', Comment.created_at - Ticket.created_at)
-        )
-    ).join(Ticket, Comment.ticket_id == Ticket.id)\
-     .filter(Ticket.is_deleted == False)\
-     .filter(Comment.is_deleted == False)\
-     .group_by(Ticket.id)\
-     .subquery()
-    
-    avg_response_seconds = db.session.query(func.avg(avg_response_query.c.avg)).scalar()
-    
-    # Convert to minutes/hours format
-    if avg_response_seconds:
-        if avg_response_seconds < 3600:  # Less than 1 hour
-            avg_response = f"{int(avg_response_seconds // 60)}m"
-        else:
-            hours = int(avg_response_seconds // 3600)
-            minutes = int((avg_response_seconds % 3600) // 60)
-            avg_response = f"{hours}h {minutes}m"
+    resolved_tickets = sum(stats.get(f'status:{status}', 0) for status in RESOLVED_STATUSES)
+
+    # Average time from ticket creation to its first response
+    response_count = stats.get('response:count', 0)
+    if response_count:
+        avg_response = _format_duration(stats.get('response:sum', 0) / response_count)
     else:
         avg_response = "N/A"
-    
-    # Tickets by status
-    status_counts = db.session.query(
-        Ticket.status,
-        func.count(Ticket.id).label('count')
-    ).filter(Ticket.is_deleted == False)\
-     .group_by(Ticket.status)\
-     .all()
-    
-    status_data = {status: count for status, count in status_counts}
-    
-    # Tickets by priority
-    priority_counts = db.session.query(
-        Ticket.priority,
-        func.count(Ticket.id).label('count')
-    ).filter(Ticket.is_deleted == False)\
-     .group_by(Ticket.priority)\
-     .all()
-    
-    priority_data = {priority: count for priority, count in priority_counts}
-    
-    # Monthly ticket data for the last 6 months
-    six_months_ago = datetime.utcnow() - timedelta(days=180)
-    monthly_data = db.session.query(
-        extract('year', Ticket.created_at).label('year'),
-        extract('month', Ticket.created_at).label('month'),
-        func.count(Ticket.id).label('count')
-    ).filter(Ticket.created_at >= six_months_ago)\
-     .filter(Ticket.is_deleted == False)\
-     .group_by(extract('year', Ticket.created_at), extract('month', Ticket.created_at))\
-     .order_by(extract('year', Ticket.created_at), extract('month', Ticket.created_at))\
-     .all()
-    
-    # Format monthly data
-    month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
+
+    status_data = {}
+    priority_data = {}
+    for name, count in stats.items():
+        kind, _, key = name.partition(':')
+        if not count:
+            continue
+        if kind == 'status':
+            status_data[key] = count
+        elif kind == 'priority':
+            priority_data[key] = count
+
+    # Monthly ticket data for the last six months
+    month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
                    'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    monthly_chart_data = []
-    for year, month, count in monthly_data:
-        month_name = month_names[int(month) - 1]
-        monthly_chart_data.append({
-            'month': f"{month_name} {int(year)}",
-            'tickets': count
-        })
-    
-    # If no data, provide some sample data for the chart
-    if not monthly_chart_data:
-        monthly_chart_data = [
-            {'month': 'Jan 2025', 'tickets': 120},
-            {'month': 'Feb 2025', 'tickets': 180},
-            {'month': 'Mar 2025', 'tickets': 150},
-            {'month': 'Apr 2025', 'tickets': 200},
-            {'month': 'May 2025', 'tickets': 165},
-        ]
-    
+    monthly_chart_data = [
+        {
+            'month': f"{month_names[month - 1]} {year}",
+            'tickets': stats.get(f'month:{year:04d}-{month:02d}', 0),
+        }
+        for year, month in _recent_months(CHART_MONTHS)
+    ]
+
     # Recent activity (last 10 tickets updated)
     recent_tickets = Ticket.active().order_by(Ticket.updated_at.desc()).limit(10).all()
     recent_activity = []
@@ -118,95 +108,237 @@ def get_dashboard():
     })
 
 
+def _cached_report(view):
+    """Serve a report from the response cache, keyed by path and query params.
+
+    Views return the JSON payload rather than a response. Entries live for
+    REPORT_CACHE_TTL seconds, so reports may lag ticket changes by that much.
+    Cache errors (e.g. Redis down) are logged and the report is computed
+    uncached.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = 'report:' + request.path + '?' + urlencode(sorted(request.args.items(multi=True)))
+        try:
+            payload = cache.get(key)
+        except Exception:
+            logging.warning('Could not read report cache', exc_info=True)
+            payload = None
+        if payload is None:
+            payload = view(*args, **kwargs)
+            try:
+                cache.set(key, payload, timeout=current_app.config.get('REPORT_CACHE_TTL', 60))
+            except Exception:
+                logging.warning('Could not write report cache', exc_info=True)
+        return jsonify(payload)
+    return wrapper
+
+
+def _report_days():
+    """Inclusive (from, to) dates of a report; default: the last 30 days."""
+    end = _parse_date_arg('to')
+    end = end.astimezone(timezone.utc).date() if end else datetime.now(timezone.utc).date()
+    start = _parse_date_arg('from')
+    start = start.astimezone(timezone.utc).date() if start else end - timedelta(days=REPORT_DAYS - 1)
+    if start > end:
+        abort(400, "'from' must not be after 'to'")
+    return start, end
+
+
+def _group_by_arg(default):
+    """Validated `group_by` (comma-separated): an optional period first, then dimensions."""
+    raw = request.args.get('group_by')
+    names = [name.strip() for name in raw.split(',') if name.strip()] if raw else list(default)
+    periods = [name for name in names if name in PERIODS]
+    unknown = [name for name in names if name not in PERIODS and name not in DIMENSIONS]
+    if unknown:
+        abort(400, f"unknown group_by {', '.join(unknown)}")
+    if len(periods) > 1 or len(set(names)) != len(names):
+        abort(400, 'group_by may name one period and each dimension once')
+    return tuple(periods + [name for name in names if name not in PERIODS])
+
+
+def _fact_filters():
+    """Dimension filters from the query string (status, priority, assignee_id, module_id)."""
+    filters = {'status': request.args.get('status'), 'priority': request.args.get('priority')}
+    for name in ('assignee', 'module'):
+        raw = request.args.get(f'{name}_id')
+        if raw == 'none':
+            filters[name] = NO_ID
+        elif raw:
+            try:
+                filters[name] = uuid.UUID(raw)
+            except ValueError:
+                abort(400, f"invalid '{name}_id'")
+    return filters
+
+
+def _group_fields(group_by, group):
+    """Response fields for one fact group (ids as strings, None when unset)."""
+    fields = {}
+    for name, value in zip(group_by, group):
+        if name in PERIODS:
+            fields['date'] = value
+        elif name in ('assignee', 'module'):
+            fields[f'{name}Id'] = str(value) if value != NO_ID else None
+        else:
+            fields[name] = value
+    return fields
+
+
 @dashboard_bp.route('/reports/tickets-by-status', methods=['GET'])
+@_cached_report
 def tickets_by_status():
-    """Detailed breakdown of tickets by status"""
-    status_data = db.session.query(
-        Ticket.status,
-        func.count(Ticket.id).label('count'),
-        func.avg(case((Ticket.status.in_(['CLOSED', 'RESOLVED']), 1), else_=0)).label('resolution_rate')
-    ).filter(Ticket.is_deleted == False)\
-     .group_by(Ticket.status)\
-     .all()
-    
+    """Breakdown of tickets by status.
+
+    `count` is the number of tickets in each status at the end of `to`;
+    `created` / `resolved` / `reopened` count events between `from` and `to`
+    (ISO dates, default: the last 30 days).
+    """
+    start, end = _report_days()
+    filters = _fact_filters()
+    counts = read_state(end, ('status',), **filters)
+    events = read_facts(start, end, ('status',), **filters)
+
     result = []
-    for status, count, resolution_rate in status_data:
+    for (status,) in sorted(set(counts) | set(events)):
+        totals = events.get((status,), {})
         result.append({
             'status': status,
-            'count': count,
-            'resolutionRate': float(resolution_rate) if resolution_rate else 0
+            'count': counts.get((status,), 0),
+            'resolutionRate': 1.0 if status in RESOLVED_STATUSES else 0,
+            'created': totals.get('created', 0),
+            'resolved': totals.get('resolved', 0),
+            'reopened': totals.get('reopened', 0),
         })
-    
-    return jsonify(result)
+    return result
 
 
 @dashboard_bp.route('/reports/agent-performance', methods=['GET'])
+@_cached_report
 def agent_performance():
-    """Performance metrics for agents (assignees)"""
-    agent_data = db.session.query(
-        User.id,
-        User.name,
-        User.email,
-        func.count(Ticket.id).label('assigned_tickets'),
-        func.count(case((Ticket.status.in_(['CLOSED', 'RESOLVED']), Ticket.id))).label('resolved_tickets')
-    ).join(Ticket, User.id == Ticket.assignee_id)\
-     .filter(User.is_deleted == False)\
-     .filter(Ticket.is_deleted == False)\
-     .group_by(User.id, User.name, User.email)\
-     .all()
-    
+    """Performance metrics for agents (assignees).
+
+    `assignedTickets` / `resolvedTickets` describe the tickets assigned to
+    each agent at the end of `to`; `resolvedInPeriod` / `reopenedInPeriod`
+    count status changes of their tickets between `from` and `to`.
+    """
+    start, end = _report_days()
+    filters = _fact_filters()
+    state = read_state(end, ('assignee', 'status'), **filters)
+    events = read_facts(start, end, ('assignee',), measures=('resolved', 'reopened'), **filters)
+
+    assigned, resolved = Counter(), Counter()
+    for (assignee_id, status), count in state.items():
+        assigned[assignee_id] += count
+        if status in RESOLVED_STATUSES:
+            resolved[assignee_id] += count
+    ids = (set(assigned) | {assignee_id for (assignee_id,) in events}) - {NO_ID}
+    users = User.active().filter(User.id.in_(ids)).all() if ids else []
+
     result = []
-    for user_id, name, email, assigned, resolved in agent_data:
+    for user in sorted(users, key=lambda u: (u.name or u.email or '').lower()):
+        totals = events.get((user.id,), {})
         result.append({
-            'id': str(user_id),
-            'name': name or email,
-            'assignedTickets': assigned,
-            'resolvedTickets': resolved,
-            'resolutionRate': (resolved / assigned * 100) if assigned > 0 else 0
+            'id': str(user.id),
+            'name': user.name or user.email,
+            'assignedTickets': assigned[user.id],
+            'resolvedTickets': resolved[user.id],
+            'resolutionRate': (resolved[user.id] / assigned[user.id] * 100) if assigned[user.id] > 0 else 0,
+            'resolvedInPeriod': totals.get('resolved', 0),
+            'reopenedInPeriod': totals.get('reopened', 0),
         })
-    
-    return jsonify(result)
+    return result
 
 
 @dashboard_bp.route('/reports/ticket-trends', methods=['GET'])
+@_cached_report
 def ticket_trends():
-    """Ticket creation and resolution trends over time"""
-    # Get data for last 30 days
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    
-    # Daily ticket creation
-    creation_data = db.session.query(
-        func.date(Ticket.created_at).label('date'),
-        func.count(Ticket.id).label('created')
-    ).filter(Ticket.created_at >= thirty_days_ago)\
-     .filter(Ticket.is_deleted == False)\
-     .group_by(func.date(Ticket.created_at))\
-     .all()
-    
-    # Daily ticket resolution (status changed to closed/resolved)
-    resolution_data = db.session.query(
-        func.date(Ticket.status_changed_at).label('date'),
-        func.count(Ticket.id).label('resolved')
-    ).filter(Ticket.status_changed_at >= thirty_days_ago)\
-     .filter(Ticket.status.in_(['CLOSED', 'RESOLVED']))\
-     .filter(Ticket.is_deleted == False)\
-     .group_by(func.date(Ticket.status_changed_at))\
-     .all()
-    
-    # Combine data
-    date_dict = {}
-    for date, created in creation_data:
-        date_str = date.isoformat()
-        date_dict[date_str] = {'date': date_str, 'created': created, 'resolved': 0}
-    
-    for date, resolved in resolution_data:
-        date_str = date.isoformat()
-        if date_str in date_dict:
-            date_dict[date_str]['resolved'] = resolved
-        else:
-            date_dict[date_str] = {'date': date_str, 'created': 0, 'resolved': resolved}
-    
-    result = list(date_dict.values())
-    result.sort(key=lambda x: x['date'])
-    
-    return jsonify(result)
+    """Tickets created, resolved and reopened over time.
+
+    Query params: `from` / `to` (ISO dates, default: the last 30 days),
+    `group_by` (default ``day``; one of day/week/month and/or any of
+    status, priority, assignee, module) and the filters status, priority,
+    assignee_id and module_id (``none`` for unassigned). Only groups with
+    activity are returned.
+    """
+    start, end = _report_days()
+    group_by = _group_by_arg(('day',))
+    facts = read_facts(start, end, group_by, **_fact_filters())
+
+    result = []
+    for group, totals in sorted(facts.items(), key=lambda item: tuple(map(str, item[0]))):
+        if not any(totals.values()):
+            continue
+        row = _group_fields(group_by, group)
+        row.update({name: totals.get(name, 0) for name in ('created', 'resolved', 'reopened')})
+        result.append(row)
+    return result
+
+
+def _parse_date_arg(name):
+    raw = request.args.get(name)
+    if not raw:
+        return None
+    try:
+        value = datetime.fromisoformat(raw.replace('Z', '+00:00'))
+    except ValueError:
+        abort(400, f"invalid '{name}'")
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _percentiles(query, column, fractions):
+    """Continuous percentiles of `column`, computed in the database where possible."""
+    if db.engine.dialect.name == 'postgresql':
+        row = query.with_entities(*[func.percentile_cont(f).within_group(column) for f in fractions]).one()
+        return [float(v) if v is not None else None for v in row]
+    values = [v for (v,) in query.with_entities(column).order_by(column)]
+    result = []
+    for f in fractions:
+        if not values:
+            result.append(None)
+            continue
+        # Linear interpolation, matching percentile_cont
+        pos = f * (len(values) - 1)
+        low = int(pos)
+        high = min(low + 1, len(values) - 1)
+        result.append(values[low] + (values[high] - values[low]) * (pos - low))
+    return result
+
+
+@dashboard_bp.route('/reports/response-times', methods=['GET'])
+@_cached_report
+def response_times():
+    """First-response time statistics for tickets created in a date range.
+
+    Query params `from` / `to` (ISO-8601, default: the last 30 days). Only
+    tickets that have had a response are included; times are in seconds.
+    """
+    end = _parse_date_arg('to') or datetime.now(timezone.utc)
+    start = _parse_date_arg('from') or end - timedelta(days=30)
+    if start >= end:
+        abort(400, "'from' must be before 'to'")
+
+    # Served from ix_tickets_created_first_response
+    query = Ticket.active() \
+        .filter(Ticket.created_at >= start, Ticket.created_at < end) \
+        .filter(Ticket.first_response_seconds.isnot(None))
+    count, avg = query.with_entities(func.count(Ticket.first_response_seconds),
+                                     func.avg(Ticket.first_response_seconds)).one()
+    p50, p90 = _percentiles(query, Ticket.first_response_seconds, (0.5, 0.9)) if count else (None, None)
+    pending = Ticket.active() \
+        .filter(Ticket.created_at >= start, Ticket.created_at < end) \
+        .filter(Ticket.first_response_at.is_(None)).count()
+
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'responded': count,
+        'awaitingResponse': pending,
+        'avgSeconds': float(avg) if avg is not None else None,
+        'p50Seconds': p50,
+        'p90Seconds': p90,
+        'avgResponse': _format_duration(float(avg)) if avg is not None else "N/A",
+    }
@@ -0,0 +1,250 @@
+"""Streaming exports of tickets, comments, conversations, messages and notifications.
+
+Rows are read with server-side cursors (`yield_per`) and written out as
+they arrive, as CSV (``format=csv``, the default) or newline-delimited JSON
+(``format=ndjson``), so an export of any size runs in constant memory and
+the first bytes go out immediately. Rows are ordered by (created_at, id).
+CSV cells starting with a formula character are prefixed with ``'``.
+
+Every export accepts `created_from` / `created_to` (ISO-8601) plus the
+filters listed on each route. Exports are admin-only, except that users
+may export their own notifications.
+"""
+
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timezone
+
+from flask import Blueprint, Response, abort, current_app, request, stream_with_context
+from flask_jwt_extended import get_jwt_identity, jwt_required
+
+from app.models.base import db
+from app.models.comment import Comment
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.notification import Notification
+from app.models.ticket import Ticket
+from app.models.user import User
+from app.pagination import parse_datetime_arg
+from app.routes.tickets import _apply_ticket_filters
+
+exports_bp = Blueprint('exports', __name__)
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Roughly how much output (characters) is buffered before a chunk is sent
+CHUNK_SIZE = 64 * 1024
+
+# Leading characters that make spreadsheets evaluate a CSV cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+TICKET_COLUMNS = (
+    Ticket.id, Ticket.ticket_id, Ticket.subject, Ticket.description, Ticket.status, Ticket.priority,
+    Ticket.requester_id, Ticket.requester_name, Ticket.assignee_id, Ticket.module_id,
+    Ticket.status_changed_at, Ticket.first_response_at, Ticket.first_response_seconds,
+    Ticket.created_at, Ticket.updated_at,
+)
+COMMENT_COLUMNS = (
+    Comment.id, Comment.ticket_id, Comment.author_id, Comment.parent_comment_id, Comment.content,
+    Comment.created_at, Comment.updated_at,
+)
+CONVERSATION_COLUMNS = (
+    Conversation.id, Conversation.type, Conversation.title, Conversation.ticket_id,
+    Conversation.created_by_id, Conversation.created_at, Conversation.updated_at,
+)
+MESSAGE_COLUMNS = (
+    Message.id, Message.conversation_id, Message.sender_id, Message.parent_message_id,
+    Message.message_type, Message.content, Message.created_at, Message.updated_at,
+)
+NOTIFICATION_COLUMNS = (
+    Notification.id, Notification.user_id, Notification.type, Notification.message,
+    Notification.related_id, Notification.related_type, Notification.conversation_id,
+    Notification.conversation_title, Notification.is_read, Notification.created_at,
+)
+
+
+def _current_user():
+    try:
+        identity_uuid = uuid.UUID(get_jwt_identity())
+    except Exception:
+        abort(401, 'invalid token identity')
+    current = User.query.filter_by(id=identity_uuid).first()
+    if not current:
+        abort(401, 'user not found')
+    return current
+
+
+def _is_admin(user):
+    return (user.role or '').upper() == 'ADMIN'
+
+
+def _require_admin():
+    if not _is_admin(_current_user()):
+        abort(403, 'admin privilege required')
+
+
+def _uuid_arg(name):
+    try:
+        return uuid.UUID(request.args[name]) if request.args.get(name) else None
+    except ValueError:
+        abort(400, f'{name} must be a UUID')
+
+
+def _created_range(query, model):
+    created_from = parse_datetime_arg('created_from')
+    if created_from:
+        query = query.filter(model.created_at >= created_from)
+    created_to = parse_datetime_arg('created_to')
+    if created_to:
+        query = query.filter(model.created_at < created_to)
+    return query
+
+
+def _cell(value):
+    """JSON/CSV-friendly value, formatted like `BaseModel.to_dict`."""
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+    return value
+
+
+def _csv_cell(value):
+    """`_cell` for CSV; text that a spreadsheet would run as a formula is
+    prefixed with a quote."""
+    if value is None:
+        return ''
+    value = _cell(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_chunks(names, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for row in rows:
+        writer.writerow([_csv_cell(v) for v in row])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(names, rows):
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(names, map(_cell, row))), separators=(',', ':'))
+        lines.append(line)
+        size += len(line) + 1
+        if size >= CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines, size = [], 0
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def _export(name, query, columns, model):
+    """Stream `query` (selecting `columns`) in the requested format."""
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in FORMATS:
+        abort(400, f"format must be one of {', '.join(FORMATS)}")
+    names = [column.key for column in columns]
+    query = query.order_by(model.created_at, model.id)
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    rows = query.yield_per(batch_size)
+    chunks = _csv_chunks(names, rows) if fmt == 'csv' else _ndjson_chunks(names, rows)
+    filename = f"{name}-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.{fmt}"
+    return Response(
+        stream_with_context(chunks),
+        mimetype=FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+
+@exports_bp.route('/tickets', methods=['GET'])
+@jwt_required()
+def export_tickets():
+    """Tickets; filters as on the tickets list (status, priority, assignee_id,
+    module_id, created_from, created_to)."""
+    _require_admin()
+    query = _apply_ticket_filters(db.session.query(*TICKET_COLUMNS).filter(Ticket.is_deleted == False))  # noqa: E712
+    return _export('tickets', query, TICKET_COLUMNS, Ticket)
+
+
+@exports_bp.route('/comments', methods=['GET'])
+@jwt_required()
+def export_comments():
+    """Comments; filters: ticket_id, author_id."""
+    _require_admin()
+    query = db.session.query(*COMMENT_COLUMNS).filter(Comment.is_deleted == False)  # noqa: E712
+    ticket_id, author_id = _uuid_arg('ticket_id'), _uuid_arg('author_id')
+    if ticket_id:
+        query = query.filter(Comment.ticket_id == ticket_id)
+    if author_id:
+        query = query.filter(Comment.author_id == author_id)
+    query = _created_range(query, Comment)
+    return _export('comments', query, COMMENT_COLUMNS, Comment)
+
+
+@exports_bp.route('/conversations', methods=['GET'])
+@jwt_required()
+def export_conversations():
+    """Conversations; filters: type, ticket_id."""
+    _require_admin()
+    query = db.session.query(*CONVERSATION_COLUMNS).filter(Conversation.is_deleted == False)  # noqa: E712
+    if request.args.get('type'):
+        query = query.filter(Conversation.type == request.args['type'])
+    ticket_id = _uuid_arg('ticket_id')
+    if ticket_id:
+        query = query.filter(Conversation.ticket_id == ticket_id)
+    query = _created_range(query, Conversation)
+    return _export('conversations', query, CONVERSATION_COLUMNS, Conversation)
+
+
+@exports_bp.route('/messages', methods=['GET'])
+@jwt_required()
+def export_messages():
+    """Messages; filters: conversation_id, sender_id, message_type."""
+    _require_admin()
+    query = db.session.query(*MESSAGE_COLUMNS).filter(Message.is_deleted == False)  # noqa: E712
+    conversation_id, sender_id = _uuid_arg('conversation_id'), _uuid_arg('sender_id')
+    if conversation_id:
+        query = query.filter(Message.conversation_id == conversation_id)
+    if sender_id:
+        query = query.filter(Message.sender_id == sender_id)
+    if request.args.get('message_type'):
+        query = query.filter(Message.message_type == request.args['message_type'])
+    query = _created_range(query, Message)
+    return _export('messages', query, MESSAGE_COLUMNS, Message)
+
+
+@exports_bp.route('/notifications', methods=['GET'])
+@jwt_required()
+def export_notifications():
+    """The caller's notifications; filters: is_read. Admins may pass user_id
+    (or ``all``) to export other users' notifications."""
+    current = _current_user()
+    query = db.session.query(*NOTIFICATION_COLUMNS).filter(Notification.is_deleted == False)  # noqa: E712
+    user_arg = request.args.get('user_id')
+    if user_arg and (user_arg == 'all' or user_arg != str(current.id)):
+        if not _is_admin(current):
+            abort(403, 'admin privilege required')
+        if user_arg != 'all':
+            query = query.filter(Notification.user_id == _uuid_arg('user_id'))
+    else:
+        query = query.filter(Notification.user_id == current.id)
+    if request.args.get('is_read'):
+        query = query.filter(Notification.is_read == (request.args['is_read'].lower() in ('1', 'true', 'yes')))
+    query = _created_range(query, Notification)
+    return _export('notifications', query, NOTIFICATION_COLUMNS, Notification)
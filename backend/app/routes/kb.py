@@ -4,6 +4,9 @@ from app.models.user import User
 from app.models.notification import Notification
 from app.hooks import send_kb_article_created, send_kb_article_updated, send_kb_article_deleted
 from app.models.base import db
+from app.kb_search import search_articles
+from app.pagination import get_page_size
+from app.responses import wants_entity_response, entity_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import uuid
 
@@ -25,6 +28,41 @@ def list_articles():
     return jsonify([a.to_dict() for a in articles])
 
 
+@kb_bp.route('/search', methods=['GET'])
+def search():
+    """Full-text search over active articles, best match first.
+
+    Query params: `q` (required; websearch syntax on PostgreSQL, e.g.
+    ``"reset password" -email``), `tags` (comma-separated; articles must
+    have all of them), `limit` and `offset`. Results carry a `snippet` of
+    the content with matches wrapped in <mark>, instead of the content.
+    Answers 501 on databases without a full-text index (not PostgreSQL or
+    SQLite).
+    """
+    q = (request.args.get('q') or '').strip()
+    if not q:
+        abort(400, 'q is required')
+    tags = [t for t in (request.args.get('tags') or '').split(',') if t]
+    limit = get_page_size(default=20)
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+    except ValueError:
+        abort(400, 'offset must be an integer')
+
+    try:
+        total, results = search_articles(q, tags=tags, limit=limit, offset=offset)
+    except NotImplementedError as e:
+        abort(501, str(e))
+    items = []
+    for article, rank, snippet in results:
+        data = article.to_dict(exclude={'is_deleted', 'deleted_at', 'content'})
+        data['tags'] = [t.name for t in article.tags]
+        data['snippet'] = snippet
+        data['rank'] = rank
+        items.append(data)
+    return jsonify({'items': items, 'total': total, 'limit': limit, 'offset': offset})
+
+
 @kb_bp.route('/articles', methods=['POST'])
 @jwt_required()
 def create_article():
@@ -67,7 +105,9 @@ def create_article():
         import logging
 
         logging.exception('error running kb_article.created hooks')
-    
+
+    if wants_entity_response():
+        return entity_response(a, status=201)
     articles = KnowledgeBaseArticle.active().all()
     return jsonify([a.to_dict() for a in articles]), 201
 
@@ -116,7 +156,9 @@ def update_article(id_):
         import logging
 
         logging.exception('error running kb_article.updated hooks')
-    
+
+    if wants_entity_response():
+        return entity_response(a)
     articles = KnowledgeBaseArticle.active().all()
     return jsonify([a.to_dict() for a in articles])
 
@@ -1,18 +1,24 @@
-from flask import Blueprint, request, jsonify, abort
+from flask import Blueprint, request, jsonify, abort, current_app
 from app.models.server_monitor import ServerMonitor
 from app.models.base import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.monitoring.worker import get_monitoring_worker
+from app.monitoring.alerts import evaluate_monitor, get_alert_evaluator
+from app.monitoring.api_keys import resolve_api_key
+from app.monitoring.last_check import record_check
+from app.monitoring import codec
+from app.monitoring.timeseries import (
+    choose_step, extract_samples, get_sample_writer, list_metric_names, min_resolution, query_series,
+    retention_by_resolution, store_samples,
+)
+from app.monitoring.remote import RemoteTarget, get_remote_fetcher, system_url
+from app.monitoring.system import get_system_sampler
+from app.webhooks import get_webhook_dispatcher
 import uuid
 from datetime import datetime, timezone
-import os
+import time
 import requests
 
-try:
-    import psutil
-except Exception:
-    psutil = None
-
 monitoring_bp = Blueprint('monitoring', __name__)
 
 
@@ -30,13 +36,21 @@ def _get_monitor_or_404(monitor_id):
 
 
 def _verify_api_key():
-    """Verify API key from request headers."""
+    """Verify API key from request headers.
+
+    Keys are resolved through a cache (see app/monitoring/api_keys.py), so
+    the monitor itself is only loaded by primary key for known, active keys.
+    """
     api_key = request.headers.get('X-API-Key')
     if not api_key:
         abort(401, 'API key required')
 
-    monitor = ServerMonitor.query.filter_by(api_key=api_key, is_active=True, is_deleted=False).first()
-    if not monitor:
+    monitor_id, is_active = resolve_api_key(api_key)
+    if monitor_id is None or not is_active:
+        abort(401, 'invalid API key')
+
+    monitor = db.session.get(ServerMonitor, monitor_id)
+    if not monitor or monitor.is_deleted or not monitor.is_active or monitor.api_key != api_key:
         abort(401, 'invalid API key')
 
     return monitor
@@ -173,6 +187,10 @@ def delete_monitor(monitor_id):
     if worker:
         worker.stop_monitoring(str(monitor_id))
 
+    evaluator = get_alert_evaluator()
+    if evaluator:
+        evaluator.forget(monitor.id)
+
     monitor.delete()
     return '', 204
 
@@ -194,34 +212,116 @@ def get_monitor_status(monitor_id):
 
     worker_status = worker.get_worker_status()
     monitor_status = worker_status.get(str(monitor.id), {'running': False})
+    evaluator = get_alert_evaluator()
 
     return jsonify({
         'monitor_id': monitor_id,
         'running': monitor_status.get('running', False),
         'last_check': monitor.last_check_at.isoformat() if monitor.last_check_at else None,
-        'is_active': monitor.is_active
+        'is_active': monitor.is_active,
+        'alerts': evaluator.status(monitor.id) if evaluator else {},
     })
 
 
 @monitoring_bp.route('/data', methods=['POST'])
 def receive_metrics():
-    """Receive metrics data from monitoring agents."""
+    """Receive metrics data from monitoring agents.
+
+    Accepts a single JSON snapshot or a batch of snapshots (see
+    app/monitoring/codec.py), optionally gzip-compressed and/or encoded as
+    MessagePack.
+    """
     monitor = _verify_api_key()
 
-    data = request.get_json()
+    try:
+        data = codec.loads(request.get_data(), request.content_type, request.headers.get('Content-Encoding'))
+        payloads = codec.decode_batch(data) if codec.is_batch(data) else [data]
+    except codec.UnsupportedEncoding as exc:
+        abort(415, str(exc))
+    except ValueError as exc:
+        abort(400, str(exc))
     if not data:
         abort(400, 'no data provided')
 
-    # Here you could store the metrics data in a database table
-    # For now, just log it and return success
-    monitor.last_check_at = datetime.now(timezone.utc)
-    db.session.commit()
+    writer = get_sample_writer()
+    sample_sets = []
+    for payload in payloads:
+        ts, samples = extract_samples(payload)
+        evaluate_monitor(monitor, ts, samples)
+        if writer is not None:
+            writer.add(monitor.id, ts, samples)
+        sample_sets.append((ts, samples))
+
+    record_check(monitor.id)
+    if writer is None:
+        for ts, samples in sample_sets:
+            store_samples(monitor.id, ts, samples)
+
+    return jsonify({
+        'status': 'received',
+        'monitor_id': str(monitor.id),
+        'snapshots': len(payloads),
+        'samples': sum(len(samples) for _, samples in sample_sets),
+    })
+
+
+@monitoring_bp.route('/<monitor_id>/metrics', methods=['GET'])
+@jwt_required()
+def get_monitor_metrics(monitor_id):
+    """Return downsampled metric series for a monitor.
+
+    Query params: `metric` (repeatable or comma-separated; defaults to every
+    metric reported in the range), `from`/`to` (ISO-8601 or epoch seconds;
+    defaults to the last 24 hours) and `step` (bucket width in seconds,
+    raised as needed to keep each series at most MAX_POINTS buckets and to
+    a resolution that is still retained for the start of the range).
+    """
+    monitor = _get_monitor_or_404(monitor_id)
+
+    identity = get_jwt_identity()
+    if str(monitor.user_id) != identity:
+        abort(403, 'access denied')
+
+    end = _parse_epoch_arg('to') or int(time.time())
+    start = _parse_epoch_arg('from') or end - 86400
+    if start >= end:
+        abort(400, "'from' must be before 'to'")
+
+    try:
+        requested_step = int(request.args.get('step', 0))
+    except ValueError:
+        abort(400, "invalid 'step'")
+    minimum = min_resolution(start, retention_by_resolution(current_app.config))
+    step = choose_step(start, end, requested_step, minimum)
+
+    metrics = [m for arg in request.args.getlist('metric') for m in arg.split(',') if m]
+    if not metrics:
+        metrics = list_metric_names(monitor.id, start)
+
+    return jsonify({
+        'monitor_id': str(monitor.id),
+        'from': start,
+        'to': end,
+        'step': step,
+        'series': query_series(monitor.id, metrics, start, end, step) if metrics else {},
+    })
 
-    # Log the received data (in production, you'd store this properly)
-    import logging
-    logging.info(f"Received metrics for monitor {monitor.id}: {data}")
 
-    return jsonify({'status': 'received', 'monitor_id': str(monitor.id)})
+def _parse_epoch_arg(name):
+    raw = request.args.get(name)
+    if not raw:
+        return None
+    try:
+        return int(float(raw))
+    except ValueError:
+        pass
+    try:
+        value = datetime.fromisoformat(raw.replace('Z', '+00:00'))
+    except ValueError:
+        abort(400, f"invalid '{name}'")
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
 
 
 @monitoring_bp.route('/system', methods=['GET'])
@@ -232,82 +332,54 @@ def system_metrics():
     Designed for remote monitoring agents to poll via REST or for webhooks
     to consume. Authentication is optional here; if you need to restrict
     access, front this endpoint with a reverse proxy or enable JWT/auth.
+
+    The snapshot is refreshed by a background sampler (see
+    app/monitoring/system.py) and served from memory; network and disk
+    counters include per-second rates. With `?webhook=<url>` the snapshot is
+    also queued for delivery to that URL.
+
+    With `?ids=<id>,<id>,...` the snapshots of those monitors' servers are
+    returned instead (see `_fan_in_system_metrics`).
     """
+    if request.args.get('ids'):
+        return _fan_in_system_metrics()
+
     # Authenticate via static API key header if configured
-    from flask import current_app
     api_key_cfg = current_app.config.get('METRICS_API_KEY')
     if api_key_cfg:
         provided = request.headers.get('X-Metrics-Key')
         if not provided or provided != api_key_cfg:
             abort(401, 'invalid metrics api key')
 
-    if psutil is None:
+    sampler = get_system_sampler()
+    if sampler is None:
         abort(503, 'psutil not available')
 
     try:
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        cpu_count = psutil.cpu_count(logical=True)
-        load = None
-        try:
-            load = os.getloadavg()
-        except Exception:
-            load = None
-
-        virtual_mem = psutil.virtual_memory()
-        swap_mem = psutil.swap_memory()
-        disk_usage = psutil.disk_usage('/')
-        net_io = psutil.net_io_counters()
-
-        data = {
-            'timestamp': datetime.now(timezone.utc).isoformat(),
-            'cpu': {
-                'percent': cpu_percent,
-                'count': cpu_count,
-                'loadavg_1m_5m_15m': load,
-            },
-            'memory': {
-                'total': virtual_mem.total,
-                'available': virtual_mem.available,
-                'used': virtual_mem.used,
-                'free': getattr(virtual_mem, 'free', None),
-                'percent': virtual_mem.percent,
-                'swap_total': swap_mem.total,
-                'swap_used': swap_mem.used,
-                'swap_free': swap_mem.free,
-                'swap_percent': swap_mem.percent,
-            },
-            'disk': {
-                'total': disk_usage.total,
-                'used': disk_usage.used,
-                'free': disk_usage.free,
-                'percent': disk_usage.percent,
-            },
-            'network': {
-                'bytes_sent': net_io.bytes_sent,
-                'bytes_recv': net_io.bytes_recv,
-                'packets_sent': net_io.packets_sent,
-                'packets_recv': net_io.packets_recv,
-                'errin': net_io.errin,
-                'errout': net_io.errout,
-                'dropin': net_io.dropin,
-                'dropout': net_io.dropout,
-            },
-        }
-
-        # Optional webhook forwarding
+        # Without the background thread, sample on demand (never blocks on CPU)
+        if not sampler.running:
+            sampler.refresh()
         webhook_url = request.args.get('webhook')
-        if webhook_url:
-            try:
-                import requests
-                requests.post(webhook_url, json=data, timeout=3)
-                data['webhook_forwarded'] = True
-            except Exception:
-                data['webhook_forwarded'] = False
-
-        return jsonify(data), 200
+        if not webhook_url:
+            return current_app.response_class(sampler.body(), status=200, mimetype='application/json')
+        data = dict(sampler.snapshot())
     except Exception as e:
         abort(500, f'system metrics error: {e}')
 
+    # Optional webhook forwarding, queued on the webhook dispatcher
+    dispatcher = get_webhook_dispatcher()
+    if dispatcher is not None:
+        dispatcher.dispatch(webhook_url, data)
+        data['webhook_forwarded'] = True
+    else:
+        try:
+            requests.post(webhook_url, json=data, timeout=3)
+            data['webhook_forwarded'] = True
+        except Exception:
+            data['webhook_forwarded'] = False
+
+    return jsonify(data), 200
+
 
 @monitoring_bp.route('/<monitor_id>/system', methods=['GET'])
 @jwt_required()
@@ -326,22 +398,87 @@ def proxy_system_metrics(monitor_id):
     if str(monitor.user_id) != identity:
         abort(403, 'access denied')
 
-    # Determine base URL
     base = request.args.get('base')
+    if not base and not monitor.server_ip:
+        abort(400, 'server_ip is not configured; provide ?base=https://server-domain')
+
+    result = _remote_fetcher().fetch(_remote_target(monitor, base))
+    if 'data' not in result:
+        abort(502, result['error'])
+    return jsonify(result['data']), result['status']
+
+
+# Upper bound on monitors per fan-in request
+MAX_FAN_IN = 200
+
+
+def _remote_fetcher():
+    fetcher = get_remote_fetcher()
+    if fetcher is None:
+        abort(503, 'remote metrics fetcher not initialized')
+    return fetcher
+
+
+def _remote_target(monitor, base=None):
+    """Where to poll a monitor's server, from `base` or its server_ip."""
     if not base:
-        if not monitor.server_ip:
-            abort(400, 'server_ip is not configured; provide ?base=https://server-domain')
         scheme = request.args.get('scheme', 'http')
         base = f"{scheme}://{monitor.server_ip}"
+    return RemoteTarget(str(monitor.id), system_url(base), monitor.api_key)
+
 
-    # Build target URL
-    url = base.rstrip('/') + '/api/monitoring/system'
+def _fan_in_system_metrics():
+    """Fetch live snapshots of several of the current user's servers at once.
 
+    All servers are polled concurrently over pooled connections, recent
+    responses are reused for a few seconds (MONITORING_PROXY_CACHE_TTL) and
+    each monitor gets its own result, so unreachable servers are reported
+    with their error instead of failing the request.
+    """
+    identity = get_jwt_identity()
+    if not identity:
+        abort(401, 'authentication required')
     try:
-        resp = requests.get(url, headers={'X-Metrics-Key': monitor.api_key}, timeout=5)
-        return jsonify(resp.json()), resp.status_code
-    except requests.RequestException as e:
-        abort(502, f'remote metrics fetch error: {e}')
+        user_uuid = uuid.UUID(identity)
+    except Exception:
+        abort(401, 'invalid token identity')
+
+    ids = list(dict.fromkeys(i.strip() for i in request.args['ids'].split(',') if i.strip()))
+    if len(ids) > MAX_FAN_IN:
+        abort(400, f'at most {MAX_FAN_IN} ids per request')
+    uuids = {}
+    for monitor_id in ids:
+        try:
+            uuids[monitor_id] = uuid.UUID(monitor_id)
+        except ValueError:
+            pass
+
+    monitors = {}
+    if uuids:
+        query = ServerMonitor.query.filter_by(user_id=user_uuid, is_deleted=False) \
+            .filter(ServerMonitor.id.in_(list(uuids.values())))
+        monitors = {str(m.id): m for m in query}
+
+    started = time.perf_counter()
+    results = {}
+    targets = []
+    for monitor_id in ids:
+        monitor = monitors.get(str(uuids[monitor_id])) if monitor_id in uuids else None
+        if monitor is None:
+            results[monitor_id] = {'ok': False, 'status': 404, 'error': 'monitor not found'}
+        elif not monitor.server_ip:
+            results[monitor_id] = {'ok': False, 'status': None, 'error': 'server_ip is not configured'}
+        else:
+            targets.append(_remote_target(monitor)._replace(key=monitor_id))
+    if targets:
+        results.update(_remote_fetcher().fetch_all(targets))
+
+    return jsonify({
+        'results': {monitor_id: results[monitor_id] for monitor_id in ids},
+        'ok': sum(1 for r in results.values() if r['ok']),
+        'failed': sum(1 for r in results.values() if not r['ok']),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    })
 
 
 @monitoring_bp.route('/<monitor_id>/start', methods=['POST'])
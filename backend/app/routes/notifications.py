@@ -2,14 +2,23 @@ from flask import Blueprint, request, jsonify, abort
 from app.models.notification import Notification
 from app.models.user import User
 from flask_jwt_extended import jwt_required, get_jwt_identity
+import logging
 import uuid
+from datetime import timedelta
 from app import cache
+from app.models.base import db
+from app.notification_cache import LIST_TTL, list_cache_key, record_changes, unread_count
+from app.pagination import get_page_size, paginate, poll_since, since_cursor
 
 notifications_bp = Blueprint('notifications', __name__)
 
+# How far behind a `since` cursor each poll looks again: created_at is the
+# inserting transaction's start time, so a slow transaction can commit rows
+# older than a cursor already handed out
+SINCE_OVERLAP = timedelta(seconds=30)
+
 
 @notifications_bp.route('/', methods=['GET'])
-@cache.cached(timeout=60, key_prefix='notifications_list')
 @jwt_required()
 def list_notifications():
     identity = get_jwt_identity()
@@ -17,8 +26,111 @@ def list_notifications():
         user_id = uuid.UUID(identity)
     except ValueError:
         abort(401, 'invalid token')
-    notifications = Notification.active().filter_by(user_id=user_id).order_by(Notification.created_at.desc()).all()
-    return jsonify([n.to_dict() for n in notifications])
+    # Cached per user and query string; the key's version is bumped when this
+    # user's notifications change (see app/notification_cache.py), so an
+    # unchanged `since` poll is served from the cache.
+    # Cache errors (e.g. Redis down) fall back to building the feed uncached.
+    cache_key = f"{list_cache_key(user_id)}:{request.query_string.decode()}"
+    try:
+        payload = cache.get(cache_key)
+    except Exception:
+        logging.warning('Could not read notification list cache', exc_info=True)
+        payload = None
+    if payload is None:
+        payload = _build_feed(user_id)
+        try:
+            cache.set(cache_key, payload, timeout=LIST_TTL)
+        except Exception:
+            logging.warning('Could not write notification list cache', exc_info=True)
+    return jsonify(payload)
+
+
+def _build_feed(user_id):
+    """Build the notification feed for `user_id` from the query string.
+
+    Without `limit`, `cursor` or `since` the full list is returned as a bare
+    array for existing clients. Otherwise:
+
+    - `cursor` pages backwards, newest first, like the tickets list;
+    - `since` returns only notifications not delivered through that cursor,
+      oldest first, so polling clients fetch deltas. Keep polling with the
+      returned `since` until `has_more` is false.
+    """
+    query = Notification.active().filter_by(user_id=user_id)
+    user_data = Notification.user_summary(User.query.filter_by(id=user_id).first())
+
+    if not any(k in request.args for k in ('limit', 'cursor', 'since')):
+        notifications = query.order_by(Notification.created_at.desc()).all()
+        return [n.to_dict(user_data=user_data) for n in notifications]
+
+    limit = get_page_size()
+    since = request.args.get('since')
+    if since:
+        notifications, since, more = poll_since(query, Notification.created_at, Notification.id, limit,
+                                                since, SINCE_OVERLAP)
+        return {
+            'items': [n.to_dict(user_data=user_data) for n in notifications],
+            'since': since,
+            'has_more': more,
+            'limit': limit,
+        }
+
+    cursor = request.args.get('cursor')
+    notifications, next_cursor = paginate(query, Notification.created_at, Notification.id, limit,
+                                          cursor=cursor)
+    payload = {
+        'items': [n.to_dict(user_data=user_data) for n in notifications],
+        'next_cursor': next_cursor,
+        'limit': limit,
+    }
+    if not cursor:
+        # First page: hand out the starting point for incremental polling
+        payload['since'] = since_cursor(notifications, 'created_at', SINCE_OVERLAP)
+    return payload
+
+
+@notifications_bp.route('/read', methods=['POST'])
+@jwt_required()
+def mark_many_as_read():
+    """Mark the given notification ids, or all of them, as read in one UPDATE.
+
+    Body: ``{"ids": [...]}`` or ``{"all": true}``.
+    """
+    identity = get_jwt_identity()
+    try:
+        user_id = uuid.UUID(identity)
+    except ValueError:
+        abort(401, 'invalid token')
+    data = request.get_json() or {}
+    query = Notification.active().filter_by(user_id=user_id, is_read=False)
+    if data.get('all') is True:
+        pass
+    elif isinstance(data.get('ids'), list) and data['ids']:
+        try:
+            ids = [uuid.UUID(str(i)) for i in data['ids']]
+        except ValueError:
+            abort(400, 'ids must be UUIDs')
+        query = query.filter(Notification.id.in_(ids))
+    else:
+        abort(400, 'provide a non-empty ids list or all=true')
+
+    updated = query.update({Notification.is_read: True}, synchronize_session=False)
+    if updated:
+        # Bulk UPDATEs skip ORM flush events, so report the change ourselves
+        record_changes(db.session, {user_id: -updated})
+    db.session.commit()
+    return jsonify({'updated': updated})
+
+
+@notifications_bp.route('/unread-count', methods=['GET'])
+@jwt_required()
+def get_unread_count():
+    identity = get_jwt_identity()
+    try:
+        user_id = uuid.UUID(identity)
+    except ValueError:
+        abort(401, 'invalid token')
+    return jsonify({'unread': unread_count(user_id)})
 
 
 @notifications_bp.route('/<id_>/read', methods=['POST'])
@@ -34,8 +146,6 @@ def mark_as_read(id_):
         abort(404, 'notification not found')
     notification.is_read = True
     notification.save()
-    # Invalidate cache
-    cache.delete('notifications_list')
     return jsonify(notification.to_dict())
 
 
@@ -51,8 +161,6 @@ def delete_notification(id_):
     if not notification:
         abort(404, 'notification not found')
     notification.delete(soft=True)
-    # Invalidate cache
-    cache.delete('notifications_list')
     return '', 204
 
 
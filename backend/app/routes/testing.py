@@ -3,6 +3,7 @@ from app.models.testing import Testing
 from app.models.ticket import Ticket
 from app.models.user import User
 from app.models.base import db
+from app.responses import wants_entity_response, entity_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import uuid
 from functools import wraps
@@ -92,7 +93,9 @@ def create_testing():
                 media.testing_id = testing.id
                 db.session.add(media)
         db.session.commit()
-    
+
+    if wants_entity_response():
+        return entity_response(testing, status=201)
     testing_sessions = Testing.active().order_by(Testing.created_at.desc()).all()
     return jsonify([t.to_dict() for t in testing_sessions]), 201
 
@@ -145,7 +148,9 @@ def update_testing(id_):
                 media.testing_id = testing.id
                 db.session.add(media)
         db.session.commit()
-    
+
+    if wants_entity_response():
+        return entity_response(testing)
     testing_sessions = Testing.active().order_by(Testing.created_at.desc()).all()
     return jsonify([t.to_dict() for t in testing_sessions])
 
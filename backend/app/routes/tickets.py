@@ -5,7 +5,10 @@ from app.models.notification import Notification
 from app.models.comment import Comment
 from app.hooks import send_ticket_created, send_ticket_updated, send_ticket_deleted, send_comment_created
 from app.models.base import db
+from app.pagination import get_page_size, paginate, parse_datetime_arg
+from app.responses import wants_entity_response, entity_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
 import uuid
 from functools import wraps
 from app import cache
@@ -33,10 +36,60 @@ def _get_or_404(model, id_):
     return obj
 
 
+def _apply_ticket_filters(query):
+    """Apply the optional list filters from the query string.
+
+    `status` and `priority` accept comma-separated values; `assignee_id`
+    accepts `none` to select unassigned tickets.
+    """
+    args = request.args
+    if args.get('status'):
+        query = query.filter(Ticket.status.in_([s for s in args['status'].split(',') if s]))
+    if args.get('priority'):
+        query = query.filter(Ticket.priority.in_([p for p in args['priority'].split(',') if p]))
+    if args.get('assignee_id'):
+        if args['assignee_id'].lower() == 'none':
+            query = query.filter(Ticket.assignee_id.is_(None))
+        else:
+            query = query.filter(Ticket.assignee_id == _parse_uuid_arg('assignee_id'))
+    if args.get('module_id'):
+        query = query.filter(Ticket.module_id == _parse_uuid_arg('module_id'))
+    created_from = parse_datetime_arg('created_from')
+    if created_from:
+        query = query.filter(Ticket.created_at >= created_from)
+    created_to = parse_datetime_arg('created_to')
+    if created_to:
+        query = query.filter(Ticket.created_at < created_to)
+    return query
+
+
+def _parse_uuid_arg(name):
+    try:
+        return uuid.UUID(request.args[name])
+    except ValueError:
+        abort(400, f'{name} must be a UUID')
+
+
 @tickets_bp.route('/', methods=['GET'])
-@cache.cached(timeout=300, key_prefix='tickets_list')
+@cache.cached(timeout=300, key_prefix='tickets_list', unless=lambda: bool(request.args))
 def list_tickets():
-    tickets = Ticket.active().all()
+    # Eager-load modules so Ticket.to_dict does not lazy-load one per row
+    query = _apply_ticket_filters(Ticket.active().options(joinedload(Ticket.module)))
+
+    # Keyset pagination is opt-in (via `limit` or `cursor`) so existing
+    # clients that expect a bare array keep working. Pages are ordered by
+    # (updated_at, id) descending, most recently touched tickets first.
+    if 'limit' in request.args or 'cursor' in request.args:
+        limit = get_page_size()
+        tickets, next_cursor = paginate(query, Ticket.updated_at, Ticket.id, limit,
+                                        cursor=request.args.get('cursor'))
+        return jsonify({
+            'items': [t.to_dict() for t in tickets],
+            'next_cursor': next_cursor,
+            'limit': limit,
+        })
+
+    tickets = query.all()
     return jsonify([t.to_dict() for t in tickets])
 
 
@@ -106,6 +159,8 @@ def create_ticket():
     # Invalidate cache
     cache.delete('tickets_list')
 
+    if wants_entity_response():
+        return entity_response(ticket, status=201)
     tickets = Ticket.active().all()
     return jsonify([t.to_dict() for t in tickets]), 201
 
@@ -150,7 +205,9 @@ def update_ticket(id_):
         import logging
 
         logging.exception('error running ticket.updated hooks')
-    
+
+    if wants_entity_response():
+        return entity_response(t)
     tickets = Ticket.active().all()
     return jsonify([t.to_dict() for t in tickets])
 
@@ -3,6 +3,7 @@ from app.models.user import User
 from app.models.notification import Notification
 from app.hooks import send_user_created, send_user_updated, send_user_deleted
 from app.models.base import db
+from app.responses import wants_entity_response, entity_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import uuid
 
@@ -65,7 +66,9 @@ def create_user():
                     related_id=existing_user.id,
                     related_type='user'
                 ).save()
-            
+
+            if wants_entity_response():
+                return entity_response(existing_user)
             users = User.active().all()
             return jsonify([u.to_dict() for u in users]), 200
         else:
@@ -79,7 +82,7 @@ def create_user():
     )
     if 'password' in data:
         u.set_password(data['password'])
-    user.save()
+    u.save()
     
     # emit hook for user created so handlers (including defaults) can
     # create notifications or perform other side-effects
@@ -89,7 +92,9 @@ def create_user():
         import logging
 
         logging.exception('error running user.created hooks')
-    
+
+    if wants_entity_response():
+        return entity_response(u, status=201)
     users = User.active().all()
     return jsonify([u.to_dict() for u in users]), 201
 
@@ -131,7 +136,9 @@ def update_user(id_):
         import logging
 
         logging.exception('error running user.updated hooks')
-    
+
+    if wants_entity_response():
+        return entity_response(u)
     users = User.active().all()
     return jsonify([u.to_dict() for u in users])
 
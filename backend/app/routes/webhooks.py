@@ -0,0 +1,45 @@
+from flask import Blueprint, jsonify, abort
+from app.models.user import User
+from app.models.webhook_dead_letter import WebhookDeadLetter
+from app.pagination import get_page_size
+from app.webhooks import get_webhook_dispatcher
+from flask_jwt_extended import jwt_required, get_jwt_identity
+import uuid
+
+webhooks_bp = Blueprint('webhooks', __name__)
+
+
+def _require_admin():
+    try:
+        identity_uuid = uuid.UUID(get_jwt_identity())
+    except Exception:
+        abort(401, 'invalid token identity')
+    current = User.query.filter_by(id=identity_uuid).first()
+    if not current or (current.role or '').upper() != 'ADMIN':
+        abort(403, 'admin privilege required')
+
+
+@webhooks_bp.route('/stats', methods=['GET'])
+@jwt_required()
+def webhook_stats():
+    """Delivery counters, throughput, latency percentiles and open circuits."""
+    _require_admin()
+    dispatcher = get_webhook_dispatcher()
+    if dispatcher is None:
+        abort(503, 'webhook dispatcher not running')
+    stats = dispatcher.stats_snapshot()
+    stats['dead_letters'] = WebhookDeadLetter.active().count()
+    return jsonify(stats)
+
+
+@webhooks_bp.route('/dead-letters', methods=['GET'])
+@jwt_required()
+def list_dead_letters():
+    """Most recent failed deliveries."""
+    _require_admin()
+    limit = get_page_size()
+    rows = (WebhookDeadLetter.active()
+            .order_by(WebhookDeadLetter.created_at.desc())
+            .limit(limit)
+            .all())
+    return jsonify([r.to_dict() for r in rows])
@@ -0,0 +1,226 @@
+"""Daily ticket facts for the report endpoints.
+
+The reports under /api/dashboard/reports used to aggregate over the whole
+tickets table on every request. They now read `ticket_daily_facts` (see
+`TicketDailyFact`): one row per day and combination of status, priority,
+assignee and module, holding how many tickets were created, resolved and
+reopened, plus the `net` change in tickets having those dimensions.
+
+Like the counters in app/ticket_stats.py, facts are adjusted from an
+``after_flush`` listener in the same transaction as the ticket change, so
+writes that never send a hook (e.g. `Testing.update_status`) are included
+and a rollback undoes both. Events are dated by the (UTC) day they are
+flushed; tickets are dated by their `created_at`.
+
+``flask rebuild-ticket-facts`` recreates the table from the current state
+of the tickets. History lost that way (reopens, and the dimensions a
+ticket had before its last change) can't be recovered, so it is meant for
+the initial population and for repairing drift, not routine use.
+"""
+
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, func, text
+from sqlalchemy.orm import Session
+
+from app.models.base import db
+from app.models.ticket_daily_fact import NO_ID, TicketDailyFact
+from app.ticket_stats import RESOLVED_STATUSES, _noop_set, _previous
+
+MEASURES = ('created', 'resolved', 'reopened', 'net')
+DIMENSIONS = ('status', 'priority', 'assignee', 'module')
+PERIODS = ('day', 'week', 'month')
+
+_COLUMNS = {
+    'status': TicketDailyFact.status,
+    'priority': TicketDailyFact.priority,
+    'assignee': TicketDailyFact.assignee_id,
+    'module': TicketDailyFact.module_id,
+}
+
+
+def _day(value):
+    if value is None:
+        return datetime.now(timezone.utc).date()
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def _key(day, status, priority, assignee_id, module_id):
+    return (day, status or '', priority or '', assignee_id or NO_ID, module_id or NO_ID)
+
+
+def _dims(obj, previous=False):
+    get = (lambda name: _previous(obj, name)) if previous else (lambda name: getattr(obj, name))
+    return get('status'), get('priority'), get('assignee_id'), get('module_id')
+
+
+def track_ticket_facts(model):
+    """Keep previous dimension values on assignment (see `track_ticket_stats`).
+
+    Status, priority and is_deleted are already tracked for the counters.
+    """
+    for attr in (model.assignee_id, model.module_id):
+        event.listen(attr, 'set', _noop_set, active_history=True)
+
+
+def apply_fact_deltas(connection, deltas):
+    """Add `deltas` ({key: Counter(measure -> change)}) to the stored facts.
+
+    Keys are (day, status, priority, assignee_id, module_id) tuples.
+    """
+    rows = []
+    for key, measures in sorted(deltas.items(), key=lambda item: tuple(map(str, item[0]))):
+        if not any(measures.values()):
+            continue
+        day, status, priority, assignee_id, module_id = key
+        row = {'day': day, 'status': status, 'priority': priority,
+               'assignee_id': assignee_id, 'module_id': module_id}
+        row.update({name: measures.get(name, 0) for name in MEASURES})
+        rows.append(row)
+    if not rows:
+        return
+    table = TicketDailyFact.__table__
+    pk = [table.c.day, table.c.status, table.c.priority, table.c.assignee_id, table.c.module_id]
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=pk,
+            set_={name: table.c[name] + stmt.excluded[name] for name in MEASURES},
+        )
+        connection.execute(stmt, rows)
+        return
+    for row in rows:
+        result = connection.execute(
+            table.update()
+            .where(*[column == row[column.name] for column in pk])
+            .values({name: table.c[name] + row[name] for name in MEASURES})
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert(), row)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_ticket_facts(session, flush_context):
+    from app.models.ticket import Ticket
+
+    today = datetime.now(timezone.utc).date()
+    deltas = defaultdict(Counter)
+    for obj in session.new:
+        if isinstance(obj, Ticket) and not obj.is_deleted:
+            key = _key(_day(obj.created_at), *_dims(obj))
+            deltas[key]['created'] += 1
+            deltas[key]['net'] += 1
+    for obj in session.dirty:
+        if not isinstance(obj, Ticket) or not session.is_modified(obj, include_collections=False):
+            continue
+        before, after = _dims(obj, previous=True), _dims(obj)
+        was_deleted, is_deleted = _previous(obj, 'is_deleted'), obj.is_deleted
+        if before == after and was_deleted == is_deleted:
+            continue
+        if not was_deleted:
+            deltas[_key(today, *before)]['net'] -= 1
+        if not is_deleted:
+            key = _key(today, *after)
+            deltas[key]['net'] += 1
+            if not was_deleted:
+                was_resolved, is_resolved = before[0] in RESOLVED_STATUSES, after[0] in RESOLVED_STATUSES
+                if is_resolved and not was_resolved:
+                    deltas[key]['resolved'] += 1
+                elif was_resolved and not is_resolved:
+                    deltas[key]['reopened'] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Ticket) and not _previous(obj, 'is_deleted'):
+            deltas[_key(today, *_dims(obj, previous=True))]['net'] -= 1
+    if deltas:
+        apply_fact_deltas(session.connection(), deltas)
+
+
+def rebuild_ticket_facts():
+    """Recreate the facts from the tickets table; returns the number of rows.
+
+    Each ticket is counted as created with its current dimensions, and as
+    resolved on the day of its last status change if it is resolved now.
+    """
+    from app.models.ticket import Ticket
+
+    deltas = defaultdict(Counter)
+    query = db.session.query(
+        Ticket.created_at, Ticket.status_changed_at, Ticket.status, Ticket.priority,
+        Ticket.assignee_id, Ticket.module_id,
+    ).filter(Ticket.is_deleted == False)  # noqa: E712
+    for created_at, changed_at, *dims in query.yield_per(1000):
+        key = _key(_day(created_at), *dims)
+        deltas[key]['created'] += 1
+        deltas[key]['net'] += 1
+        if dims[0] in RESOLVED_STATUSES:
+            deltas[_key(_day(changed_at or created_at), *dims)]['resolved'] += 1
+
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text('LOCK TABLE ticket_daily_facts IN EXCLUSIVE MODE'))
+    db.session.query(TicketDailyFact).delete(synchronize_session=False)
+    apply_fact_deltas(db.session.connection(), deltas)
+    db.session.commit()
+    return len(deltas)
+
+
+def period_of(day, period):
+    """Label of the `period` ('day', 'week' or 'month') containing `day`."""
+    if period == 'week':
+        return (day - timedelta(days=day.weekday())).isoformat()
+    if period == 'month':
+        return f'{day.year:04d}-{day.month:02d}'
+    return day.isoformat()
+
+
+def _filtered(query, filters):
+    for name, value in filters.items():
+        if value is not None:
+            query = query.filter(_COLUMNS[name] == value)
+    return query
+
+
+def _rows(query, columns, measures, period=None):
+    """Fold grouped rows into {group key: Counter}, bucketing days into `period`."""
+    totals = defaultdict(Counter)
+    for row in query:
+        group = list(row[:len(columns)])
+        if period:
+            group[0] = period_of(group[0], period)
+        totals[tuple(group)].update(dict(zip(measures, (int(v or 0) for v in row[len(columns):]))))
+    return totals
+
+
+def read_facts(start, end, group_by=(), measures=('created', 'resolved', 'reopened'), **filters):
+    """Sum `measures` for the days from `start` to `end` (inclusive dates).
+
+    `group_by` holds at most one period ('day', 'week', 'month') first,
+    followed by dimension names; `filters` are dimension=value equality
+    filters. Returns {group tuple: Counter(measure -> total)}.
+    """
+    period = group_by[0] if group_by and group_by[0] in PERIODS else None
+    columns = ([TicketDailyFact.day] if period else []) + [_COLUMNS[name] for name in group_by[bool(period):]]
+    sums = [func.sum(getattr(TicketDailyFact, name)) for name in measures]
+    query = db.session.query(*columns, *sums) \
+        .filter(TicketDailyFact.day >= start, TicketDailyFact.day <= end)
+    query = _filtered(query, filters)
+    if columns:
+        query = query.group_by(*columns)
+    return _rows(query, columns, measures, period)
+
+
+def read_state(as_of, group_by=(), **filters):
+    """Number of non-deleted tickets per group at the end of day `as_of`."""
+    columns = [_COLUMNS[name] for name in group_by]
+    query = db.session.query(*columns, func.sum(TicketDailyFact.net)).filter(TicketDailyFact.day <= as_of)
+    query = _filtered(query, filters)
+    if columns:
+        query = query.group_by(*columns)
+    return {group: counts['net'] for group, counts in _rows(query, columns, ('net',)).items() if counts['net']}
@@ -0,0 +1,266 @@
+"""Materialized ticket statistics for the dashboard.
+
+The dashboard used to count tickets by status, priority and month with
+several group-by queries on every load. Those numbers now live in the
+`ticket_stats` table (see `TicketStat`) as named counters, so reading
+them is a single small query regardless of how many tickets exist.
+
+Counters are adjusted from SQLAlchemy session events rather than the
+``ticket.*`` hooks: the flush knows each ticket's previous status and
+priority (hooks only see the new state), and it also covers ORM writes
+that never send a hook, such as `Testing.update_status` closing or
+reopening a ticket. The deltas are written in the same transaction as the
+ticket change, so a rollback undoes both.
+
+The response-time counters sum `Ticket.first_response_seconds`;
+`Ticket.record_first_response` adjusts them itself since it writes with a
+Core UPDATE. Drift (e.g. from other Core statements that bypass the ORM)
+is corrected by `reconcile_ticket_stats`, which a background job runs
+every TICKET_STATS_RECONCILE_INTERVAL seconds and
+``flask reconcile-ticket-stats`` runs on demand. The job does not run at
+startup, and on PostgreSQL a run is skipped while another process holds
+the reconcile advisory lock, so a fleet of workers does not repeat the
+same scans.
+"""
+
+import atexit
+import logging
+import threading
+from collections import Counter
+from datetime import timezone
+
+from sqlalchemy import event, extract, func
+from sqlalchemy.orm import Session, attributes
+
+from app.locks import RECONCILE_LOCK_KEY, advisory_lock
+from app.models.base import db
+
+logger = logging.getLogger(__name__)
+
+RESOLVED_STATUSES = ('CLOSED', 'RESOLVED')
+
+def _month(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return f'{value.year:04d}-{value.month:02d}'
+
+
+def _contribution(status, priority, created_at, is_deleted, response_seconds=None):
+    """Counters one ticket with these values adds to the totals."""
+    if is_deleted:
+        return Counter()
+    names = Counter({'total': 1, f'status:{status}': 1, f'priority:{priority}': 1})
+    if created_at is not None:
+        names[f'month:{_month(created_at)}'] += 1
+    if response_seconds is not None:
+        names['response:sum'] += response_seconds
+        names['response:count'] += 1
+    return names
+
+
+def _current(obj):
+    return _contribution(obj.status, obj.priority, obj.created_at, obj.is_deleted, obj.first_response_seconds)
+
+
+def _before(obj):
+    return _contribution(
+        _previous(obj, 'status'), _previous(obj, 'priority'), obj.created_at,
+        _previous(obj, 'is_deleted'), _previous(obj, 'first_response_seconds'),
+    )
+
+
+def _previous(obj, name):
+    history = attributes.get_history(obj, name)
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, name)
+
+
+def _noop_set(target, value, oldvalue, initiator):
+    pass
+
+
+def track_ticket_stats(model):
+    """Load the previous values of counted attributes on assignment.
+
+    Scalar attributes don't keep their old value when set on an expired
+    instance (e.g. right after a commit), which would hide the change from
+    the flush hook below.
+    """
+    for attr in (model.status, model.priority, model.is_deleted, model.first_response_seconds):
+        event.listen(attr, 'set', _noop_set, active_history=True)
+
+
+def apply_deltas(connection, deltas):
+    """Add `deltas` (name -> change) to the stored counters."""
+    from app.models.ticket_stat import TicketStat
+
+    rows = [{'name': name, 'value': value} for name, value in sorted(deltas.items()) if value]
+    if not rows:
+        return
+    table = TicketStat.__table__
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={'value': table.c.value + stmt.excluded.value},
+        )
+        connection.execute(stmt, rows)
+        return
+    for row in rows:
+        result = connection.execute(
+            table.update().where(table.c.name == row['name']).values(value=table.c.value + row['value'])
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert(), row)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_ticket_stats(session, flush_context):
+    from app.models.ticket import Ticket
+
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Ticket):
+            deltas.update(_current(obj))
+    for obj in session.dirty:
+        if isinstance(obj, Ticket) and session.is_modified(obj, include_collections=False):
+            deltas.subtract(_before(obj))
+            deltas.update(_current(obj))
+    for obj in session.deleted:
+        if isinstance(obj, Ticket):
+            deltas.subtract(_before(obj))
+    if any(deltas.values()):
+        apply_deltas(session.connection(), deltas)
+
+
+def read_stats():
+    """All counters as a dict (one query over the small summary table)."""
+    from app.models.ticket_stat import TicketStat
+
+    return dict(db.session.query(TicketStat.name, TicketStat.value).all())
+
+
+def compute_ticket_stats():
+    """Recompute every counter from the tickets table."""
+    from app.models.ticket import Ticket
+
+    stats = Counter()
+    active = Ticket.is_deleted == False  # noqa: E712
+
+    stats['total'] = db.session.query(func.count(Ticket.id)).filter(active).scalar() or 0
+    for status, count in db.session.query(Ticket.status, func.count(Ticket.id)).filter(active) \
+            .group_by(Ticket.status):
+        stats[f'status:{status}'] = count
+    for priority, count in db.session.query(Ticket.priority, func.count(Ticket.id)).filter(active) \
+            .group_by(Ticket.priority):
+        stats[f'priority:{priority}'] = count
+    year, month = extract('year', Ticket.created_at), extract('month', Ticket.created_at)
+    for y, m, count in db.session.query(year, month, func.count(Ticket.id)).filter(active).group_by(year, month):
+        stats[f'month:{int(y):04d}-{int(m):02d}'] = count
+
+    total, count = db.session.query(func.sum(Ticket.first_response_seconds),
+                                    func.count(Ticket.first_response_seconds)).filter(active).one()
+    stats['response:sum'] = total or 0
+    stats['response:count'] = count or 0
+    return stats
+
+
+def reconcile_ticket_stats(wait=True):
+    """Correct the counters from the source tables.
+
+    Returns {name: (stored, actual)} for every counter that had drifted.
+    The counters and the tickets are read from one snapshot, without
+    locking either table, and the difference is then added with
+    `apply_deltas`, so ticket writes committing meanwhile are neither lost
+    nor counted twice. On PostgreSQL runs are serialized with an advisory
+    lock; without `wait`, returns None if another process is already
+    reconciling.
+    """
+    with advisory_lock(RECONCILE_LOCK_KEY, wait=wait) as locked:
+        if not locked:
+            return None
+        if db.engine.dialect.name == 'postgresql':
+            db.session.connection(execution_options={'isolation_level': 'REPEATABLE READ'})
+        stored = read_stats()
+        actual = compute_ticket_stats()
+        db.session.commit()
+        drift = {
+            name: (stored.get(name, 0), actual.get(name, 0))
+            for name in set(stored) | set(actual)
+            if stored.get(name, 0) != actual.get(name, 0)
+        }
+        apply_deltas(db.session.connection(), {name: new - old for name, (old, new) in drift.items()})
+        db.session.commit()
+        return drift
+
+
+class StatsReconcileJob:
+    """Runs `reconcile_ticket_stats` every `interval` seconds, starting one interval after start."""
+
+    def __init__(self, app, interval=3600):
+        self.app = app
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='ticket-stats-reconcile', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def run_once(self):
+        with self.app.app_context():
+            try:
+                drift = reconcile_ticket_stats(wait=False)
+                if drift is None:
+                    logger.debug('Ticket stats reconciliation already running elsewhere, skipped')
+                elif drift:
+                    logger.info('Corrected %d drifted ticket stat(s)', len(drift))
+            except Exception:
+                db.session.rollback()
+                logger.exception('Ticket stats reconciliation failed')
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.run_once()
+
+
+# Global reconcile job instance
+stats_reconcile_job = None
+
+
+def init_stats_reconcile_job(app):
+    """Create and start the global reconcile job.
+
+    Returns None when TICKET_STATS_RECONCILE_INTERVAL is 0.
+    """
+    global stats_reconcile_job
+    if stats_reconcile_job is not None:
+        stats_reconcile_job.stop()
+        stats_reconcile_job = None
+    interval = app.config.get('TICKET_STATS_RECONCILE_INTERVAL', 3600)
+    if not interval:
+        return None
+    stats_reconcile_job = StatsReconcileJob(app, interval=interval)
+    stats_reconcile_job.start()
+    return stats_reconcile_job
+
+
+def get_stats_reconcile_job():
+    return stats_reconcile_job
+
+
+@atexit.register
+def _stop_on_exit():
+    if stats_reconcile_job is not None:
+        stats_reconcile_job.stop()
@@ -0,0 +1,408 @@
+"""Webhook delivery engine.
+
+`send_webhook_notification` used to call the module-level `requests.post`
+for every notification, paying a fresh TCP/TLS handshake each time and
+blocking the caller for up to the full timeout when an endpoint was slow.
+Deliveries now go through a `WebhookDispatcher`:
+
+- one pooled `requests.Session` per host, so keep-alive connections are
+  reused across deliveries;
+- a bounded thread pool, so a burst of notifications cannot start an
+  unbounded number of outbound requests;
+- a circuit breaker per URL: after `failure_threshold` consecutive failures
+  (the retryable ones below; other 4xx answers count as the endpoint being
+  healthy) the URL is skipped for `reset_timeout` seconds, then a single trial
+  request decides whether it is closed again;
+- coalescing: an identical payload to the same URL that is already in
+  flight is not sent twice, callers share the pending future;
+- retries with exponential backoff for connection errors, timeouts, 5xx,
+  408 and 429; a retry is scheduled on a timer thread rather than slept on
+  in a pool thread, so a slow endpoint does not hold up other deliveries;
+- a dead-letter table (`WebhookDeadLetter`) for deliveries that exhausted
+  their retries, were rejected by the receiver (any other 4xx) or by an
+  open circuit.
+
+Delivery counters, throughput and latency percentiles are available from
+`WebhookDispatcher.stats()` (exposed at ``GET /api/webhooks/stats``).
+"""
+
+import atexit
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# 4xx statuses that are worth retrying; any other 4xx is dead-lettered at once
+RETRYABLE_CLIENT_ERRORS = (408, 429)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a delivery is skipped because the URL's circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed -> open -> half-open)."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        """Return True if a request may be sent now."""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                # Let exactly one trial request through
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+
+class DeliveryStats:
+    """Thread-safe delivery counters with a rolling latency window."""
+
+    def __init__(self, window=1000, throughput_interval=60.0):
+        self.throughput_interval = throughput_interval
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._completed_at = deque()
+        self.counters = {
+            'delivered': 0,
+            'failed': 0,
+            'retried': 0,
+            'coalesced': 0,
+            'circuit_open': 0,
+            'dead_lettered': 0,
+        }
+
+    def incr(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def record_delivery(self, latency):
+        now = time.monotonic()
+        with self._lock:
+            self.counters['delivered'] += 1
+            self._latencies.append(latency)
+            self._completed_at.append(now)
+            self._trim(now)
+
+    def _trim(self, now):
+        cutoff = now - self.throughput_interval
+        while self._completed_at and self._completed_at[0] < cutoff:
+            self._completed_at.popleft()
+
+    def snapshot(self):
+        with self._lock:
+            self._trim(time.monotonic())
+            latencies = sorted(self._latencies)
+            data = dict(self.counters)
+            data['throughput_per_sec'] = round(len(self._completed_at) / self.throughput_interval, 3)
+        data['latency_ms'] = {
+            'p50': _percentile(latencies, 0.50),
+            'p99': _percentile(latencies, 0.99),
+            'max': round(latencies[-1] * 1000, 2) if latencies else None,
+        }
+        return data
+
+
+def _retryable(status_code):
+    """Whether a failed attempt that got `status_code` (None: no response) may succeed later."""
+    return status_code is None or status_code >= 500 or status_code in RETRYABLE_CLIENT_ERRORS
+
+
+class _Delivery:
+    """State of one queued webhook delivery across its attempts."""
+
+    def __init__(self, url, body, notification_id):
+        self.url = url
+        self.body = body
+        self.notification_id = notification_id
+        self.future = Future()
+        self.attempts = 0
+        self.status_code = None
+        self.error = None
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return round(sorted_values[index] * 1000, 2)
+
+
+class WebhookDispatcher:
+    """Deliver webhook payloads concurrently over pooled connections."""
+
+    def __init__(self, app=None, max_workers=8, pool_size=10, timeout=5.0, max_attempts=3,
+                 retry_base_delay=0.5, failure_threshold=5, reset_timeout=60.0):
+        self.app = app
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.stats = DeliveryStats()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='webhook')
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._breakers = {}
+        self._inflight = {}
+        # Deliveries waiting for a retry: heap of (due, seq, delivery)
+        self._retries = []
+        self._retry_seq = itertools.count()
+        self._retry_cond = threading.Condition()
+        self._retry_thread = None
+        self._closed = False
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def dispatch(self, url, payload, notification_id=None):
+        """Queue a delivery and return a Future resolving to the HTTP status.
+
+        The future raises if the delivery ultimately failed; failures are
+        already logged and dead-lettered, so callers may ignore it.
+        """
+        body = json.dumps(payload, separators=(',', ':'), default=str).encode()
+        key = (url, hashlib.sha1(body).hexdigest())
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats.incr('coalesced')
+                return future
+            delivery = _Delivery(url, body, notification_id)
+            future = delivery.future
+            self._inflight[key] = future
+        future.add_done_callback(lambda _f: self._forget(key))
+        self._executor.submit(self._deliver, delivery)
+        return future
+
+    def breaker_for(self, url):
+        with self._lock:
+            breaker = self._breakers.get(url)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self._breakers[url] = breaker
+            return breaker
+
+    def stats_snapshot(self):
+        data = self.stats.snapshot()
+        with self._lock:
+            data['in_flight'] = len(self._inflight)
+            data['open_circuits'] = sorted(
+                url for url, breaker in self._breakers.items() if breaker.state != CircuitBreaker.CLOSED
+            )
+        return data
+
+    def shutdown(self, wait=True):
+        """Stop the dispatcher; deliveries still waiting for a retry are dead-lettered."""
+        with self._retry_cond:
+            self._closed = True
+            pending = [delivery for _, _, delivery in self._retries]
+            self._retries.clear()
+            self._retry_cond.notify_all()
+        if self._retry_thread is not None:
+            self._retry_thread.join(timeout=5)
+        for delivery in pending:
+            self._give_up(delivery)
+        self._executor.shutdown(wait=wait)
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _forget(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def _session_for(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['Content-Type'] = 'application/json'
+                self._sessions[host] = session
+            return session
+
+    def _deliver(self, delivery):
+        """Make one attempt; schedule a retry or dead-letter the delivery if it fails."""
+        try:
+            self._attempt(delivery)
+        except Exception as e:
+            logger.exception('Webhook delivery to %s crashed', delivery.url)
+            delivery.error = e
+            self._give_up(delivery)
+
+    def _attempt(self, delivery):
+        url = delivery.url
+        breaker = self.breaker_for(url)
+        if not breaker.allow():
+            self.stats.incr('circuit_open')
+            delivery.error = CircuitOpenError(f'circuit open for {url}')
+            self._give_up(delivery)
+            return
+        delivery.attempts += 1
+        delivery.status_code = None
+        start = time.perf_counter()
+        try:
+            response = self._session_for(url).post(url, data=delivery.body, timeout=self.timeout)
+            delivery.status_code = response.status_code
+            response.raise_for_status()
+        except requests.RequestException as e:
+            delivery.error = e
+            self.stats.incr('failed')
+            if not _retryable(delivery.status_code):
+                # The endpoint is up and answering; it just rejected this payload
+                breaker.record_success()
+                self._give_up(delivery)
+                return
+            breaker.record_failure()
+            if delivery.attempts < self.max_attempts:
+                self.stats.incr('retried')
+                self._retry_later(delivery, self.retry_base_delay * (2 ** (delivery.attempts - 1)))
+            else:
+                self._give_up(delivery)
+            return
+        breaker.record_success()
+        self.stats.record_delivery(time.perf_counter() - start)
+        delivery.future.set_result(delivery.status_code)
+
+    def _give_up(self, delivery):
+        logger.warning('Webhook delivery to %s failed after %d attempt(s): %s',
+                       delivery.url, delivery.attempts, delivery.error)
+        self._dead_letter(delivery.url, delivery.body, delivery.notification_id, delivery.attempts,
+                          delivery.status_code, delivery.error)
+        delivery.future.set_exception(delivery.error)
+
+    def _retry_later(self, delivery, delay):
+        with self._retry_cond:
+            if not self._closed:
+                heapq.heappush(self._retries, (time.monotonic() + delay, next(self._retry_seq), delivery))
+                if self._retry_thread is None:
+                    self._retry_thread = threading.Thread(target=self._run_retries, name='webhook-retry',
+                                                          daemon=True)
+                    self._retry_thread.start()
+                self._retry_cond.notify()
+                return
+        self._give_up(delivery)
+
+    def _run_retries(self):
+        """Hand deliveries back to the pool once their retry delay has passed."""
+        while True:
+            with self._retry_cond:
+                while not self._closed and (not self._retries or self._retries[0][0] > time.monotonic()):
+                    timeout = self._retries[0][0] - time.monotonic() if self._retries else None
+                    self._retry_cond.wait(timeout)
+                if self._closed:
+                    return
+                _, _, delivery = heapq.heappop(self._retries)
+            self._executor.submit(self._deliver, delivery)
+
+    def _dead_letter(self, url, body, notification_id, attempts, status_code, error):
+        self.stats.incr('dead_lettered')
+        if self.app is None:
+            return
+        try:
+            from app.models.webhook_dead_letter import WebhookDeadLetter
+
+            with self.app.app_context():
+                WebhookDeadLetter(
+                    url=url,
+                    payload=body.decode(),
+                    notification_id=notification_id,
+                    attempts=attempts,
+                    status_code=status_code,
+                    last_error=str(error)[:1000],
+                ).save()
+        except Exception:
+            logger.exception('Failed to record dead-lettered webhook for %s', url)
+
+
+# Global dispatcher instance
+webhook_dispatcher = None
+
+
+def init_webhook_dispatcher(app):
+    """Create the global dispatcher from WEBHOOK_* settings."""
+    global webhook_dispatcher
+    if webhook_dispatcher is not None:
+        webhook_dispatcher.shutdown(wait=False)
+    webhook_dispatcher = WebhookDispatcher(
+        app,
+        max_workers=app.config.get('WEBHOOK_WORKERS', 8),
+        pool_size=app.config.get('WEBHOOK_POOL_SIZE', 10),
+        timeout=app.config.get('WEBHOOK_TIMEOUT', 5.0),
+        max_attempts=app.config.get('WEBHOOK_MAX_ATTEMPTS', 3),
+        retry_base_delay=app.config.get('WEBHOOK_RETRY_BASE_DELAY', 0.5),
+        failure_threshold=app.config.get('WEBHOOK_BREAKER_THRESHOLD', 5),
+        reset_timeout=app.config.get('WEBHOOK_BREAKER_RESET', 60.0),
+    )
+    return webhook_dispatcher
+
+
+def get_webhook_dispatcher():
+    """Get the global dispatcher, or None if it was not initialized."""
+    return webhook_dispatcher
+
+
+@atexit.register
+def _shutdown_on_exit():
+    if webhook_dispatcher is not None:
+        webhook_dispatcher.shutdown(wait=True)
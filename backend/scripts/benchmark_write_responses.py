@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Compare write-endpoint latency for the 'collection' and 'entity' response modes.
+
+Seeds a scratch database with N tickets, then times POST /api/tickets and
+PUT /api/tickets/<id> in both modes using the Flask test client.
+
+Usage (from the backend/ directory):
+
+  python scripts/benchmark_write_responses.py --rows 50000 --requests 20
+
+Point --database-url (or DATABASE_URL) at a disposable Postgres database: the
+script creates the schema, seeds it and drops every table when it finishes.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(THIS_DIR, '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Benchmark write response modes')
+    p.add_argument('--rows', type=int, default=50000, help='Tickets to seed (default: 50000)')
+    p.add_argument('--requests', type=int, default=20, help='Requests per mode (default: 20)')
+    p.add_argument('--database-url', default=os.getenv('DATABASE_URL'),
+                   help='Disposable database to seed (default: $DATABASE_URL)')
+    return p.parse_args()
+
+
+def seed(db, Ticket, User, rows):
+    requester = User(email=f'bench-{uuid.uuid4().hex[:8]}@example.com', name='Bench')
+    requester.save()
+    batch = []
+    for i in range(rows):
+        batch.append({
+            'id': uuid.uuid4(),
+            'ticket_id': f'#b{i:08d}',
+            'subject': f'Seeded ticket {i}',
+            'status': 'OPEN',
+            'priority': 'MEDIUM',
+            'requester_id': requester.id,
+            'is_deleted': False,
+        })
+        if len(batch) == 5000:
+            db.session.execute(Ticket.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Ticket.__table__.insert(), batch)
+    db.session.commit()
+    return requester.id
+
+
+def time_requests(fn, n):
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        rv = fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert rv.status_code < 400, rv.get_data(as_text=True)[:200]
+    return samples
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p95 = samples[max(0, int(len(samples) * 0.95) - 1)]
+    print(f'  {label:<28} median {statistics.median(samples):8.1f} ms   p95 {p95:8.1f} ms')
+
+
+def main():
+    args = parse_args()
+    if not args.database_url:
+        sys.exit('--database-url or DATABASE_URL is required')
+    os.environ['DATABASE_URL'] = args.database_url
+
+    from app import create_app
+    from app.models.base import db
+    from app.models.ticket import Ticket
+    from app.models.user import User
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        print(f'Seeding {args.rows} tickets...')
+        requester_id = str(seed(db, Ticket, User, args.rows))
+        target_id = str(Ticket.query.first().id)
+        from flask_jwt_extended import create_access_token
+        headers = {'Authorization': f'Bearer {create_access_token(identity=requester_id)}'}
+
+    client = app.test_client()
+    print(f'Timing {args.requests} requests per mode against {args.rows} rows:')
+    for mode in ('collection', 'entity'):
+        create = time_requests(lambda i: client.post(
+            f'/api/tickets/?response={mode}',
+            json={'subject': f'bench {mode} {i}', 'requester_id': requester_id},
+        ), args.requests)
+        update = time_requests(lambda i: client.put(
+            f'/api/tickets/{target_id}?response={mode}',
+            json={'subject': f'bench {mode} update {i}'},
+            headers=headers,
+        ), args.requests)
+        report(f'POST /api/tickets [{mode}]', create)
+        report(f'PUT /api/tickets/<id> [{mode}]', update)
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
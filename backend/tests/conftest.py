@@ -1,3 +1,4 @@
+import itertools
 import os
 import time
 import psycopg2
@@ -16,6 +17,15 @@ if env_path.exists():
 # Ensure the project root (backend/) is on sys.path so `import app` works when running tests
 sys.path.insert(0, str(ROOT))
 
+# Run hook handlers synchronously so tests can assert on their side effects
+os.environ.setdefault('HOOKS_BACKEND', 'inline')
+# Write metric samples inside the request so queries see them immediately
+os.environ.setdefault('METRICS_WRITE_BACKEND', 'inline')
+# Write last_check_at on every check instead of from a background thread
+os.environ.setdefault('MONITORING_LAST_CHECK_FLUSH_INTERVAL', '0')
+# Don't rebuild dashboard counters in the background while tests run
+os.environ.setdefault('TICKET_STATS_RECONCILE_INTERVAL', '0')
+
 # If developer dependencies like Flask-Migrate aren't installed in this environment,
 # provide a minimal stub so the app factory can import. This avoids requiring
 # installing dev-only packages just to run the unit tests in CI/dev containers.
@@ -151,3 +161,38 @@ def client(test_database):
             db.engine.dispose()
         except Exception:
             pass
+
+
+@pytest.fixture(scope='function')
+def make_user(client):
+    """Factory creating a committed user; returns its id.
+
+    Email and name default to unique values, other keyword arguments (e.g.
+    ``role='ADMIN'``) are passed to `User`.
+    """
+    from app.models.base import db
+    from app.models.user import User
+
+    numbers = itertools.count(1)
+
+    def make(email=None, name=None, **kwargs):
+        n = next(numbers)
+        with client.application.app_context():
+            user = User(email=email or f'user{n}@example.com', name=name or f'User {n}', **kwargs)
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+
+    return make
+
+
+@pytest.fixture(scope='function')
+def auth_headers(client):
+    """Return a function building the Authorization header for a user id."""
+    from flask_jwt_extended import create_access_token
+
+    def headers(user_id):
+        with client.application.app_context():
+            return {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+    return headers
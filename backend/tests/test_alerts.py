@@ -0,0 +1,68 @@
+from app.models.base import db
+from app.models.notification import Notification
+from app.models.server_monitor import ServerMonitor
+from app.models.ticket import Ticket
+from app.models.user import User
+from app.monitoring.alerts import AlertEvaluator, handle_alert_events, parse_rules
+
+
+def _feed(evaluator, thresholds, points, metric='cpu.percent'):
+    events = []
+    for ts, value in points:
+        events += evaluator.evaluate('m1', thresholds, ts, {metric: value})
+    return [(e.ts, e.status) for e in events]
+
+
+def test_alert_fires_after_sustain_window_once_per_episode():
+    evaluator = AlertEvaluator(sustain=120, hysteresis=0.1, cooldown=0)
+    # A short spike never fires; a sustained breach fires exactly once
+    points = [(0, 95), (60, 50), (120, 90), (180, 91), (240, 92), (300, 93), (360, 94)]
+    assert _feed(evaluator, {'cpu': 80}, points) == [(240, 'firing')]
+    assert evaluator.status('m1') == {'cpu': 'firing'}
+
+
+def test_hysteresis_keeps_alert_firing_until_clear_level():
+    evaluator = AlertEvaluator(sustain=0, hysteresis=0.1, cooldown=0)
+    points = [(0, 85), (60, 79), (120, 75), (180, 72), (240, 85)]
+    assert _feed(evaluator, {'cpu': 80}, points) == [(0, 'firing'), (180, 'resolved'), (240, 'firing')]
+
+
+def test_cooldown_suppresses_repeat_notifications_and_replays_are_ignored():
+    evaluator = AlertEvaluator(sustain=0, hysteresis=0.0, cooldown=600)
+    points = [(0, 90), (60, 10), (120, 90), (120, 90), (60, 90), (180, 10), (700, 90)]
+    assert _feed(evaluator, {'cpu': {'value': 80}}, points) == [(0, 'firing'), (60, 'resolved'), (700, 'firing')]
+
+
+def test_network_threshold_uses_counter_rate():
+    evaluator = AlertEvaluator(sustain=0, hysteresis=0.0, cooldown=0)
+    events = []
+    for ts, total in [(0, 0), (10, 5000), (20, 30000), (30, 100)]:
+        events += evaluator.evaluate('m1', {'network': 1000}, ts,
+                                     {'network.bytes_sent': total, 'network.bytes_recv': 0})
+    assert [(e.ts, e.status, e.value) for e in events] == [(20, 'firing', 2500.0)]
+
+
+def test_ticket_option_accepts_string_booleans():
+    thresholds = {'cpu': {'value': 80, 'ticket': 'false'}, 'ram': {'value': 80, 'ticket': 'Yes'},
+                  'storage': {'value': 80, 'ticket': True}, 'network': {'value': 80}}
+    rules = {r.resource: r.ticket for r in parse_rules(thresholds, ticket=False)}
+    assert rules == {'cpu': False, 'ram': True, 'storage': True, 'network': False}
+
+
+def test_firing_alert_notifies_owner_and_opens_ticket(client):
+    app = client.application
+    with app.app_context():
+        owner = User(email='owner@example.com', name='Owner')
+        db.session.add(owner)
+        db.session.commit()
+        monitor = ServerMonitor(name='web-1', api_key='key-1', user_id=owner.id,
+                                alert_thresholds={'cpu': {'value': 80, 'for': 0, 'ticket': True}})
+        monitor.save()
+        events = AlertEvaluator().evaluate(monitor.id, monitor.alert_thresholds, 100, {'cpu.percent': 97.0})
+        handle_alert_events(monitor, [e._asdict() for e in events])
+
+        notification = Notification.query.filter_by(user_id=owner.id, type='monitor_alert').one()
+        assert 'CPU at 97.0%' in notification.message
+        ticket = Ticket.query.one()
+        assert ticket.priority == 'HIGH'
+        assert ticket.requester_id == owner.id
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta, timezone
+
+from app.models.base import db
+from app.models.server_monitor import ServerMonitor
+from app.models.user import User
+from app.monitoring.api_keys import ApiKeyCache, get_api_key_cache, hash_key
+from app.monitoring.last_check import LastCheckRecorder
+
+
+def test_api_key_cache_is_lru_with_expiry():
+    cache = ApiKeyCache(maxsize=2, ttl=60, negative_ttl=0)
+    cache.set('a', ('id-a', True))
+    cache.set('b', ('id-b', True))
+    assert cache.get('a') == ('id-a', True)
+    cache.set('c', ('id-c', False))
+    # 'b' was least recently used
+    assert cache.get('b') is None
+    assert cache.get('a') == ('id-a', True) and cache.get('c') == ('id-c', False)
+
+    # Unknown keys are not remembered with a zero negative TTL
+    cache.set('d', (None, False))
+    assert cache.get('d') is None
+
+    cache.ttl = -1
+    cache.set('a', ('id-a', True))
+    cache.invalidate(['a', 'c'])
+    assert len(cache) == 0
+
+
+def test_last_check_recorder_keeps_latest_time_per_monitor():
+    recorder = LastCheckRecorder(app=None)
+    now = datetime.now(timezone.utc)
+    recorder.record('m1', now)
+    recorder.record('m1', now - timedelta(seconds=5))
+    recorder.record('m2', now)
+    assert recorder.pending() == 2
+    assert recorder._pending['m1'] == now
+
+
+def test_ingest_caches_api_key_and_drops_it_on_update(client):
+    app = client.application
+    with app.app_context():
+        owner = User(email='owner@example.com', name='Owner')
+        db.session.add(owner)
+        db.session.commit()
+        monitor = ServerMonitor(name='web-1', api_key='key-1', user_id=owner.id)
+        monitor.save()
+        monitor_id = monitor.id
+
+    payload = {'data': {'cpu': {'usage_percent': 10.0}}}
+    assert client.post('/api/monitoring/data', json=payload, headers={'X-API-Key': 'key-1'}).status_code == 200
+    assert get_api_key_cache().get(hash_key('key-1')) == (monitor_id, True)
+    assert client.post('/api/monitoring/data', json=payload, headers={'X-API-Key': 'nope'}).status_code == 401
+
+    with app.app_context():
+        monitor = db.session.get(ServerMonitor, monitor_id)
+        assert monitor.last_check_at is not None
+        monitor.is_active = False
+        monitor.save()
+
+    assert get_api_key_cache().get(hash_key('key-1')) is None
+    assert client.post('/api/monitoring/data', json=payload, headers={'X-API-Key': 'key-1'}).status_code == 401
+
+    with app.app_context():
+        monitor = db.session.get(ServerMonitor, monitor_id)
+        monitor.is_active = True
+        monitor.set_api_credentials('key-2')
+        monitor.save()
+
+    assert client.post('/api/monitoring/data', json=payload, headers={'X-API-Key': 'key-1'}).status_code == 401
+    assert client.post('/api/monitoring/data', json=payload, headers={'X-API-Key': 'key-2'}).status_code == 200
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from app.models.base import db
+from app.models.metric_sample import MetricSample
+from app.models.server_monitor import ServerMonitor
+from app.models.user import User
+from app.monitoring.codec import decode_batch, dumps, encode_batch, is_batch, loads
+
+
+def _snapshot(i):
+    return {
+        'timestamp': f'2024-01-01T00:0{i}:00+00:00',
+        'system_info': {'hostname': 'web-1', 'platform': 'Linux-6.1-x86_64', 'boot_time': '2023-12-31T00:00:00+00:00'},
+        'cpu': {'usage_percent': 10.0 + i, 'cores': 4},
+        'memory': {'percentage': 40.0},
+        'storage': [{'mountpoint': '/', 'percentage': 70.0}],
+        'network': [
+            {'interface': 'eth0', 'bytes_sent': 1_000_000 + i * 500, 'bytes_recv': 9_000_000 + i * 700,
+             'packets_sent': 100 + i, 'packets_recv': 200 + i},
+        ],
+    }
+
+
+def test_batch_roundtrip_restores_counters_and_system_info():
+    snapshots = [_snapshot(i) for i in range(5)]
+    batch = encode_batch(snapshots, monitor_id='m1', system_info=snapshots[0]['system_info'])
+
+    assert batch['samples'][1]['network'][0]['bytes_sent'] == 500
+    assert all('system_info' not in s for s in batch['samples'])
+
+    body, headers = dumps(batch, compression='gzip')
+    assert headers == {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}
+    decoded = loads(body, headers['Content-Type'], headers['Content-Encoding'])
+    assert is_batch(decoded)
+
+    payloads = decode_batch(decoded)
+    assert [p['data']['network'] for p in payloads] == [s['network'] for s in snapshots]
+    assert payloads[0]['data']['system_info'] == snapshots[0]['system_info']
+    assert all('system_info' not in p['data'] for p in payloads[1:])
+    assert all(p['monitor_id'] == 'm1' for p in payloads)
+
+    # One compressed batch is far smaller than the snapshots posted one by one
+    separate = sum(len(json.dumps({'monitor_id': 'm1', 'data': s})) for s in snapshots)
+    assert len(body) < separate / 3
+
+
+def test_loads_rejects_oversized_gzip_body():
+    body, headers = dumps({'padding': 'x' * 10000}, compression='gzip')
+    with pytest.raises(ValueError):
+        loads(body, headers['Content-Type'], 'gzip', max_size=1000)
+
+
+def test_ingest_accepts_compressed_batches(client):
+    app = client.application
+    with app.app_context():
+        owner = User(email='owner@example.com', name='Owner')
+        db.session.add(owner)
+        db.session.commit()
+        ServerMonitor(name='web-1', api_key='key-1', user_id=owner.id).save()
+
+    snapshots = [_snapshot(i) for i in range(3)]
+    body, headers = dumps(encode_batch(snapshots, system_info=snapshots[0]['system_info']), compression='gzip')
+    rv = client.post('/api/monitoring/data', data=body, headers={**headers, 'X-API-Key': 'key-1'})
+    assert rv.status_code == 200
+    assert rv.get_json()['snapshots'] == 3
+
+    with app.app_context():
+        sent = MetricSample.query.filter_by(metric='network.bytes_sent').order_by(MetricSample.ts).all()
+        assert [s.value for s in sent] == [1_000_000, 1_000_500, 1_001_000]
+
+
+def test_ingest_rejects_malformed_batches(client):
+    app = client.application
+    with app.app_context():
+        owner = User(email='owner@example.com', name='Owner')
+        db.session.add(owner)
+        db.session.commit()
+        ServerMonitor(name='web-1', api_key='key-1', user_id=owner.id).save()
+
+    headers = {'X-API-Key': 'key-1'}
+    rv = client.post('/api/monitoring/data', json={'v': 1, 'samples': [1, 2]}, headers=headers)
+    assert rv.status_code == 400
+    rv = client.post('/api/monitoring/data', json={'v': 99, 'samples': []}, headers=headers)
+    assert rv.status_code == 415
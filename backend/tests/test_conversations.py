@@ -0,0 +1,140 @@
+from app.models.base import db
+from app.models.conversation import Conversation
+from app.models.conversation_participant import ConversationParticipant
+from app.models.message import Message
+from app.models.user import User
+
+
+def _setup_conversation(app, make_user, auth_headers, message_count):
+    reader_id, sender_id = make_user(name='Reader'), make_user(name='Sender')
+    with app.app_context():
+        conv = Conversation(type='group', title='Window test', created_by_id=sender_id)
+        conv.save()
+        db.session.add_all([
+            ConversationParticipant(conversation_id=conv.id, user_id=reader_id),
+            ConversationParticipant(conversation_id=conv.id, user_id=sender_id),
+        ])
+        messages = [Message(conversation_id=conv.id, sender_id=sender_id, content=f'm{i}')
+                    for i in range(message_count)]
+        db.session.add_all(messages)
+        db.session.commit()
+        # Messages inserted in one transaction share created_at, so the
+        # oldest one is decided by id
+        oldest = min(messages, key=lambda m: (m.created_at, m.id))
+        ConversationParticipant.advance_read_cursor(conv.id, reader_id, oldest)
+        db.session.commit()
+        return str(conv.id), str(reader_id), auth_headers(reader_id)
+
+
+def test_message_windows_cover_history_without_gaps(client, make_user, auth_headers):
+    conv_id, _, headers = _setup_conversation(client.application, make_user, auth_headers, 7)
+
+    full = client.get(f'/api/conversations/{conv_id}/messages', headers=headers).get_json()
+    assert len(full) == 7
+    assert sum(m['is_read'] for m in full) == 1
+
+    page = client.get(f'/api/conversations/{conv_id}/messages?limit=3', headers=headers).get_json()
+    newest_cursor = page['after']
+    seen = [m['id'] for m in page['items']]
+    while page['before']:
+        page = client.get(f"/api/conversations/{conv_id}/messages?limit=3&before={page['before']}",
+                          headers=headers).get_json()
+        seen = [m['id'] for m in page['items']] + seen
+    assert seen == [m['id'] for m in full]
+
+    newer = client.get(f'/api/conversations/{conv_id}/messages?after={newest_cursor}',
+                       headers=headers).get_json()
+    assert newer['items'] == []
+    assert newer['after'] == newest_cursor
+
+
+def test_create_message_returns_only_the_new_message(client, make_user, auth_headers):
+    conv_id, reader_id, headers = _setup_conversation(client.application, make_user, auth_headers, 2)
+
+    rv = client.post(f'/api/conversations/{conv_id}/messages',
+                     json={'content': 'hello', 'sender_id': reader_id}, headers=headers)
+    assert rv.status_code == 201
+    body = rv.get_json()
+    assert body['content'] == 'hello'
+    assert 'messages' not in body
+
+
+def test_read_cursor_marks_up_to_a_message_and_backfills(client, make_user, auth_headers):
+    from app.models.message_read_status import MessageReadStatus
+
+    conv_id, reader_id, headers = _setup_conversation(client.application, make_user, auth_headers, 5)
+    messages = client.get(f'/api/conversations/{conv_id}/messages', headers=headers).get_json()
+
+    rv = client.post(f"/api/conversations/{conv_id}/read-up-to/{messages[2]['id']}", headers=headers)
+    # messages[0] was already read, so two more became read
+    assert rv.get_json()['messages_marked_read'] == 2
+    flags = [m['is_read'] for m in client.get(f'/api/conversations/{conv_id}/messages', headers=headers).get_json()]
+    assert flags == [True, True, True, False, False]
+
+    # The cursor never moves backwards
+    rv = client.post(f"/api/conversations/{conv_id}/messages/{messages[1]['id']}/read", headers=headers)
+    assert rv.get_json()['messages_marked_read'] == 0
+
+    rv = client.post(f'/api/conversations/{conv_id}/read', headers=headers)
+    assert rv.get_json()['messages_marked_read'] == 2
+
+    with client.application.app_context():
+        participant = ConversationParticipant.query.filter_by(
+            conversation_id=messages[0]['conversation_id'], user_id=reader_id).first()
+        participant.last_read_message_id = None
+        participant.last_read_at = None
+        db.session.add(MessageReadStatus(message_id=messages[3]['id'], user_id=participant.user_id))
+        db.session.commit()
+
+        assert ConversationParticipant.backfill_read_cursors() == 1
+        assert str(db.session.get(ConversationParticipant, participant.id).last_read_message_id) == messages[3]['id']
+
+
+def test_conversation_list_uses_constant_query_count(client, make_user, auth_headers):
+    """Benchmark: the list costs the same number of queries for 1 or 10 conversations."""
+    from sqlalchemy import event
+
+    app = client.application
+    viewer_id = make_user(name='Viewer')
+    headers = auth_headers(viewer_id)
+
+    def add_direct_conversations(count, offset):
+        with app.app_context():
+            for i in range(offset, offset + count):
+                other = User(email=f'peer{i}@example.com', name=f'Peer {i}')
+                db.session.add(other)
+                db.session.flush()
+                conv = Conversation(type='direct', created_by_id=other.id)
+                db.session.add(conv)
+                db.session.flush()
+                db.session.add_all([
+                    ConversationParticipant(conversation_id=conv.id, user_id=viewer_id),
+                    ConversationParticipant(conversation_id=conv.id, user_id=other.id),
+                    Message(conversation_id=conv.id, sender_id=other.id, content=f'hello {i}'),
+                ])
+            db.session.commit()
+
+    def count_queries():
+        with app.app_context():
+            engine = db.engine
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            body = client.get('/api/conversations/', headers=headers).get_json()
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        return len(statements), body
+
+    add_direct_conversations(1, 0)
+    small, body = count_queries()
+    add_direct_conversations(9, 1)
+    large, body = count_queries()
+
+    assert large == small
+    assert len(body) == 10
+    assert {c['title'] for c in body} == {f'Peer {i}' for i in range(10)}
+    assert all(c['unread_count'] == 1 and c['last_message']['content'].startswith('hello') for c in body)
@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+
+from app.models.base import db
+from app.models.notification import Notification
+from app.models.ticket import Ticket
+from app.routes import exports
+
+
+def test_ticket_export_streams_csv_and_ndjson(client, monkeypatch, make_user, auth_headers):
+    app = client.application
+    admin_id, customer_id = make_user(role='ADMIN'), make_user()
+    with app.app_context():
+        db.session.add_all([
+            Ticket(ticket_id=f'#{i}', subject=f'Ticket, "{i}"', priority='HIGH' if i % 2 else 'LOW')
+            for i in range(25)
+        ])
+        db.session.commit()
+    # Small chunks so the response is sent in several pieces
+    monkeypatch.setattr(exports, 'CHUNK_SIZE', 256)
+    headers = auth_headers(admin_id)
+
+    rv = client.get('/api/exports/tickets', headers=headers)
+    assert rv.status_code == 200
+    assert rv.mimetype == 'text/csv'
+    assert rv.is_streamed
+    rows = list(csv.DictReader(io.StringIO(rv.get_data(as_text=True))))
+    assert len(rows) == 25
+    assert {row['subject'] for row in rows} == {f'Ticket, "{i}"' for i in range(25)}
+    assert rows[0]['assignee_id'] == ''
+
+    with app.app_context():
+        db.session.add(Ticket(ticket_id='#formula', subject='=HYPERLINK("http://evil")', description='-2+3'))
+        db.session.commit()
+    rows = csv.DictReader(io.StringIO(client.get('/api/exports/tickets', headers=headers).get_data(as_text=True)))
+    [row] = [row for row in rows if row['ticket_id'] == '#formula']
+    assert (row['subject'], row['description']) == ('\'=HYPERLINK("http://evil")', "'-2+3")
+
+    rv = client.get('/api/exports/tickets?format=ndjson&priority=HIGH', headers=headers)
+    assert rv.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in rv.get_data(as_text=True).splitlines()]
+    assert len(lines) == 12
+    assert all(line['priority'] == 'HIGH' and line['assignee_id'] is None for line in lines)
+    assert lines[0]['created_at'].endswith('Z')
+
+    assert client.get('/api/exports/tickets?format=xml', headers=headers).status_code == 400
+    assert client.get('/api/exports/tickets', headers=auth_headers(customer_id)).status_code == 403
+
+
+def test_notification_export_is_limited_to_own_rows(client, make_user, auth_headers):
+    app = client.application
+    admin_id, customer_id = make_user(role='ADMIN'), make_user()
+    with app.app_context():
+        db.session.add_all([
+            Notification(user_id=customer_id, type='ticket_assigned', message='mine'),
+            Notification(user_id=admin_id, type='ticket_assigned', message='theirs'),
+        ])
+        db.session.commit()
+
+    rv = client.get('/api/exports/notifications?format=ndjson', headers=auth_headers(customer_id))
+    assert [json.loads(line)['message'] for line in rv.get_data(as_text=True).splitlines()] == ['mine']
+    rv = client.get(f'/api/exports/notifications?user_id={admin_id}', headers=auth_headers(customer_id))
+    assert rv.status_code == 403
+
+    rv = client.get('/api/exports/notifications?format=ndjson&user_id=all', headers=auth_headers(admin_id))
+    assert len(rv.get_data(as_text=True).splitlines()) == 2
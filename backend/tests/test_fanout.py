@@ -0,0 +1,194 @@
+import threading
+
+from flask import Flask, g
+
+from app import hooks
+from app.fanout import FanoutPipeline, InProcessBackend, RedisBackend, side_effect
+
+
+def _pipeline(**kwargs):
+    app = Flask(__name__)
+    pipeline = FanoutPipeline(app, InProcessBackend(), workers=2, retry_base_delay=0.01, **kwargs)
+    pipeline.start()
+    return pipeline
+
+
+def test_failed_handler_is_retried_until_it_succeeds(monkeypatch):
+    monkeypatch.setattr(hooks, '_registry', hooks.defaultdict(list))
+    calls = []
+    done = threading.Event()
+
+    def flaky(value):
+        calls.append((value, g.hook_actor_id))
+        if len(calls) < 3:
+            raise RuntimeError('transient')
+        done.set()
+
+    hooks.register('test.event', flaky)
+    pipeline = _pipeline()
+    try:
+        pipeline.submit('test.event', hooks.handler_name(flaky), ['payload'], {}, actor_id='actor-1')
+        assert done.wait(5)
+    finally:
+        pipeline.stop()
+    assert calls == [('payload', 'actor-1')] * 3
+
+
+def test_handler_gives_up_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(hooks, '_registry', hooks.defaultdict(list))
+    calls = []
+
+    def always_fails():
+        calls.append(1)
+        raise RuntimeError('permanent')
+
+    hooks.register('test.event', always_fails)
+    pipeline = _pipeline(max_attempts=2)
+    try:
+        pipeline.submit('test.event', hooks.handler_name(always_fails), [], {})
+    finally:
+        pipeline.stop()
+    assert len(calls) == 2
+
+
+def test_retry_skips_completed_side_effects(monkeypatch):
+    monkeypatch.setattr(hooks, '_registry', hooks.defaultdict(list))
+    created, notified = [], []
+    done = threading.Event()
+
+    def notify():
+        notified.append(1)
+        if len(notified) < 2:
+            raise RuntimeError('transient')
+
+    def handler():
+        side_effect('create', created.append, 1)
+        side_effect('notify', notify)
+        done.set()
+
+    hooks.register('test.event', handler)
+    pipeline = _pipeline()
+    try:
+        pipeline.submit('test.event', hooks.handler_name(handler), [], {})
+        assert done.wait(5)
+    finally:
+        pipeline.stop()
+    assert created == [1]
+    assert notified == [1, 1]
+
+
+def test_retried_notification_handler_does_not_duplicate_rows(client, monkeypatch):
+    from app.models.base import db
+    from app.models.comment import Comment
+    from app.models.notification import Notification
+    from app.models.ticket import Ticket
+    from app.models.user import User
+
+    app = client.application
+    with app.app_context():
+        requester, assignee, author = [User(email=f'u{i}@example.com', name=f'U{i}') for i in range(3)]
+        db.session.add_all([requester, assignee, author])
+        db.session.commit()
+        ticket = Ticket(ticket_id='#1', subject='Retry', requester_id=requester.id, assignee_id=assignee.id)
+        ticket.save()
+        comment = Comment(content='Hi', ticket_id=ticket.id, author_id=author.id)
+        comment.save()
+        comment_id, recipients = comment.id, {requester.id, assignee.id}
+
+    # The second insert of the first attempt fails, after the first one ran
+    bulk_create = Notification.bulk_create.__func__
+    calls = []
+
+    def flaky_bulk_create(cls, *args, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError('transient')
+        return bulk_create(cls, *args, **kwargs)
+
+    monkeypatch.setattr(Notification, 'bulk_create', classmethod(flaky_bulk_create))
+    pipeline = FanoutPipeline(app, InProcessBackend(), workers=1, retry_base_delay=0.01)
+    pipeline.start()
+    try:
+        with app.app_context():
+            pipeline.submit('comment.created', hooks.handler_name(hooks._default_comment_created_handler),
+                            [db.session.get(Comment, comment_id)], {})
+    finally:
+        pipeline.stop()
+
+    assert len(calls) == 4
+    with app.app_context():
+        rows = Notification.query.filter_by(related_id=comment_id).all()
+        assert sorted(r.user_id for r in rows) == sorted(recipients)
+
+
+class _FakeRedis:
+    """The list, set and key commands `RedisBackend` uses, without expiry."""
+
+    def __init__(self):
+        self.lists, self.sets, self.keys, self.zsets = {}, {}, {}, {}
+
+    def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, value)
+
+    def rpoplpush(self, src, dst):
+        if not self.lists.get(src):
+            return None
+        value = self.lists[src].pop()
+        self.lpush(dst, value)
+        return value
+
+    def brpoplpush(self, src, dst, timeout=0):
+        return self.rpoplpush(src, dst)
+
+    def lrem(self, key, count, value):
+        self.lists.get(key, []).remove(value)
+
+    def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    def zrangebyscore(self, key, low, high, start=0, num=None):
+        return [m for m, score in sorted(self.zsets.get(key, {}).items(), key=lambda i: i[1]) if low <= score <= high]
+
+    def zrem(self, key, member):
+        return self.zsets.get(key, {}).pop(member, None) is not None
+
+    def set(self, key, value, ex=None):
+        self.keys[key] = value
+
+    def exists(self, key):
+        return key in self.keys
+
+    def sadd(self, key, member):
+        self.sets.setdefault(key, set()).add(member)
+
+    def srem(self, key, member):
+        self.sets.get(key, set()).discard(member)
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+
+def test_redis_recovery_only_requeues_jobs_of_expired_workers():
+    client = _FakeRedis()
+    busy = RedisBackend(client)
+    busy.push({'event': 'e'})
+    assert busy.pop(timeout=1)['event'] == 'e'
+
+    # A second process starting up leaves the live worker's job alone
+    starting = RedisBackend(client)
+    starting.recover()
+    assert starting.pending() == 0
+    assert client.llen(busy.processing_key) == 1
+
+    # Once the busy worker's lease lapses its job is handed out again
+    del client.keys[f'hooks:lease:{busy.worker_id}']
+    starting.recover()
+    assert starting.pop(timeout=1)['event'] == 'e'
+    assert client.llen(busy.processing_key) == 0
+    assert client.smembers('hooks:workers') == {starting.worker_id}
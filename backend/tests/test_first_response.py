@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+
+from app.hooks import send_comment_created
+from app.models.base import db
+from app.models.comment import Comment
+from app.models.ticket import Ticket
+from app.ticket_stats import read_stats
+
+
+def _comment(app, ticket_id, author_id):
+    with app.app_context():
+        comment = Comment(content='hi', ticket_id=ticket_id, author_id=author_id)
+        comment.save()
+        send_comment_created(comment)
+
+
+def test_first_non_requester_comment_is_recorded_once(client, make_user):
+    app = client.application
+    requester_id, agent_id = make_user(), make_user()
+    with app.app_context():
+        ticket = Ticket(ticket_id='#1', subject='Help', requester_id=requester_id)
+        ticket.save()
+        ticket_id = ticket.id
+
+    _comment(app, ticket_id, requester_id)
+    with app.app_context():
+        assert db.session.get(Ticket, ticket.id).first_response_at is None
+
+    _comment(app, ticket_id, agent_id)
+    with app.app_context():
+        first = db.session.get(Ticket, ticket.id)
+        recorded = first.first_response_at
+        assert recorded is not None and first.first_response_seconds >= 0
+    _comment(app, ticket_id, agent_id)
+    with app.app_context():
+        assert db.session.get(Ticket, ticket.id).first_response_at == recorded
+        stats = read_stats()
+        assert stats['response:count'] == 1
+
+    rv = client.get('/api/dashboard/reports/response-times')
+    assert rv.status_code == 200
+    assert rv.get_json()['responded'] == 1
+
+
+def test_backfill_and_percentiles(client, make_user):
+    app = client.application
+    requester_id, agent_id = make_user(), make_user()
+    created = datetime.now(timezone.utc) - timedelta(days=1)
+    with app.app_context():
+        tickets = [Ticket(ticket_id=f'#{i}', subject=f'T{i}', requester_id=requester_id, created_at=created)
+                   for i in range(5)]
+        db.session.add_all(tickets)
+        db.session.commit()
+        # Comments written before first responses were tracked
+        for i, ticket in enumerate(tickets[:4]):
+            db.session.add(Comment(content='x', ticket_id=ticket.id, author_id=requester_id,
+                                   created_at=created + timedelta(seconds=1)))
+            db.session.add(Comment(content='y', ticket_id=ticket.id, author_id=agent_id,
+                                   created_at=created + timedelta(seconds=60 * (i + 1))))
+        db.session.commit()
+
+        assert Ticket.backfill_first_response(batch_size=2) == 4
+        assert Ticket.backfill_first_response() == 0
+        seconds = sorted(t.first_response_seconds for t in Ticket.query.filter(Ticket.first_response_seconds.isnot(None)))
+        assert seconds == [60, 120, 180, 240]
+        assert read_stats()['response:sum'] == 600
+
+    rv = client.get('/api/dashboard/reports/response-times')
+    data = rv.get_json()
+    assert (data['responded'], data['awaitingResponse']) == (4, 1)
+    assert data['avgSeconds'] == 150
+    assert data['p50Seconds'] == 150
+    assert abs(data['p90Seconds'] - 222) < 1e-6
@@ -0,0 +1,98 @@
+from app.kb_search import reindex_articles
+from app.models.base import db
+from app.models.kb import KnowledgeBaseArticle, Tag
+from app.models.user import User
+
+
+def _articles(app):
+    with app.app_context():
+        author = User(email='author@example.com', name='Author')
+        db.session.add(author)
+        db.session.commit()
+        billing, accounts = Tag(name='billing'), Tag(name='accounts')
+        db.session.add_all([billing, accounts])
+        articles = [
+            KnowledgeBaseArticle(title='Reset your password', author_id=author.id, tags=[accounts],
+                                 content='Open settings and choose a new password for your account.'),
+            KnowledgeBaseArticle(title='Invoices', author_id=author.id, tags=[billing, accounts],
+                                 content='Invoices are emailed monthly. A password is not needed to view them.'),
+            KnowledgeBaseArticle(title='Printer setup', author_id=author.id, tags=[],
+                                 content='Install the driver, then print a test page.'),
+        ]
+        for i in range(5):
+            articles.append(KnowledgeBaseArticle(title=f'Release notes {i}', author_id=author.id,
+                                                 content=f'Version {i} fixes the printer driver.'))
+        db.session.add_all(articles)
+        db.session.commit()
+        return [a.id for a in articles]
+
+
+def test_search_ranks_and_highlights(client):
+    ids = _articles(client.application)
+
+    rv = client.get('/api/kb/search?q=password')
+    assert rv.status_code == 200
+    data = rv.get_json()
+    assert data['total'] == 2
+    first, second = data['items']
+    # Title matches rank above content-only matches
+    assert first['id'] == str(ids[0]) and second['id'] == str(ids[1])
+    assert first['rank'] > second['rank']
+    assert '<mark>password</mark>' in first['snippet'].lower()
+    assert 'content' not in first and 'search_vector' not in first
+    assert first['tags'] == ['accounts']
+
+    rv = client.get('/api/kb/search?q=password&tags=billing,accounts')
+    assert [item['id'] for item in rv.get_json()['items']] == [str(ids[1])]
+
+    assert client.get('/api/kb/search').status_code == 400
+
+
+def test_search_pagination_and_index_sync(client):
+    app = client.application
+    ids = _articles(app)
+
+    seen = []
+    for offset in (0, 4):
+        data = client.get(f'/api/kb/search?q=driver&limit=4&offset={offset}').get_json()
+        assert data['total'] == 6
+        seen += [item['id'] for item in data['items']]
+    assert len(seen) == len(set(seen)) == 6
+
+    with app.app_context():
+        printer = db.session.get(KnowledgeBaseArticle, ids[2])
+        printer.content = 'Scanners are configured from the control panel.'
+        db.session.commit()
+        db.session.get(KnowledgeBaseArticle, ids[3]).delete()
+    assert client.get('/api/kb/search?q=driver').get_json()['total'] == 4
+    assert client.get('/api/kb/search?q=scanners').get_json()['total'] == 1
+
+    with app.app_context():
+        assert reindex_articles() == 8
+    assert client.get('/api/kb/search?q=scanners').get_json()['total'] == 1
+
+
+def test_snippets_escape_article_html(client):
+    with client.application.app_context():
+        author = User(email='author@example.com', name='Author')
+        db.session.add(author)
+        db.session.commit()
+        db.session.add(KnowledgeBaseArticle(title='Tokens', author_id=author.id,
+                                            content='<img src=x onerror=alert(1)> rotate the token & retry'))
+        db.session.commit()
+
+    [item] = client.get('/api/kb/search?q=token').get_json()['items']
+    assert '<img' not in item['snippet']
+    assert '&lt;img src=x onerror=alert(1)&gt;' in item['snippet']
+    assert '<mark>token</mark> &amp; retry' in item['snippet']
+
+
+def test_search_without_a_text_index_answers_501(client, monkeypatch):
+    from app.routes import kb
+
+    def unsupported(*args, **kwargs):
+        raise NotImplementedError('KB search is not supported on mysql')
+
+    monkeypatch.setattr(kb, 'search_articles', unsupported)
+    rv = client.get('/api/kb/search?q=token')
+    assert rv.status_code == 501
@@ -0,0 +1,111 @@
+import threading
+import time
+
+from app.models.base import db
+from app.models.server_monitor import ServerMonitor
+from app.models.user import User
+from app.monitoring.collector import MetricsCollector, SharedSampler
+from app.monitoring.worker import MonitoringWorker
+
+
+class _CountingCollector:
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def collect_all_metrics(self):
+        with self.lock:
+            self.calls += 1
+        return {'cpu': {'usage_percent': 1.0}}
+
+
+def test_shared_sampler_collects_once_per_ttl():
+    collector = _CountingCollector()
+    sampler = SharedSampler(collector, ttl=60)
+    threads = [threading.Thread(target=sampler.snapshot) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert collector.calls == 1
+    assert sampler.snapshot() is sampler.snapshot()
+
+    sampler.ttl = 0
+    sampler.snapshot()
+    assert collector.calls == 2
+
+
+def test_cpu_usage_does_not_block():
+    collector = MetricsCollector()
+    started = time.monotonic()
+    first = collector.get_cpu_usage()['usage_percent']
+    second = collector.get_cpu_usage()['usage_percent']
+    assert time.monotonic() - started < 0.5
+    assert 0.0 <= first <= 100.0 and 0.0 <= second <= 100.0
+
+
+def test_cpu_usage_does_not_count_guest_time_twice(monkeypatch):
+    from collections import namedtuple
+
+    from app.monitoring import collector as collector_module
+
+    fields = 'user nice system idle iowait irq softirq steal guest guest_nice'
+    CpuTimes = namedtuple('scputimes', fields)
+    samples = iter([
+        CpuTimes(0, 0, 0, 0, 0, 0, 0, 0, 0, 0),
+        # 50s of guest time, already included in user
+        CpuTimes(60, 0, 10, 30, 0, 0, 0, 0, 50, 0),
+    ])
+    monkeypatch.setattr(collector_module.psutil, 'cpu_times', lambda: next(samples))
+    collector = MetricsCollector()
+    collector._cpu_percent()
+    assert collector._cpu_percent() == 70.0
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_scheduler_multiplexes_monitors_and_stops_cleanly(client):
+    app = client.application
+    with app.app_context():
+        owner = User(email='owner@example.com', name='Owner')
+        db.session.add(owner)
+        db.session.commit()
+        monitors = [ServerMonitor(name=f'm{i}', api_key=f'k{i}', user_id=owner.id, check_interval=1)
+                    for i in range(20)]
+        inactive = ServerMonitor(name='off', api_key='off', user_id=owner.id, is_active=False)
+        db.session.add_all(monitors + [inactive])
+        db.session.commit()
+        ids = [str(m.id) for m in monitors]
+        inactive_id = str(inactive.id)
+
+    worker = MonitoringWorker(app, max_workers=4)
+    collector = _CountingCollector()
+    worker.sampler = SharedSampler(collector, ttl=0)
+    threads_before = threading.active_count()
+    try:
+        for monitor_id in ids + [inactive_id]:
+            worker.start_monitoring(monitor_id)
+
+        # Every active monitor is checked twice by one scheduler and a 4-thread pool
+        assert _wait_for(lambda: collector.calls >= 40)
+        assert threading.active_count() - threads_before <= 5
+        status = worker.get_worker_status()
+        assert set(status) == set(ids)
+        assert all(s['running'] and s['last_error'] is None for s in status.values())
+
+        worker.stop_all_monitors()
+        time.sleep(0.1)
+        calls = collector.calls
+        time.sleep(1.5)
+        assert collector.calls == calls
+        assert worker.get_worker_status() == {}
+    finally:
+        worker.shutdown()
+    assert not worker.running
@@ -0,0 +1,172 @@
+from app.models.notification import Notification
+
+
+def test_bulk_create_inserts_one_row_per_recipient(client, make_user):
+    with client.application.app_context():
+        user_ids = [make_user() for _ in range(5)]
+
+        # Duplicate recipients collapse to a single notification
+        ids = Notification.bulk_create(user_ids + user_ids[:2], 'kb_article_created', 'New article')
+
+        assert len(ids) == 5
+        rows = Notification.query.filter(Notification.id.in_(ids)).all()
+        assert sorted(r.user_id for r in rows) == sorted(user_ids)
+        assert all(r.created_at is not None and r.is_read is False for r in rows)
+
+
+def test_kb_article_broadcast_skips_the_author(client, make_user):
+    from app.hooks import _default_kb_article_created_handler
+    from app.models.kb import KnowledgeBaseArticle
+    from flask import g
+
+    with client.application.app_context():
+        author_id, *reader_ids = [make_user() for _ in range(4)]
+        article = KnowledgeBaseArticle(title='Broadcast', content='Body', author_id=author_id)
+        article.save()
+
+        g.hook_actor_id = str(author_id)
+        _default_kb_article_created_handler(article)
+
+        recipients = {n.user_id for n in Notification.query.filter_by(related_id=article.id)}
+        assert recipients == set(reader_ids)
+
+
+def test_commits_report_unread_deltas_per_recipient(client, monkeypatch, make_user):
+    import app.notification_cache as notification_cache
+
+    applied = []
+    monkeypatch.setattr(notification_cache, 'invalidate', lambda deltas: applied.append(dict(deltas)))
+
+    with client.application.app_context():
+        reader_id, other_id = make_user(), make_user()
+        n = Notification(user_id=reader_id, type='t', message='m')
+        n.save()
+        n.is_read = True
+        n.save()
+        Notification.bulk_create([other_id], 't', 'm')
+
+    # Only the recipients are invalidated, with their unread count change
+    assert applied == [{reader_id: 1}, {reader_id: -1}, {other_id: 1}]
+
+
+class _FakeRedis:
+    """Just enough of a Redis client for the notification cache scripts."""
+
+    def __init__(self):
+        self.data = {}
+
+    def mget(self, *keys):
+        return [self.data.get(k) for k in keys]
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+
+    def expire(self, key, ttl):
+        pass
+
+    def execute(self):
+        pass
+
+    def eval(self, script, numkeys, *args):
+        import app.notification_cache as notification_cache
+
+        keys, argv = args[:numkeys], [str(a) for a in args[numkeys:]]
+        if script == notification_cache._INCR_IF_EXISTS:
+            if keys[0] in self.data:
+                self.data[keys[0]] = str(int(self.data[keys[0]]) + int(argv[0]))
+        elif self.data.get(keys[0], '0') == argv[0]:
+            self.data.setdefault(keys[1], argv[1])
+
+
+def test_unread_counter_is_not_seeded_across_a_concurrent_commit(client, monkeypatch, make_user):
+    import app.notification_cache as notification_cache
+
+    fake = _FakeRedis()
+    monkeypatch.setattr(notification_cache, '_redis', lambda: fake)
+    with client.application.app_context():
+        user_id = make_user()
+        count = notification_cache._count_unread
+
+        def count_racing_a_commit(uid):
+            stale = count(uid)
+            Notification.bulk_create([uid], 't', 'meanwhile')
+            return stale
+
+        monkeypatch.setattr(notification_cache, '_count_unread', count_racing_a_commit)
+        assert notification_cache.unread_count(user_id) == 0
+        assert notification_cache._unread_key(user_id) not in fake.data
+
+        monkeypatch.setattr(notification_cache, '_count_unread', count)
+        assert notification_cache.unread_count(user_id) == 1
+        assert fake.data[notification_cache._unread_key(user_id)] == '1'
+        Notification.bulk_create([user_id], 't', 'later')
+        assert notification_cache.unread_count(user_id) == 2
+
+
+def test_feed_since_cursor_and_bulk_mark_read(client, make_user, auth_headers):
+    app = client.application
+    with app.app_context():
+        user_id = make_user()
+        Notification.bulk_create([user_id], 't', 'first')
+    headers = auth_headers(user_id)
+
+    first = client.get('/api/notifications/?limit=10', headers=headers).get_json()
+    assert [n['message'] for n in first['items']] == ['first']
+    assert first['next_cursor'] is None
+
+    with app.app_context():
+        Notification(user_id=user_id, type='t', message='second').save()
+
+    delta = client.get(f"/api/notifications/?since={first['since']}", headers=headers).get_json()
+    assert [n['message'] for n in delta['items']] == ['second']
+    assert delta['has_more'] is False
+
+    rv = client.post('/api/notifications/read', json={'all': True}, headers=headers)
+    assert rv.get_json() == {'updated': 2}
+    assert client.get('/api/notifications/unread-count', headers=headers).get_json() == {'unread': 0}
+    assert client.post('/api/notifications/read', json={}, headers=headers).status_code == 400
+
+
+def test_since_poll_picks_up_rows_committed_behind_the_cursor(client, make_user, auth_headers):
+    from datetime import timedelta
+
+    app = client.application
+    with app.app_context():
+        user_id = make_user()
+        first = Notification(user_id=user_id, type='t', message='first')
+        first.save()
+        created = first.created_at
+    headers = auth_headers(user_id)
+    since = client.get('/api/notifications/?limit=10', headers=headers).get_json()['since']
+
+    with app.app_context():
+        # Stamped before the cursor's newest row, as a slow transaction would be
+        Notification(user_id=user_id, type='t', message='late', created_at=created - timedelta(seconds=5)).save()
+        Notification(user_id=user_id, type='t', message='next', created_at=created + timedelta(seconds=1)).save()
+
+    delta = client.get(f'/api/notifications/?since={since}&limit=1', headers=headers).get_json()
+    assert ([n['message'] for n in delta['items']], delta['has_more']) == (['late'], True)
+    delta = client.get(f"/api/notifications/?since={delta['since']}", headers=headers).get_json()
+    assert [n['message'] for n in delta['items']] == ['next']
+    delta = client.get(f"/api/notifications/?since={delta['since']}", headers=headers).get_json()
+    assert (delta['items'], delta['has_more']) == ([], False)
+
+
+def test_feed_is_served_when_the_cache_is_down(client, monkeypatch, make_user, auth_headers):
+    from app.routes import notifications as routes
+
+    def fail(*args, **kwargs):
+        raise ConnectionError('cache down')
+
+    monkeypatch.setattr(routes.cache, 'get', fail)
+    monkeypatch.setattr(routes.cache, 'set', fail)
+    app = client.application
+    with app.app_context():
+        user_id = make_user()
+        Notification.bulk_create([user_id], 't', 'first')
+    rv = client.get('/api/notifications/?limit=10', headers=auth_headers(user_id))
+    assert rv.status_code == 200
+    assert [n['message'] for n in rv.get_json()['items']] == ['first']
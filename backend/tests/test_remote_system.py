@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.models.base import db
+from app.models.server_monitor import ServerMonitor
+from app.models.user import User
+from app.monitoring.remote import RemoteSystemFetcher, RemoteTarget, system_url
+
+
+class _Handler(BaseHTTPRequestHandler):
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        if self.path.startswith('/slow'):
+            time.sleep(0.3)
+        elif self.path.startswith('/hang'):
+            time.sleep(2)
+        body = json.dumps({'cpu': {'percent': 5.0}, 'key': self.headers.get('X-Metrics-Key')}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.requests = 0
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_fetches_concurrently_with_partial_results_and_cache(server):
+    fetcher = RemoteSystemFetcher(max_workers=16, timeout=1.0, cache_ttl=60)
+    try:
+        targets = [RemoteTarget(f'm{i}', system_url(f'{server}/slow{i}'), f'k{i}') for i in range(8)]
+        targets.append(RemoteTarget('hang', system_url(f'{server}/hang'), 'k'))
+        targets.append(RemoteTarget('down', 'http://127.0.0.1:9/api/monitoring/system', 'k'))
+
+        started = time.monotonic()
+        results = fetcher.fetch_all(targets)
+        # Bounded by the timeout, not the sum of 8 x 0.3s plus the hung host
+        assert time.monotonic() - started < 2.0
+        assert all(results[f'm{i}']['ok'] and results[f'm{i}']['data']['key'] == f'k{i}' for i in range(8))
+        assert not results['hang']['ok'] and 'timed out' in results['hang']['error']
+        assert not results['down']['ok'] and results['down']['status'] is None
+
+        requests_before = _Handler.requests
+        again = fetcher.fetch_all(targets[:8])
+        assert all(r['cached'] for r in again.values())
+        assert _Handler.requests == requests_before
+    finally:
+        fetcher.shutdown()
+
+
+def test_fan_in_endpoint_reports_each_monitor(client, server):
+    from flask_jwt_extended import create_access_token
+
+    app = client.application
+    with app.app_context():
+        owner = User(email='owner@example.com', name='Owner')
+        other = User(email='other@example.com', name='Other')
+        db.session.add_all([owner, other])
+        db.session.commit()
+        mine = ServerMonitor(name='web-1', api_key='key-1', server_ip=server.split('//')[1], user_id=owner.id)
+        no_ip = ServerMonitor(name='web-2', api_key='key-2', user_id=owner.id)
+        theirs = ServerMonitor(name='db-1', api_key='key-3', server_ip='127.0.0.1', user_id=other.id)
+        db.session.add_all([mine, no_ip, theirs])
+        db.session.commit()
+        ids = [str(mine.id), str(no_ip.id), str(theirs.id)]
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(owner.id))}'}
+
+    rv = client.get(f"/api/monitoring/system?ids={','.join(ids)}", headers=headers)
+    assert rv.status_code == 200
+    data = rv.get_json()
+    assert set(data['results']) == set(ids)
+    assert data['results'][ids[0]]['data']['key'] == 'key-1'
+    assert 'server_ip' in data['results'][ids[1]]['error']
+    assert data['results'][ids[2]]['status'] == 404
+    assert (data['ok'], data['failed']) == (1, 2)
+
+    assert client.get(f'/api/monitoring/system?ids={ids[0]}').status_code == 401
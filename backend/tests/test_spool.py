@@ -0,0 +1,119 @@
+import gzip
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.monitoring.codec import decode_batch
+from app.monitoring.sender import QUEUED, MetricsSender
+from app.monitoring.spool import Backoff, Spool
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_spool_replays_in_order_and_survives_restart(tmp_path):
+    spool = Spool(str(tmp_path), segment_bytes=64)
+    for i in range(10):
+        spool.append({'n': i})
+    assert len([n for n in os.listdir(tmp_path) if n.endswith('.seg')]) > 1
+
+    records, token = spool.read_batch(4)
+    assert [r['n'] for r in records] == [0, 1, 2, 3]
+    spool.ack(token)
+
+    # Unacked records are read again after reopening
+    reopened = Spool(str(tmp_path), segment_bytes=64)
+    records, token = reopened.read_batch(100)
+    assert [r['n'] for r in records] == [4, 5, 6, 7, 8, 9]
+    reopened.ack(token)
+    assert reopened.empty()
+    assert len([n for n in os.listdir(tmp_path) if n.endswith('.seg')]) <= 1
+
+
+def test_spool_evicts_oldest_segments_past_size_bound(tmp_path):
+    spool = Spool(str(tmp_path), max_bytes=200, segment_bytes=50)
+    for i in range(100):
+        spool.append({'n': i})
+    assert spool.size_bytes() <= 250
+    records, _ = spool.read_batch(1000)
+    numbers = [r['n'] for r in records]
+    assert numbers == sorted(numbers)
+    assert numbers[-1] == 99 and numbers[0] > 0
+
+
+def test_spool_skips_torn_trailing_line(tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.append({'n': 1})
+    segment = [n for n in os.listdir(tmp_path) if n.endswith('.seg')][0]
+    with open(tmp_path / segment, 'ab') as f:
+        f.write(b'{"n": 2')
+    records, _ = spool.read_batch(10)
+    assert records == [{'n': 1}]
+
+
+def test_backoff_grows_exponentially_and_resets():
+    clock = _Clock()
+    backoff = Backoff(base=1, cap=8, clock=clock)
+    delays = [backoff.failure() for _ in range(6)]
+    assert all(0.5 * min(8, 2 ** i) <= d <= min(8, 2 ** i) for i, d in enumerate(delays))
+    assert not backoff.ready()
+    backoff.success()
+    assert backoff.ready()
+
+
+@pytest.fixture
+def flaky_endpoint():
+    state = {'status': 503, 'bodies': []}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            if self.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            if state['status'] == 200:
+                state['bodies'].append(json.loads(body))
+            self.send_response(state['status'])
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state['url'] = f'http://127.0.0.1:{server.server_address[1]}/api/monitoring/data'
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def test_sender_spools_during_outage_and_replays_in_one_batch(tmp_path, flaky_endpoint):
+    sender = MetricsSender('key', endpoint_url=flaky_endpoint['url'], spool_dir=str(tmp_path))
+    clock = _Clock()
+    sender.backoff = Backoff(base=10, clock=clock)
+
+    snapshots = [{'timestamp': f't{i}', 'cpu': {'usage_percent': float(i)},
+                  'network': [{'interface': 'eth0', 'bytes_sent': 100 * i}]} for i in range(5)]
+    for snapshot in snapshots:
+        # Accepted into the spool even though the endpoint is down
+        assert sender.send_metrics(snapshot, 'm1') == QUEUED
+    # Only the first attempt reached the endpoint; the rest waited for the backoff
+    assert sender.backoff.failures == 1
+
+    flaky_endpoint['status'] = 200
+    clock.now = 100
+    assert sender.drain('m1')
+    assert len(flaky_endpoint['bodies']) == 1
+    payloads = decode_batch(flaky_endpoint['bodies'][0])
+    assert [p['data'] for p in payloads] == snapshots
+    assert sender.spool.empty()
+    # Reported as delivered only once the endpoint accepted it
+    assert sender.send_metrics(snapshots[0], 'm1') is True
@@ -0,0 +1,46 @@
+import json
+
+import app.routes.monitoring as monitoring_routes
+from app.monitoring.system import SystemSampler
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_sampler_reports_rates_from_counter_deltas():
+    clock = _Clock()
+    sampler = SystemSampler(interval=0, clock=clock)
+    first = sampler.refresh()
+    assert first['network']['bytes_sent_per_sec'] is None
+
+    clock.now += 2.0
+    second = sampler.refresh()
+    rate = second['network']['bytes_sent_per_sec']
+    assert rate is not None and rate >= 0
+    assert 0.0 <= second['cpu']['percent'] <= 100.0
+    assert json.loads(sampler.body())['timestamp'] == second['timestamp']
+    assert sampler.snapshot() is second
+
+
+def test_system_endpoint_serves_snapshot_and_queues_webhook(client, monkeypatch):
+    rv = client.get('/api/monitoring/system')
+    assert rv.status_code == 200
+    data = rv.get_json()
+    assert {'cpu', 'memory', 'disk', 'network'} <= set(data)
+    assert 'bytes_recv_per_sec' in data['network']
+
+    queued = []
+
+    class _Dispatcher:
+        def dispatch(self, url, payload, notification_id=None):
+            queued.append((url, payload))
+
+    monkeypatch.setattr(monitoring_routes, 'get_webhook_dispatcher', lambda: _Dispatcher())
+    rv = client.get('/api/monitoring/system?webhook=http://hooks.example.com/in')
+    assert rv.get_json()['webhook_forwarded'] is True
+    assert queued and queued[0][0] == 'http://hooks.example.com/in'
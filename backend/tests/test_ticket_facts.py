@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, timezone
+
+from app.models.base import db
+from app.models.ticket import Ticket
+from app.models.user import User
+from app.ticket_facts import read_facts, read_state, rebuild_ticket_facts
+
+
+def _today():
+    return datetime.now(timezone.utc).date()
+
+
+def test_facts_follow_ticket_changes(client):
+    app = client.application
+    old = datetime.now(timezone.utc) - timedelta(days=40)
+    with app.app_context():
+        agent = User(email='agent@example.com', name='Agent')
+        db.session.add(agent)
+        db.session.commit()
+        agent_id = agent.id
+
+        tickets = [Ticket(ticket_id=f'#{i}', subject=f'T{i}', assignee_id=agent_id if i < 3 else None)
+                   for i in range(4)]
+        tickets.append(Ticket(ticket_id='#old', subject='Old', created_at=old))
+        db.session.add_all(tickets)
+        db.session.commit()
+
+        tickets[0].status = 'RESOLVED'
+        tickets[1].status = 'CLOSED'
+        db.session.commit()
+        tickets[1].status = 'OPEN'
+        tickets[2].assignee_id = None
+        tickets[3].delete()
+        db.session.commit()
+
+        # A rolled back change leaves the facts alone
+        tickets[4].status = 'CLOSED'
+        db.session.flush()
+        db.session.rollback()
+
+        today = _today()
+        totals = read_facts(today, today)[()]
+        assert (totals['created'], totals['resolved'], totals['reopened']) == (4, 2, 1)
+        assert read_state(today, ('status',)) == {('OPEN',): 3, ('RESOLVED',): 1}
+        assert read_state(today - timedelta(days=1)) == {(): 1}
+
+    rv = client.get('/api/dashboard/reports/tickets-by-status')
+    assert rv.status_code == 200
+    by_status = {row['status']: row for row in rv.get_json()}
+    assert by_status['OPEN']['count'] == 3
+    assert by_status['RESOLVED']['count'] == 1 and by_status['RESOLVED']['resolutionRate'] == 1.0
+    assert by_status['OPEN']['reopened'] == 1
+
+    rv = client.get('/api/dashboard/reports/agent-performance')
+    [row] = rv.get_json()
+    assert row['id'] == str(agent_id)
+    assert (row['assignedTickets'], row['resolvedTickets'], row['resolutionRate']) == (2, 1, 50)
+    assert (row['resolvedInPeriod'], row['reopenedInPeriod']) == (2, 1)
+
+    rv = client.get('/api/dashboard/reports/ticket-trends')
+    assert rv.get_json() == [{'date': _today().isoformat(), 'created': 4, 'resolved': 2, 'reopened': 1}]
+
+    start = (old - timedelta(days=1)).date().isoformat()
+    rv = client.get(f'/api/dashboard/reports/ticket-trends?from={start}&group_by=month')
+    assert sum(row['created'] for row in rv.get_json()) == 5
+
+    rv = client.get('/api/dashboard/reports/ticket-trends?group_by=assignee&status=RESOLVED')
+    assert rv.get_json() == [{'assigneeId': str(agent_id), 'created': 0, 'resolved': 1, 'reopened': 0}]
+
+    assert client.get('/api/dashboard/reports/ticket-trends?group_by=day,week').status_code == 400
+    assert client.get('/api/dashboard/reports/ticket-trends?group_by=subject').status_code == 400
+    assert client.get('/api/dashboard/reports/ticket-trends?from=2024-02-01&to=2024-01-01').status_code == 400
+
+
+def test_rebuild_from_tickets(client):
+    app = client.application
+    with app.app_context():
+        db.session.add_all([Ticket(ticket_id='#1', subject='A'), Ticket(ticket_id='#2', subject='B')])
+        db.session.commit()
+        # Core statements bypass the flush hook
+        db.session.execute(Ticket.__table__.update().values(status='CLOSED', status_changed_at=datetime.now(timezone.utc)))
+        db.session.commit()
+        today = _today()
+        assert read_state(today, ('status',)) == {('OPEN',): 2}
+
+        rebuild_ticket_facts()
+        assert read_state(today, ('status',)) == {('CLOSED',): 2}
+        totals = read_facts(today, today)[()]
+        assert (totals['created'], totals['resolved']) == (2, 2)
+
+
+def test_reports_are_served_when_the_cache_is_down(client, monkeypatch):
+    from app.routes import dashboard
+
+    def fail(*args, **kwargs):
+        raise ConnectionError('cache down')
+
+    monkeypatch.setattr(dashboard.cache, 'get', fail)
+    monkeypatch.setattr(dashboard.cache, 'set', fail)
+    with client.application.app_context():
+        Ticket(ticket_id='#1', subject='A').save()
+    rv = client.get('/api/dashboard/reports/ticket-trends')
+    assert rv.status_code == 200
+    assert rv.get_json()[0]['created'] == 1
@@ -0,0 +1,89 @@
+from app.models.base import db
+from app.models.testing import Testing
+from app.models.ticket import Ticket
+from app.models.user import User
+from app.ticket_stats import StatsReconcileJob, compute_ticket_stats, read_stats, reconcile_ticket_stats
+
+
+def _nonzero(stats):
+    return {name: value for name, value in stats.items() if value and not name.startswith('response:')}
+
+
+def test_counters_follow_ticket_changes(client):
+    app = client.application
+    with app.app_context():
+        tester = User(email='tester@example.com', name='Tester')
+        db.session.add(tester)
+        db.session.commit()
+
+        tickets = [Ticket(ticket_id=f'#{i}', subject=f'T{i}', priority='HIGH' if i % 2 else 'LOW')
+                   for i in range(4)]
+        db.session.add_all(tickets)
+        db.session.commit()
+        assert read_stats()['total'] == 4
+        assert read_stats()['status:OPEN'] == 4
+
+        tickets[0].status = 'RESOLVED'
+        tickets[1].priority = 'LOW'
+        tickets[2].delete()
+        db.session.commit()
+
+        # Ticket status changes made without a ticket hook are counted too
+        testing = Testing(ticket_id=tickets[0].id, user_id=tester.id)
+        db.session.add(testing)
+        db.session.commit()
+        testing.update_status('failed')
+
+        # A rolled back change leaves the counters alone
+        tickets[3].status = 'CLOSED'
+        db.session.flush()
+        db.session.rollback()
+
+        stats = read_stats()
+        assert _nonzero(stats) == _nonzero(compute_ticket_stats())
+        assert stats['total'] == 3
+        assert stats['status:In Progress'] == 1 and stats['status:OPEN'] == 2
+        assert stats['priority:LOW'] == 2 and stats['priority:HIGH'] == 1
+
+    rv = client.get('/api/dashboard/')
+    assert rv.status_code == 200
+    data = rv.get_json()
+    assert data['totalTickets'] == 3
+    assert data['resolvedTickets'] == 0
+    assert len(data['monthlyData']) == 6
+    assert data['monthlyData'][-1]['tickets'] == 3
+
+
+def test_reconcile_corrects_drift(client):
+    app = client.application
+    with app.app_context():
+        db.session.add_all([Ticket(ticket_id='#1', subject='A'), Ticket(ticket_id='#2', subject='B')])
+        db.session.commit()
+        # Core statements bypass the flush hook
+        db.session.execute(Ticket.__table__.update().values(status='CLOSED'))
+        db.session.commit()
+        assert read_stats().get('status:CLOSED', 0) == 0
+
+        drift = reconcile_ticket_stats()
+        assert drift['status:CLOSED'] == (0, 2)
+        assert drift['status:OPEN'] == (2, 0)
+        assert read_stats()['status:CLOSED'] == 2
+        assert reconcile_ticket_stats() == {}
+
+
+def test_reconcile_job_waits_one_interval(client):
+    app = client.application
+    with app.app_context():
+        db.session.add(Ticket(ticket_id='#1', subject='A'))
+        db.session.commit()
+        db.session.execute(Ticket.__table__.update().values(status='CLOSED'))
+        db.session.commit()
+
+    # Starting a process must not lock and rewrite the table straight away
+    job = StatsReconcileJob(app, interval=3600)
+    job.start()
+    job.stop()
+    with app.app_context():
+        assert read_stats().get('status:CLOSED', 0) == 0
+        job.run_once()
+        assert read_stats()['status:CLOSED'] == 1
@@ -0,0 +1,191 @@
+import time
+from contextlib import contextmanager
+
+from app.models.base import db
+from app.models.metric_rollup import MetricLateBucket, MetricRollup
+from app.models.metric_sample import MetricSample
+from app.models.server_monitor import ServerMonitor
+from app.models.user import User
+from app.monitoring import rollup
+from app.monitoring.rollup import RollupJob, run_rollups
+from app.monitoring.timeseries import (
+    MAX_POINTS, choose_step, extract_samples, min_resolution, pick_resolution, purge_expired, query_series,
+    store_samples,
+)
+
+
+def test_extract_samples_handles_both_agent_payloads():
+    ts, samples = extract_samples({
+        'monitor_id': 'm1',
+        'data': {
+            'timestamp': '2024-01-01T00:00:00+00:00',
+            'cpu': {'usage_percent': 12.5, 'load_average': [0.5, 0.4, 0.3]},
+            'memory': {'percentage': 40.0},
+            'storage': [
+                {'mountpoint': '/', 'percentage': 70.0},
+                {'mountpoint': '/data', 'percentage': 91.0},
+            ],
+            'network': [
+                {'interface': 'eth0', 'bytes_sent': 100, 'bytes_recv': 200},
+                {'interface': 'eth1', 'bytes_sent': 1, 'bytes_recv': 2},
+            ],
+        },
+    })
+    assert ts == 1704067200
+    assert dict(samples) == {
+        'cpu.percent': 12.5,
+        'cpu.load1': 0.5,
+        'memory.percent': 40.0,
+        'storage[/].percent': 70.0,
+        'storage[/data].percent': 91.0,
+        'storage.percent': 91.0,
+        'network.bytes_sent': 101.0,
+        'network.bytes_recv': 202.0,
+    }
+
+    _, samples = extract_samples({
+        'cpu': {'percent': 3.0, 'count': 4},
+        'memory': {'percent': 50.0},
+        'disk': {'percent': 10.0},
+        'network': {'bytes_sent': 5, 'bytes_recv': 6},
+    })
+    assert dict(samples) == {
+        'cpu.percent': 3.0,
+        'memory.percent': 50.0,
+        'storage.percent': 10.0,
+        'network.bytes_sent': 5.0,
+        'network.bytes_recv': 6.0,
+    }
+
+
+def test_choose_step_caps_points_and_aligns_to_tiers():
+    assert choose_step(0, 3600, 60) == 60
+    month = choose_step(0, 86400 * 30, 1)
+    assert (86400 * 30) / month <= MAX_POINTS
+    assert month % 300 == 0
+    assert choose_step(0, 3600, 3500) == 3600
+    assert pick_resolution(60) == 1
+    assert pick_resolution(900) == 300
+    assert pick_resolution(7200) == 3600
+    retention = {1: 14, 300: 90, 3600: 365, 86400: 1825}
+    assert min_resolution(0, retention, now=86400) == 1
+    assert min_resolution(0, retention, now=86400 * 30) == 300
+
+
+def test_metrics_are_stored_and_downsampled(client):
+    from flask_jwt_extended import create_access_token
+
+    app = client.application
+    with app.app_context():
+        owner = User(email='owner@example.com', name='Owner')
+        db.session.add(owner)
+        db.session.commit()
+        monitor = ServerMonitor(name='web-1', api_key='key-1', user_id=owner.id)
+        monitor.save()
+        monitor_id = str(monitor.id)
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(owner.id))}'}
+
+    # Recent enough to be inside the raw sample retention window
+    base = int(time.time()) // 3600 * 3600 - 3600
+    for i in range(6):
+        rv = client.post('/api/monitoring/data', headers={'X-API-Key': 'key-1'}, json={
+            'timestamp': base + i * 30,
+            'cpu': {'percent': float(i * 10)},
+        })
+        assert rv.status_code == 200
+
+    rv = client.get(f'/api/monitoring/{monitor_id}/metrics?metric=cpu.percent'
+                    f'&from={base}&to={base + 180}&step=60', headers=headers)
+    assert rv.status_code == 200
+    body = rv.get_json()
+    assert body['step'] == 60
+    buckets = body['series']['cpu.percent']
+    assert [b['t'] for b in buckets] == [base, base + 60, base + 120]
+    assert [(b['min'], b['max'], b['avg'], b['count']) for b in buckets] == [
+        (0.0, 10.0, 5.0, 2), (20.0, 30.0, 25.0, 2), (40.0, 50.0, 45.0, 2),
+    ]
+
+    with app.app_context():
+        assert purge_expired(1, now=base + 86400 + 60) == 2
+        assert MetricSample.query.count() == 4
+
+
+def test_rollups_answer_queries_without_raw_samples(client):
+    app = client.application
+    base = 1704067200
+    with app.app_context():
+        owner = User(email='owner@example.com', name='Owner')
+        db.session.add(owner)
+        db.session.commit()
+        monitor = ServerMonitor(name='web-1', api_key='key-1', user_id=owner.id)
+        monitor.save()
+        db.session.add_all([
+            MetricSample(monitor_id=monitor.id, metric='cpu.percent', ts=base + i * 60, value=float(i % 60))
+            for i in range(180)
+        ])
+        db.session.commit()
+
+        written = run_rollups(now=base + 3 * 3600 + 600)
+        assert written == {300: 36, 3600: 3, 86400: 0}
+        # Re-running only recomputes the newest bucket of each tier
+        assert run_rollups(now=base + 3 * 3600 + 600) == {300: 1, 3600: 1, 86400: 0}
+        assert MetricRollup.query.filter_by(resolution=300).count() == 36
+        hourly = MetricRollup.query.filter_by(resolution=3600).order_by(MetricRollup.ts).all()
+        assert [(r.min, r.max, r.count) for r in hourly] == [(0.0, 59.0, 60)] * 3
+
+        expected = query_series(monitor.id, ['cpu.percent'], base, base + 3 * 3600, 3600)
+        MetricSample.query.delete()
+        db.session.commit()
+        assert query_series(monitor.id, ['cpu.percent'], base, base + 3 * 3600, 3600) == expected
+        assert [p['avg'] for p in expected['cpu.percent']] == [29.5] * 3
+
+        # Samples newer than the rolled-up range are merged in from raw data
+        db.session.add(MetricSample(monitor_id=monitor.id, metric='cpu.percent', ts=base + 3 * 3600 + 900,
+                                    value=99.0))
+        db.session.commit()
+        series = query_series(monitor.id, ['cpu.percent'], base, base + 4 * 3600, 3600)['cpu.percent']
+        assert series[-1] == {'t': base + 3 * 3600, 'min': 99.0, 'max': 99.0, 'avg': 99.0, 'count': 1}
+
+
+def test_late_samples_are_rolled_up_again(client):
+    app = client.application
+    base = 1704067200
+    now = base + 3 * 3600 + 600
+    with app.app_context():
+        owner = User(email='owner@example.com', name='Owner')
+        db.session.add(owner)
+        db.session.commit()
+        monitor = ServerMonitor(name='web-1', api_key='key-1', user_id=owner.id)
+        monitor.save()
+        for i in range(180):
+            store_samples(monitor.id, base + i * 60, [('cpu.percent', 1.0)])
+        MetricLateBucket.query.delete()
+        db.session.commit()
+        run_rollups(now=now)
+
+        # A replayed spool delivers a sample from the first hour
+        store_samples(monitor.id, base + 630, [('cpu.percent', 50.0)])
+        assert [m.ts for m in MetricLateBucket.query] == [base + 600]
+        assert run_rollups(now=now) == {300: 34, 3600: 3, 86400: 0}
+        assert MetricLateBucket.query.count() == 0
+
+        bucket = MetricRollup.query.filter_by(resolution=300, ts=base + 600).one()
+        assert (bucket.max, bucket.count) == (50.0, 6)
+        hourly = MetricRollup.query.filter_by(resolution=3600).order_by(MetricRollup.ts).all()
+        assert [r.count for r in hourly] == [61, 60, 60]
+        # Nothing late left: back to recomputing the newest bucket only
+        assert run_rollups(now=now) == {300: 1, 3600: 1, 86400: 0}
+
+
+def test_rollup_job_skips_run_while_another_process_holds_the_lock(client, monkeypatch):
+    calls = []
+
+    @contextmanager
+    def busy(key, wait=True):
+        calls.append((key, wait))
+        yield False
+
+    monkeypatch.setattr(rollup, 'advisory_lock', busy)
+    monkeypatch.setattr(rollup, 'run_rollups', lambda: calls.append('run'))
+    RollupJob(client.application).run_once()
+    assert calls == [(rollup.ROLLUP_LOCK_KEY, False)]
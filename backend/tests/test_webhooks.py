@@ -0,0 +1,162 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.webhooks import CircuitBreaker, CircuitOpenError, WebhookDispatcher
+
+
+class _StubServer:
+    """Local HTTP endpoint recording requests and replying with `status`."""
+
+    def __init__(self, status=200, delay=0.0):
+        self.status = status
+        self.delay = delay
+        self.requests = []
+        self.client_ports = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                stub.requests.append(body)
+                stub.client_ports.add(self.client_address[1])
+                time.sleep(stub.delay)
+                self.send_response(stub.status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/hook'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = _StubServer()
+    yield server
+    server.close()
+
+
+def test_deliveries_reuse_pooled_connections(stub):
+    dispatcher = WebhookDispatcher(max_workers=1, pool_size=1)
+    try:
+        for i in range(5):
+            assert dispatcher.dispatch(stub.url, {'n': i}).result(timeout=5) == 200
+        assert len(stub.requests) == 5
+        # A single keep-alive connection served every delivery
+        assert len(stub.client_ports) == 1
+        stats = dispatcher.stats_snapshot()
+        assert stats['delivered'] == 5
+        assert stats['latency_ms']['p99'] is not None
+    finally:
+        dispatcher.shutdown()
+
+
+def test_identical_in_flight_payloads_are_coalesced(stub):
+    stub.delay = 0.3
+    dispatcher = WebhookDispatcher(max_workers=4)
+    try:
+        first = dispatcher.dispatch(stub.url, {'id': 'same'})
+        second = dispatcher.dispatch(stub.url, {'id': 'same'})
+        assert first is second
+        first.result(timeout=5)
+        assert len(stub.requests) == 1
+        assert dispatcher.stats_snapshot()['coalesced'] == 1
+    finally:
+        dispatcher.shutdown()
+
+
+def test_circuit_opens_after_repeated_failures(stub):
+    stub.status = 500
+    dispatcher = WebhookDispatcher(max_workers=1, max_attempts=1, failure_threshold=2, reset_timeout=60)
+    try:
+        for i in range(2):
+            with pytest.raises(Exception):
+                dispatcher.dispatch(stub.url, {'n': i}).result(timeout=5)
+        with pytest.raises(CircuitOpenError):
+            dispatcher.dispatch(stub.url, {'n': 'skipped'}).result(timeout=5)
+
+        assert len(stub.requests) == 2
+        stats = dispatcher.stats_snapshot()
+        assert stats['failed'] == 2
+        assert stats['circuit_open'] == 1
+        assert stats['dead_lettered'] == 3
+        assert stats['open_circuits'] == [stub.url]
+    finally:
+        dispatcher.shutdown()
+
+
+def test_client_errors_do_not_open_the_circuit(stub):
+    stub.status = 422
+    dispatcher = WebhookDispatcher(max_workers=1, max_attempts=1, failure_threshold=2, reset_timeout=60)
+    try:
+        for i in range(3):
+            with pytest.raises(Exception):
+                dispatcher.dispatch(stub.url, {'n': i}).result(timeout=5)
+        stub.status = 200
+        assert dispatcher.dispatch(stub.url, {'n': 'ok'}).result(timeout=5) == 200
+        assert dispatcher.stats_snapshot()['open_circuits'] == []
+    finally:
+        dispatcher.shutdown()
+
+
+def test_half_open_breaker_allows_a_single_trial():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] = 11
+    assert breaker.allow()
+    assert not breaker.allow()  # trial already in flight
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_client_errors_are_dead_lettered_without_retrying(stub):
+    stub.status = 404
+    dispatcher = WebhookDispatcher(max_workers=1, max_attempts=3, retry_base_delay=0.01)
+    try:
+        with pytest.raises(Exception):
+            dispatcher.dispatch(stub.url, {'n': 1}).result(timeout=5)
+        assert len(stub.requests) == 1
+        stats = dispatcher.stats_snapshot()
+        assert (stats['retried'], stats['dead_lettered']) == (0, 1)
+
+        stub.status = 429
+        with pytest.raises(Exception):
+            dispatcher.dispatch(stub.url, {'n': 2}).result(timeout=5)
+        assert len(stub.requests) == 4
+    finally:
+        dispatcher.shutdown()
+
+
+def test_retry_backoff_does_not_hold_a_worker(stub):
+    failing = _StubServer(status=503)
+    dispatcher = WebhookDispatcher(max_workers=1, max_attempts=2, retry_base_delay=1.0)
+    try:
+        retried = dispatcher.dispatch(failing.url, {'n': 'retried'})
+        deadline = time.monotonic() + 5
+        while not failing.requests and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # The only worker is free while the first delivery waits for its retry
+        assert dispatcher.dispatch(stub.url, {'n': 'other'}).result(timeout=0.5) == 200
+        assert not retried.done()
+
+        failing.status = 200
+        assert retried.result(timeout=5) == 200
+        assert len(failing.requests) == 2
+    finally:
+        dispatcher.shutdown()
+        failing.close()
@@ -0,0 +1,34 @@
+def test_create_ticket_entity_mode_returns_only_the_ticket(client):
+    payload = {'subject': 'Entity mode', 'requester_name': 'Acme Ltd'}
+
+    rv = client.post('/api/tickets/?response=entity', json=payload)
+    assert rv.status_code == 201
+    body = rv.get_json()
+    assert isinstance(body, dict)
+    assert body['subject'] == payload['subject']
+    assert rv.headers['X-Resource-Version']
+    assert rv.headers['ETag'].startswith(f'W/"{body["id"]}:')
+
+
+def test_create_ticket_mode_header_and_legacy_default(client):
+    rv = client.post('/api/tickets/', json={'subject': 'Header mode', 'requester_name': 'Acme'},
+                     headers={'X-Response-Mode': 'entity'})
+    assert rv.status_code == 201
+    assert rv.get_json()['subject'] == 'Header mode'
+
+    # Without opting in, the legacy full-collection response is kept
+    rv = client.post('/api/tickets/', json={'subject': 'Legacy mode', 'requester_name': 'Acme'})
+    assert rv.status_code == 201
+    assert isinstance(rv.get_json(), list)
+
+
+def test_cross_origin_clients_can_use_entity_mode(client):
+    origin = {'Origin': 'http://localhost:5173'}
+    rv = client.options('/api/tickets/', headers={**origin, 'Access-Control-Request-Method': 'POST',
+                                                  'Access-Control-Request-Headers': 'X-Response-Mode'})
+    assert 'x-response-mode' in rv.headers['Access-Control-Allow-Headers'].lower()
+
+    rv = client.post('/api/tickets/', json={'subject': 'CORS', 'requester_name': 'Acme'},
+                     headers={**origin, 'X-Response-Mode': 'entity'})
+    exposed = rv.headers['Access-Control-Expose-Headers'].lower()
+    assert 'etag' in exposed and 'x-resource-version' in exposed
@@ -38,6 +38,10 @@ const ConversationList = ({ onSelectConversation, selectedConversationId, initia
           // For tickets, comments don't have read status tracking yet
           counts[conversation.id] = 0;
           continue;
+        } else if (typeof conversation.unread_count === 'number') {
+          // The conversation list already includes the unread count
+          counts[conversation.id] = conversation.unread_count;
+          continue;
         } else {
           messages = await getConversationMessages(conversation.id);
         }